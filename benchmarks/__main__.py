@@ -0,0 +1,104 @@
+# Benchmark suite entry point.
+#
+# Run from the repository root:
+#     python -m benchmarks run [-o results.json] [--size-kb 1024] [--only 'scanner/*']
+#     python -m benchmarks compare baseline.json results.json [--threshold 0.10]
+#     python -m benchmarks conformance [DIRECTORY] [--limit N] [--memory-every 10]
+#     python -m benchmarks symbols [DIRECTORY] [--limit N]
+
+import argparse
+import sys
+from typing import List, Optional
+
+from benchmarks import conformance, symbols
+from benchmarks.compare import DEFAULT_THRESHOLD, compare, regressions, report
+from benchmarks.suite import (
+    DEFAULT_SIZE_KB, format_result, load_results, run_suite, save_results, select
+)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Lexer throughput benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks")
+    run.add_argument("-o", "--output", default="benchmark-results.json",
+                     help="results file to write (default: %(default)s)")
+    run.add_argument("--size-kb", type=float, default=DEFAULT_SIZE_KB,
+                     help="corpus size per benchmark (default: %(default)s)")
+    run.add_argument("--repeat", type=int, default=3,
+                     help="runs per benchmark; the fastest is kept (default: %(default)s)")
+    run.add_argument("--only", action="append", metavar="PATTERN",
+                     help="run only benchmarks matching this glob, e.g. 'scanner/*'")
+    run.add_argument("--no-isolate", action="store_true",
+                     help="run every benchmark in this process (peak RSS is then shared)")
+
+    check = commands.add_parser("compare", help="fail if throughput regressed against a baseline")
+    check.add_argument("baseline")
+    check.add_argument("current")
+    check.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help="allowed relative drop in tokens/sec (default: %(default)s)")
+
+    differ = commands.add_parser("conformance",
+                                 help="compare tokens and speed with the stdlib tokenize module")
+    differ.add_argument("directory", nargs="?", default=None,
+                        help="tree of .py files to lex (default: the stdlib Lib/ directory)")
+    differ.add_argument("--limit", type=int, default=None, help="lex at most this many files")
+    differ.add_argument("--memory-every", type=int, default=conformance.MEMORY_EVERY,
+                        help="trace memory on every Nth file, 0 to disable (default: %(default)s)")
+    differ.add_argument("-q", "--quiet", action="store_true",
+                        help="only print the summary, not the first mismatch of every file")
+    differ.add_argument("--strict", action="store_true",
+                        help="exit with status 1 if any file differs")
+
+    interning = commands.add_parser("symbols",
+                                    help="report how much interning token values deduplicates")
+    interning.add_argument("directory", nargs="?", default=None,
+                           help="tree of .py files to lex (default: the stdlib Lib/ directory)")
+    interning.add_argument("--limit", type=int, default=None, help="lex at most this many files")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        names = select(args.only)
+        if not names:
+            parser.error("no benchmark matches --only")
+        document = run_suite(names, args.size_kb, args.repeat, isolate=not args.no_isolate,
+                             report=lambda result: print(format_result(result), flush=True))
+        save_results(document, args.output)
+        print(f"results written to {args.output}")
+        return 0
+
+    if args.command == "conformance":
+        paths = list(conformance.python_files(args.directory or conformance.stdlib_directory()))
+        if args.limit is not None:
+            paths = paths[:args.limit]
+        def show(result: conformance.FileReport):
+            if args.quiet or result.conforms:
+                return
+            print(f"{result.path}: {result.error or result.mismatch}", flush=True)
+        summary = conformance.run(paths, args.memory_every, show)
+        for line in summary.lines():
+            print(line)
+        return 1 if args.strict and summary.conforming < summary.files else 0
+
+    if args.command == "symbols":
+        paths = list(conformance.python_files(args.directory or conformance.stdlib_directory()))
+        if args.limit is not None:
+            paths = paths[:args.limit]
+        for line in symbols.run(paths).lines():
+            print(line)
+        return 0
+
+    comparisons = compare(load_results(args.baseline), load_results(args.current))
+    for line in report(comparisons, args.threshold):
+        print(line)
+    failed = regressions(comparisons, args.threshold)
+    if failed:
+        print(f"{len(failed)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
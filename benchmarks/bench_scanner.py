@@ -0,0 +1,152 @@
+# Throughput comparison between the master-pattern scanner and a
+# character-by-character scanner driven by Scanner.advance().
+#
+# Run from the repository root:
+#     python -m benchmarks.bench_scanner [--size-kb 2048] [--repeat 3]
+
+import argparse
+import time
+from typing import List
+
+from src.scanner import Scanner, OPENING_BRACKETS, CLOSING_BRACKETS, TAB_SIZE
+from src.token_definitions import Token, TokenType, KEYWORDS, OPERATORS, DELIMITERS
+
+SAMPLE_BLOCK = '''
+def compute_{n}(alpha, beta, gamma):
+    # running total for block {n}
+    total = alpha * beta + gamma ** 2
+    if total >= {n}:
+        total -= beta / 3.5
+    else:
+        total += (alpha % 7)
+    values = [alpha, beta, gamma, {n}]
+    label = "block {n}"
+    while total != 0:
+        total = total - 1
+    return {{'total': total, 'label': label}}
+
+'''
+
+
+def generate_source(size_kb: int) -> str:
+    """Build a deterministic source of roughly size_kb kilobytes."""
+    blocks = []
+    size = 0
+    n = 0
+    while size < size_kb * 1024:
+        block = SAMPLE_BLOCK.format(n=n)
+        blocks.append(block)
+        size += len(block)
+        n += 1
+    return "".join(blocks)
+
+
+class CharScanner(Scanner):
+    """Reference scanner that consumes the source one character at a time."""
+
+    def scan_tokens(self) -> List[Token]:
+        while not self.is_at_end():
+            self.start = self.current
+            self.scan_token()
+        while len(self.indents) > 1:
+            self.indents.pop()
+            self.add_token(TokenType.DEDENT, "")
+        self.tokens.append(Token(TokenType.EOF, "", self.line, self.column))
+        return self.tokens
+
+    def add_token(self, token_type: TokenType, value: str, column: int = 0):
+        self.tokens.append(Token(token_type, value, self.line, column or self.column))
+
+    def scan_token(self):
+        start_column = self.column
+        char = self.advance()
+        if char in ' \t\f':
+            return
+        if char == '\n':
+            if not self.at_line_start and not self.paren_depth:
+                self.add_token(TokenType.NEWLINE, char, start_column)
+                self.at_line_start = True
+            self.line += 1
+            self.column = 1
+            return
+        if char == '#':
+            while self.peek() not in ('\n', ''):
+                self.advance()
+            self.add_token(TokenType.COMMENT, self.source[self.start:self.current], start_column)
+            return
+        if self.at_line_start:
+            self.at_line_start = False
+            line_start = self.start - start_column + 1
+            indentation = self.source[line_start:self.start]
+            width = len(indentation.expandtabs(TAB_SIZE))
+            if width > self.indents[-1]:
+                self.indents.append(width)
+                self.add_token(TokenType.INDENT, indentation, 1)
+            while width < self.indents[-1]:
+                self.indents.pop()
+                self.add_token(TokenType.DEDENT, "", start_column)
+        if char.isalpha() or char == '_':
+            while self.peek().isalnum() or self.peek() == '_':
+                self.advance()
+            text = self.source[self.start:self.current]
+            self.add_token(KEYWORDS.get(text, TokenType.IDENTIFIER), text, start_column)
+        elif char.isdigit():
+            while self.peek().isdigit():
+                self.advance()
+            if self.peek() == '.' and self.peek(1).isdigit():
+                self.advance()
+                while self.peek().isdigit():
+                    self.advance()
+            self.add_token(TokenType.NUMBER, self.source[self.start:self.current], start_column)
+        elif char in '"\'':
+            while self.peek() != char:
+                if self.advance() == '\\':
+                    self.advance()
+            self.advance()
+            self.add_token(TokenType.STRING, self.source[self.start:self.current], start_column)
+        else:
+            text = char + self.peek()
+            if text not in OPERATORS:
+                text = char
+            else:
+                self.advance()
+            token_type = OPERATORS.get(text) or DELIMITERS[text]
+            if token_type in OPENING_BRACKETS:
+                self.paren_depth += 1
+            elif token_type in CLOSING_BRACKETS:
+                self.paren_depth -= 1
+            self.add_token(token_type, text, start_column)
+
+
+def measure(scanner_class, source: str, repeat: int) -> float:
+    """Return the best tokens/sec over repeat runs."""
+    best = 0.0
+    for _ in range(repeat):
+        began = time.perf_counter()
+        tokens = scanner_class(source).scan_tokens()
+        elapsed = time.perf_counter() - began
+        best = max(best, len(tokens) / elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-kb", type=int, default=2048)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    source = generate_source(args.size_kb)
+    fast = Scanner(source).scan_tokens()
+    slow = CharScanner(source).scan_tokens()
+    assert fast == slow, "scanners disagree on the benchmark corpus"
+
+    print(f"corpus: {len(source) / 1024:.0f} KiB, {len(fast)} tokens")
+    slow_rate = measure(CharScanner, source, args.repeat)
+    fast_rate = measure(Scanner, source, args.repeat)
+    print(f"character-by-character: {slow_rate:12,.0f} tokens/sec")
+    print(f"master pattern:         {fast_rate:12,.0f} tokens/sec")
+    print(f"speedup:                {fast_rate / slow_rate:12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Memory and latency comparison between Token and the previous dataclass layout.
+#
+# Run from the repository root:
+#     python -m benchmarks.bench_token [--count 20000]
+
+import argparse
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+from src.token_definitions import Token, TokenType, Position
+
+DEFAULT_COUNT = 20000
+
+
+@dataclass
+class DataclassToken:
+    """The Token layout before slots and category flags."""
+    type: TokenType
+    value: str
+    line: int
+    column: int
+    position: Optional[Position] = None
+
+    @property
+    def is_keyword(self) -> bool:
+        return self.type.name in [
+            'IF', 'ELSE', 'WHILE', 'FOR', 'DEF', 'CLASS', 'RETURN',
+            'IMPORT', 'FROM', 'AS', 'TRY', 'EXCEPT', 'FINALLY', 'RAISE'
+        ]
+
+    @property
+    def is_operator(self) -> bool:
+        return self.type.name in [
+            'PLUS', 'MINUS', 'MULTIPLY', 'DIVIDE', 'MODULO', 'POWER',
+            'ASSIGN', 'PLUSASSIGN', 'MINUSASSIGN', 'EQUALS', 'NOTEQUALS',
+            'GREATER', 'LESS', 'GREATEREQUAL', 'LESSEQUAL'
+        ]
+
+    @property
+    def is_delimiter(self) -> bool:
+        return self.type.name in [
+            'LPAREN', 'RPAREN', 'LBRACE', 'RBRACE', 'LBRACKET', 'RBRACKET',
+            'COMMA', 'DOT', 'COLON', 'SEMICOLON'
+        ]
+
+
+def allocated_bytes(token_class, count: int) -> int:
+    """Bytes held by count tokens of the given class (values are shared)."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tokens = [token_class(TokenType.IDENTIFIER, "name", 1, index) for index in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tokens
+    return after - before
+
+
+def predicate_seconds(token, count: int) -> float:
+    """Best time for count passes over the three category predicates."""
+    check = lambda: (token.is_keyword, token.is_operator, token.is_delimiter)
+    return min(timeit.repeat(check, number=count, repeat=5))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT)
+    args = parser.parse_args()
+    count = args.count
+
+    slotted = allocated_bytes(Token, count)
+    legacy = allocated_bytes(DataclassToken, count)
+    print(f"memory per token:          slotted {slotted / count:6.0f} B, "
+          f"dataclass {legacy / count:6.0f} B")
+    # RAISE is the last keyword, the worst case for the list scan
+    slotted = predicate_seconds(Token(TokenType.RAISE, "raise", 1, 1), count)
+    legacy = predicate_seconds(DataclassToken(TokenType.RAISE, "raise", 1, 1), count)
+    print(f"category checks per token: slotted {slotted / count * 1e9:6.0f} ns, "
+          f"dataclass {legacy / count * 1e9:6.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
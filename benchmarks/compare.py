@@ -0,0 +1,50 @@
+# Regression gate: compare a benchmark results file against a baseline.
+
+from typing import List, NamedTuple, Optional
+
+DEFAULT_THRESHOLD = 0.10
+
+
+class Comparison(NamedTuple):
+    name: str
+    baseline: Optional[float]
+    current: Optional[float]
+
+    @property
+    def ratio(self) -> Optional[float]:
+        """Current over baseline throughput, or None if either side is missing."""
+        if not self.baseline or self.current is None:
+            return None
+        return self.current / self.baseline
+
+    def regressed(self, threshold: float) -> bool:
+        ratio = self.ratio
+        return ratio is not None and ratio < 1 - threshold
+
+
+def compare(baseline: dict, current: dict) -> List[Comparison]:
+    """Pair up the tokens/sec of every benchmark present in either document."""
+    before = {result['name']: result['tokens_per_sec'] for result in baseline['results']}
+    after = {result['name']: result['tokens_per_sec'] for result in current['results']}
+    names = list(before) + [name for name in after if name not in before]
+    return [Comparison(name, before.get(name), after.get(name)) for name in names]
+
+
+def report(comparisons: List[Comparison], threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Human readable lines, one per benchmark."""
+    lines = []
+    for comparison in comparisons:
+        ratio = comparison.ratio
+        if ratio is None:
+            status = "only in baseline" if comparison.current is None else "new"
+            lines.append(f"{comparison.name:34} {status}")
+            continue
+        status = "REGRESSION" if comparison.regressed(threshold) else "ok"
+        lines.append(f"{comparison.name:34} {comparison.baseline:12,.0f} -> "
+                     f"{comparison.current:12,.0f} tokens/s ({ratio - 1:+7.1%}) {status}")
+    return lines
+
+
+def regressions(comparisons: List[Comparison], threshold: float = DEFAULT_THRESHOLD) -> List[Comparison]:
+    """Benchmarks whose throughput dropped by more than threshold."""
+    return [comparison for comparison in comparisons if comparison.regressed(threshold)]
@@ -0,0 +1,266 @@
+# Differential conformance and throughput harness against stdlib tokenize.
+#
+# Every .py file of a directory tree (by default the Lib/ directory of the
+# running CPython) is lexed by both LexicalAnalyzer and tokenize. The token
+# kinds are mapped onto each other, the first differing token of every file
+# is reported, and the time and peak traced memory of both lexers are
+# summed up side by side.
+
+import io
+import os
+import sysconfig
+import time
+import tokenize
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from src.main import LexicalAnalyzer
+from src.token_definitions import DELIMITERS, KEYWORDS, OPERATORS, Token, TokenType
+
+# tokenize kinds with a direct counterpart; NAME and OP are split by lexeme
+TOKENIZE_TYPES = {
+    tokenize.NUMBER: TokenType.NUMBER,
+    tokenize.STRING: TokenType.STRING,
+    tokenize.COMMENT: TokenType.COMMENT,
+    tokenize.NEWLINE: TokenType.NEWLINE,
+    tokenize.INDENT: TokenType.INDENT,
+    tokenize.DEDENT: TokenType.DEDENT,
+    tokenize.ENDMARKER: TokenType.EOF,
+    tokenize.ERRORTOKEN: TokenType.ERROR,
+}
+# Line breaks outside logical lines and the encoding marker have no
+# counterpart, since the scanner skips blank lines and works on text
+IGNORED_TOKENIZE_TYPES = {tokenize.NL, tokenize.ENCODING}
+# Tracing allocations slows lexing down about tenfold, so by default memory
+# is only measured on every tenth file
+MEMORY_EVERY = 10
+# Longer lexemes are shortened in mismatch reports
+SHOWN_LEXEME = 40
+
+# Kind, lexeme and position of one token, with columns counted from 1. The
+# position is None where it is not compared.
+Normalized = Tuple[Union[TokenType, str], str, Optional[Tuple[int, int]]]
+
+
+def reference_kind(token: tokenize.TokenInfo) -> Union[TokenType, str]:
+    """
+    The TokenType LexicalAnalyzer should produce for a tokenize token, or a
+    description of the token if the lexer has no equivalent kind.
+    """
+    if token.type == tokenize.NAME:
+        return KEYWORDS.get(token.string, TokenType.IDENTIFIER)
+    if token.type == tokenize.OP:
+        kind = OPERATORS.get(token.string) or DELIMITERS.get(token.string)
+        if kind is not None:
+            return kind
+    kind = TOKENIZE_TYPES.get(token.exact_type) or TOKENIZE_TYPES.get(token.type)
+    return kind if kind is not None else f"{tokenize.tok_name[token.exact_type]} {token.string!r}"
+
+
+def normalize_reference(tokens: List[tokenize.TokenInfo], text: str) -> List[Normalized]:
+    """
+    Map tokenize output onto LexicalAnalyzer kinds and positions.
+
+    tokenize closes a file that does not end in a line break with an empty
+    NEWLINE, which is dropped, and places the final DEDENT and ENDMARKER
+    tokens on the line after the last one, where their position is not
+    compared.
+    """
+    last_line = text.count('\n') + (not text.endswith('\n'))
+    normalized = []
+    for token in tokens:
+        if token.type in IGNORED_TOKENIZE_TYPES:
+            continue
+        if token.type == tokenize.NEWLINE and not token.string:
+            continue
+        line, column = token.start
+        position = (line, column + 1) if line <= last_line else None
+        normalized.append((reference_kind(token), token.string, position))
+    return normalized
+
+
+def normalize(tokens: List[Token]) -> List[Normalized]:
+    return [(token.type, token.value, (token.line, token.column)) for token in tokens]
+
+
+class Mismatch(NamedTuple):
+    """The first token where the two lexers disagree."""
+    index: int
+    expected: Optional[Normalized]
+    actual: Optional[Normalized]
+
+    @staticmethod
+    def describe(token: Optional[Normalized]) -> str:
+        if token is None:
+            return "end of tokens"
+        kind, lexeme, position = token
+        name = kind.name if isinstance(kind, TokenType) else kind
+        if len(lexeme) > SHOWN_LEXEME:
+            lexeme = lexeme[:SHOWN_LEXEME - 3] + "..."
+        where = f" at {position[0]}:{position[1]}" if position else ""
+        return f"{name} {lexeme!r}{where}"
+
+    def __str__(self) -> str:
+        return (f"token {self.index}: expected {self.describe(self.expected)}, "
+                f"got {self.describe(self.actual)}")
+
+
+def first_mismatch(expected: List[Normalized], actual: List[Normalized]) -> Optional[Mismatch]:
+    """Compare two normalized token lists; a None position matches any position."""
+    for index in range(max(len(expected), len(actual))):
+        want = expected[index] if index < len(expected) else None
+        got = actual[index] if index < len(actual) else None
+        if want is None or got is None:
+            return Mismatch(index, want, got)
+        if want[:2] != got[:2] or (want[2] is not None and want[2] != got[2]):
+            return Mismatch(index, want, got)
+    return None
+
+
+@dataclass
+class FileReport:
+    path: str
+    size: int = 0
+    tokens: int = 0
+    reference_tokens: int = 0
+    seconds: float = 0.0
+    reference_seconds: float = 0.0
+    # Peak traced memory in bytes, None when memory was not measured
+    peak: Optional[int] = None
+    reference_peak: Optional[int] = None
+    mismatch: Optional[Mismatch] = None
+    # Set when tokenize rejects the file, which is then not compared
+    error: Optional[str] = None
+
+    @property
+    def conforms(self) -> bool:
+        return self.error is None and self.mismatch is None
+
+
+def _lex(text: str) -> List[Token]:
+    return LexicalAnalyzer(text, tolerant=True).analyze()
+
+
+def _reference_lex(text: str) -> List[tokenize.TokenInfo]:
+    return list(tokenize.generate_tokens(io.StringIO(text).readline))
+
+
+def _timed(lex: Callable[[str], list], text: str) -> Tuple[list, float]:
+    began = time.perf_counter()
+    tokens = lex(text)
+    return tokens, time.perf_counter() - began
+
+
+def _peak_memory(lex: Callable[[str], list], text: str) -> int:
+    tracemalloc.start()
+    try:
+        lex(text)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def compare_file(path: str, memory: bool = True) -> FileReport:
+    """
+    Lex one file with both lexers. Memory is measured in a second, traced
+    run of each lexer, so tracing does not distort the timings.
+    """
+    report = FileReport(path, os.path.getsize(path))
+    try:
+        with tokenize.open(path) as source:
+            text = source.read()
+        reference, report.reference_seconds = _timed(_reference_lex, text)
+    except (SyntaxError, UnicodeDecodeError, tokenize.TokenError) as error:
+        report.error = f"{type(error).__name__}: {error}"
+        return report
+    tokens, report.seconds = _timed(_lex, text)
+    report.tokens, report.reference_tokens = len(tokens), len(reference)
+    report.mismatch = first_mismatch(normalize_reference(reference, text), normalize(tokens))
+    if memory:
+        report.peak = _peak_memory(_lex, text)
+        report.reference_peak = _peak_memory(_reference_lex, text)
+    return report
+
+
+def stdlib_directory() -> str:
+    """The Lib/ directory of the running interpreter."""
+    return sysconfig.get_paths()['stdlib']
+
+
+def python_files(directory: str) -> Iterator[str]:
+    """Every .py file below directory, in a stable order."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith('.py'):
+                yield os.path.join(root, name)
+
+
+@dataclass
+class ConformanceSummary:
+    files: int = 0
+    conforming: int = 0
+    rejected: int = 0
+    bytes: int = 0
+    tokens: int = 0
+    reference_tokens: int = 0
+    seconds: float = 0.0
+    reference_seconds: float = 0.0
+    # Largest peak traced memory of the files that were measured
+    peak: int = 0
+    reference_peak: int = 0
+    # Expected token kind at the first mismatch, counted over all files
+    first_mismatches: Counter = field(default_factory=Counter)
+
+    def add(self, report: FileReport):
+        self.files += 1
+        if report.error is not None:
+            self.rejected += 1
+            return
+        self.conforming += report.conforms
+        self.bytes += report.size
+        self.tokens += report.tokens
+        self.reference_tokens += report.reference_tokens
+        self.seconds += report.seconds
+        self.reference_seconds += report.reference_seconds
+        self.peak = max(self.peak, report.peak or 0)
+        self.reference_peak = max(self.reference_peak, report.reference_peak or 0)
+        if report.mismatch is not None:
+            expected = report.mismatch.expected
+            kind = "end of tokens" if expected is None else expected[0]
+            self.first_mismatches[kind.name if isinstance(kind, TokenType) else kind] += 1
+
+    def lines(self, top: int = 10) -> List[str]:
+        compared = self.files - self.rejected
+        lines = [f"{self.files} files, {compared} compared, {self.conforming} identical "
+                 f"({self.conforming / compared if compared else 0:.1%}), "
+                 f"{self.rejected} rejected by tokenize",
+                 f"{'':16} {'tokens':>10} {'seconds':>9} {'tokens/s':>12} {'MB/s':>7} {'peak MiB':>9}"]
+        for name, tokens, seconds, peak in (("LexicalAnalyzer", self.tokens, self.seconds, self.peak),
+                                            ("tokenize", self.reference_tokens,
+                                             self.reference_seconds, self.reference_peak)):
+            rate = tokens / seconds if seconds else 0.0
+            mb = self.bytes / seconds / 1e6 if seconds else 0.0
+            lines.append(f"{name:16} {tokens:10d} {seconds:9.3f} {rate:12,.0f} {mb:7.2f} "
+                         f"{peak / 2**20:9.1f}")
+        if self.first_mismatches:
+            lines.append("most common first mismatches (expected token):")
+            for kind, count in self.first_mismatches.most_common(top):
+                lines.append(f"  {count:6d}  {kind}")
+        return lines
+
+
+def run(paths: List[str], memory_every: int = MEMORY_EVERY,
+        report: Callable[[FileReport], None] = lambda result: None) -> ConformanceSummary:
+    """
+    Compare every file, measuring memory on every memory_every-th one
+    (never if it is 0).
+    """
+    summary = ConformanceSummary()
+    for index, path in enumerate(paths):
+        result = compare_file(path, memory_every > 0 and index % memory_every == 0)
+        summary.add(result)
+        report(result)
+    return summary
@@ -0,0 +1,118 @@
+# Deterministic synthetic corpora for the benchmark suite.
+#
+# Every generator takes a target size in KiB and a seed and always returns
+# the same valid source for the same arguments, so results from different
+# runs and machines measure the same input.
+
+import os
+import random
+from typing import Callable, Dict, List
+
+from benchmarks.bench_scanner import generate_source
+from src.token_definitions import KEYWORDS, OPERATORS
+
+NAME_PARTS = ['count', 'total', 'index', 'value', 'node', 'item', 'buffer', 'result',
+              'offset', 'token', 'state', 'cache', 'key', 'left', 'right', 'size']
+WORDS = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit',
+         'sed', 'do', 'eiusmod', 'tempor', 'incididunt', 'ut', 'labore', 'magna']
+# Operators that are valid between two operands
+BINARY_OPERATORS = sorted(set(OPERATORS) - {'=', '+=', '-='})
+
+
+def _fill(size_kb: int, seed: int, make_line: Callable[[random.Random], str]) -> str:
+    rng = random.Random(seed)
+    lines: List[str] = []
+    size = 0
+    while size < size_kb * 1024:
+        line = make_line(rng)
+        lines.append(line)
+        size += len(line)
+    return "".join(lines)
+
+
+def _name(rng: random.Random) -> str:
+    return '_'.join(rng.sample(NAME_PARTS, rng.randint(1, 3))) + str(rng.randint(0, 99))
+
+
+def identifier_dense(size_kb: int, seed: int = 0) -> str:
+    """Long statements made almost entirely of identifiers and keywords."""
+    keywords = sorted(KEYWORDS)
+    def line(rng: random.Random) -> str:
+        names = [_name(rng) if rng.random() < 0.9 else rng.choice(keywords)
+                 for _ in range(rng.randint(4, 12))]
+        return f"{_name(rng)} = ({', '.join(names)})\n"
+    return _fill(size_kb, seed, line)
+
+
+def long_strings(size_kb: int, seed: int = 0) -> str:
+    """Assignments of long string literals, each followed by a long comment."""
+    def line(rng: random.Random) -> str:
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+        note = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(10, 40)))
+        quote = rng.choice('\'"')
+        return f"{_name(rng)} = {quote}{text}{quote}  # {note}\n"
+    return _fill(size_kb, seed, line)
+
+
+def deep_indentation(size_kb: int, seed: int = 0, depth: int = 40) -> str:
+    """Nested blocks that indent one level at a time up to depth and back out."""
+    rng = random.Random(seed)
+    parts: List[str] = []
+    size = 0
+    while size < size_kb * 1024:
+        for level in range(depth):
+            line = '    ' * level + f"if {_name(rng)}:\n"
+            parts.append(line)
+            size += len(line)
+        for level in range(depth, 0, -1):
+            line = '    ' * level + f"{_name(rng)} = {level}\n"
+            parts.append(line)
+            size += len(line)
+    return "".join(parts)
+
+
+def operator_soup(size_kb: int, seed: int = 0) -> str:
+    """Dense expressions of short operands, operators and brackets."""
+    def line(rng: random.Random) -> str:
+        terms = []
+        for _ in range(rng.randint(8, 24)):
+            term = rng.choice(['a', 'b', 'x', str(rng.randint(0, 9)), '1.5'])
+            if rng.random() < 0.2:
+                term = f"({term} {rng.choice(BINARY_OPERATORS)} {rng.choice('xyz')})"
+            elif rng.random() < 0.1:
+                term = f"[{term}, {term}]"
+            terms.append(term)
+            terms.append(rng.choice(BINARY_OPERATORS))
+        terms.pop()
+        return f"{rng.choice('xyz')} {rng.choice(['=', '+=', '-='])} {' '.join(terms)}\n"
+    return _fill(size_kb, seed, line)
+
+
+def mixed(size_kb: int, seed: int = 0) -> str:
+    """Ordinary function definitions, as in bench_scanner."""
+    return generate_source(size_kb)
+
+
+CORPORA: Dict[str, Callable[..., str]] = {
+    'identifiers': identifier_dense,
+    'strings': long_strings,
+    'indentation': deep_indentation,
+    'operators': operator_soup,
+    'mixed': mixed,
+}
+
+
+def write_files(directory: str, size_kb: float, count: int, seed: int = 0) -> List[str]:
+    """
+    Write about size_kb of source to directory as count files of equal size
+    (count=1 gives one huge file) and return their paths.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"module_{index:05d}.py")
+        with open(path, 'w', encoding='utf-8') as source_file:
+            generator = operator_soup if index % 2 else identifier_dense
+            source_file.write(generator(size_kb / count, seed + index))
+        paths.append(path)
+    return paths
@@ -0,0 +1,170 @@
+# Throughput and memory benchmarks for the main lexing entry points.
+#
+# Each benchmark lexes one synthetic corpus through one entry point and
+# reports tokens/sec, MB/s and the peak resident set size. By default every
+# benchmark runs in a fresh process, so its peak RSS is its own.
+
+import fnmatch
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.corpus import CORPORA, write_files
+from src.batch import lex_many
+from src.main import LexicalAnalyzer
+from src.pattern_matcher import PatternMatcher
+from src.profiling import Profiler
+from src.scanner import Scanner
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RESULTS_VERSION = 1
+DEFAULT_SIZE_KB = 1024
+# Number of files the many-small-files benchmark splits its corpus into
+SMALL_FILE_COUNT = 200
+
+# A benchmark prepares its input from a size, then returns a callable that
+# lexes it once and returns (tokens, bytes)
+Benchmark = Callable[[float, str], Callable[[], Tuple[int, int]]]
+
+
+def _source_benchmark(corpus: str, lex: Callable[[str], int]) -> Benchmark:
+    def prepare(size_kb: float, workdir: str) -> Callable[[], Tuple[int, int]]:
+        source = CORPORA[corpus](size_kb)
+        size = len(source.encode('utf-8'))
+        return lambda: (lex(source), size)
+    return prepare
+
+
+def _scan(source: str) -> int:
+    return len(Scanner(source).scan_tokens())
+
+
+def _analyze(source: str) -> int:
+    return len(LexicalAnalyzer(source).analyze())
+
+
+def _analyze_profiled(source: str) -> int:
+    """The analyzer with a Profiler attached, to show what enabling it costs."""
+    return len(LexicalAnalyzer(source, profiler=Profiler()).analyze())
+
+
+def _match_lines(source: str) -> int:
+    """PatternMatcher.match_pattern on every line; each call counts as a token."""
+    matcher = PatternMatcher()
+    count = 0
+    for line_number, line in enumerate(source.splitlines(), 1):
+        matcher.match_pattern(line, line_number, 1)
+        count += 1
+    return count
+
+
+def _files_benchmark(count: int) -> Benchmark:
+    def prepare(size_kb: float, workdir: str) -> Callable[[], Tuple[int, int]]:
+        directory = os.path.join(workdir, f"files-{count}")
+        paths = write_files(directory, size_kb, count)
+        size = sum(os.path.getsize(path) for path in paths)
+        def run() -> Tuple[int, int]:
+            return sum(result.token_count for result in lex_many([directory], workers=1)), size
+        return run
+    return prepare
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+for _corpus in CORPORA:
+    BENCHMARKS[f"scanner/{_corpus}"] = _source_benchmark(_corpus, _scan)
+    BENCHMARKS[f"analyzer/{_corpus}"] = _source_benchmark(_corpus, _analyze)
+    BENCHMARKS[f"pattern_matcher/{_corpus}"] = _source_benchmark(_corpus, _match_lines)
+BENCHMARKS["analyzer-profiled/mixed"] = _source_benchmark("mixed", _analyze_profiled)
+BENCHMARKS["files/one-huge-file"] = _files_benchmark(1)
+BENCHMARKS["files/many-small-files"] = _files_benchmark(SMALL_FILE_COUNT)
+del _corpus
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process in KiB, where the platform reports it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_benchmark(name: str, size_kb: float, repeat: int) -> dict:
+    """Run one benchmark in this process, keeping the fastest of repeat runs."""
+    with tempfile.TemporaryDirectory() as workdir:
+        run = BENCHMARKS[name](size_kb, workdir)
+        best = float('inf')
+        for _ in range(repeat):
+            began = time.perf_counter()
+            tokens, size = run()
+            best = min(best, time.perf_counter() - began)
+    return {
+        'name': name,
+        'tokens': tokens,
+        'bytes': size,
+        'seconds': best,
+        'tokens_per_sec': tokens / best,
+        'mb_per_sec': size / best / 1e6,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def select(patterns: Optional[List[str]] = None) -> List[str]:
+    """Benchmark names matching any of the glob patterns (all of them by default)."""
+    if not patterns:
+        return list(BENCHMARKS)
+    return [name for name in BENCHMARKS if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+
+
+def run_suite(names: List[str], size_kb: float = DEFAULT_SIZE_KB, repeat: int = 3,
+              isolate: bool = True, report: Callable[[dict], None] = lambda result: None) -> dict:
+    """Run benchmarks and return the results document written by the run command."""
+    results = []
+    for name in names:
+        if isolate:
+            # A fresh process per benchmark, so peak RSS is not inherited
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                result = pool.submit(run_benchmark, name, size_kb, repeat).result()
+        else:
+            result = run_benchmark(name, size_kb, repeat)
+        report(result)
+        results.append(result)
+    return {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'size_kb': size_kb,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def format_result(result: dict) -> str:
+    rss = f"{result['peak_rss_kb'] / 1024:8.1f} MiB" if result['peak_rss_kb'] else "       n/a"
+    return (f"{result['name']:34} {result['tokens_per_sec']:12,.0f} tokens/s "
+            f"{result['mb_per_sec']:8.2f} MB/s {rss}")
+
+
+def save_results(document: dict, path: str):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(document, output, indent=2)
+        output.write('\n')
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding='utf-8') as source:
+        document = json.load(source)
+    if document.get('version') != RESULTS_VERSION:
+        raise ValueError(f"{path}: unsupported results version {document.get('version')!r}")
+    return document
@@ -0,0 +1,117 @@
+# Deduplication achieved by interning token values into symbol tables.
+#
+# Every file of a tree is scanned into a TokenStream, whose symbol table
+# holds one string per distinct identifier, keyword, operator and
+# delimiter value. The report compares the number of such tokens with the
+# number of distinct values, and the memory their value strings take with
+# and without interning, over the whole corpus.
+
+import sys
+import tokenize
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from src.scanner import Scanner
+from src.symbols import NO_SYMBOL
+from src.token_stream import TYPE_CODES
+from src.token_definitions import TokenType
+
+IDENTIFIER_CODE = TYPE_CODES[TokenType.IDENTIFIER]
+
+
+@dataclass
+class FileSymbols:
+    path: str
+    # Tokens with an interned value, and distinct values among them
+    tokens: int = 0
+    symbols: int = 0
+    identifiers: int = 0
+    identifier_symbols: int = 0
+    # Memory of the value strings, one per token or one per symbol
+    value_bytes: int = 0
+    symbol_bytes: int = 0
+    uses: Counter = field(default_factory=Counter)
+    error: Optional[str] = None
+
+
+def count_file(path: str) -> FileSymbols:
+    result = FileSymbols(path)
+    try:
+        with tokenize.open(path) as source:
+            text = source.read()
+    except (SyntaxError, UnicodeDecodeError) as error:
+        result.error = f"{type(error).__name__}: {error}"
+        return result
+    stream = Scanner(text, tolerant=True).scan_token_stream()
+    names = stream.symbols.names
+    uses = Counter(symbol for symbol in stream.symbol_ids if symbol != NO_SYMBOL)
+    identifiers = Counter(symbol for code, symbol in zip(stream.types, stream.symbol_ids)
+                          if code == IDENTIFIER_CODE)
+    result.tokens, result.symbols = sum(uses.values()), len(uses)
+    result.identifiers, result.identifier_symbols = sum(identifiers.values()), len(identifiers)
+    for symbol, count in uses.items():
+        name = names[symbol]
+        size = sys.getsizeof(name)
+        # CPython shares one-character strings already
+        result.value_bytes += size * (count if len(name) > 1 else 1)
+        result.symbol_bytes += size
+    result.uses = Counter({names[symbol]: count for symbol, count in identifiers.items()})
+    return result
+
+
+@dataclass
+class SymbolSummary:
+    files: int = 0
+    rejected: int = 0
+    tokens: int = 0
+    symbols: int = 0
+    identifiers: int = 0
+    identifier_symbols: int = 0
+    value_bytes: int = 0
+    symbol_bytes: int = 0
+    # Uses of every identifier over the corpus; its length is the number of
+    # distinct identifiers had all files shared one table
+    uses: Counter = field(default_factory=Counter)
+
+    def add(self, result: FileSymbols):
+        self.files += 1
+        if result.error is not None:
+            self.rejected += 1
+            return
+        self.tokens += result.tokens
+        self.symbols += result.symbols
+        self.identifiers += result.identifiers
+        self.identifier_symbols += result.identifier_symbols
+        self.value_bytes += result.value_bytes
+        self.symbol_bytes += result.symbol_bytes
+        self.uses.update(result.uses)
+
+    def lines(self, top: int = 10) -> List[str]:
+        def ratio(total: int, distinct: int) -> str:
+            return f"{total / distinct if distinct else 0:.1f}x"
+        lines = [f"{self.files} files, {self.rejected} unreadable",
+                 f"{'':24} {'tokens':>10} {'distinct':>10} {'dedup':>8}",
+                 f"{'interned values':24} {self.tokens:10d} {self.symbols:10d} "
+                 f"{ratio(self.tokens, self.symbols):>8}",
+                 f"{'identifiers':24} {self.identifiers:10d} {self.identifier_symbols:10d} "
+                 f"{ratio(self.identifiers, self.identifier_symbols):>8}",
+                 f"{'identifiers, one table':24} {self.identifiers:10d} {len(self.uses):10d} "
+                 f"{ratio(self.identifiers, len(self.uses)):>8}",
+                 f"value strings: {self.value_bytes / 2**20:.1f} MiB without interning, "
+                 f"{self.symbol_bytes / 2**20:.1f} MiB interned"]
+        if self.uses:
+            lines.append("most used identifiers:")
+            for name, count in self.uses.most_common(top):
+                lines.append(f"  {count:8d}  {name}")
+        return lines
+
+
+def run(paths: List[str],
+        report: Callable[[FileSymbols], None] = lambda result: None) -> SymbolSummary:
+    summary = SymbolSummary()
+    for path in paths:
+        result = count_file(path)
+        summary.add(result)
+        report(result)
+    return summary
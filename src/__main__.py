@@ -0,0 +1,39 @@
+# Command line entry point: python -m src PATH [PATH ...]
+
+import argparse
+import sys
+import time
+from typing import List, Optional
+
+from src.batch import BatchSummary, lex_many
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src",
+        description="Lex Python source files and directory trees in parallel."
+    )
+    parser.add_argument("paths", nargs="+", help="files or directories to lex")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="only print errors and the summary")
+    parser.add_argument("--cache-dir", default=None,
+                        help="reuse tokens of unchanged files from this cache directory")
+    args = parser.parse_args(argv)
+
+    summary = BatchSummary()
+    began = time.perf_counter()
+    for result in lex_many(args.paths, workers=args.workers, cache_dir=args.cache_dir):
+        summary.add(result)
+        if not result.ok:
+            print(f"{result.path}: error: {result.error}", file=sys.stderr)
+        elif not args.quiet:
+            print(f"{result.path}: {result.token_count} tokens")
+    summary.elapsed = time.perf_counter() - began
+    print(summary)
+    return 1 if summary.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# asyncio front end: lex an asyncio.StreamReader without blocking the loop
+
+import asyncio
+import codecs
+from collections import deque
+from concurrent.futures import Executor
+from typing import AsyncIterator, Deque, Iterator, List, Optional, Tuple
+
+from src.scanner import CHUNK_SIZE, RawToken, Scanner
+from src.token_definitions import Token
+
+# Tokens lexed between two suspensions of the coroutine
+YIELD_EVERY_TOKENS = 1000
+# Input consumed between two suspensions, for lines of long strings or comments
+YIELD_EVERY_BYTES = 64 * 1024
+
+
+class _Feed:
+    """
+    Chunk iterator handed to the scanning loop, filled from the event loop.
+    When it runs out of input before the end of the stream it returns None,
+    which suspends the scanning loop until more input has been put.
+    """
+    def __init__(self):
+        self.chunks: Deque[str] = deque()
+        self.exhausted = False
+        # True once the scanner asked for input the feed did not have
+        self.waiting = True
+        # Characters handed to the scanner so far
+        self.consumed = 0
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        return self
+
+    def __next__(self) -> Optional[str]:
+        if self.chunks:
+            chunk = self.chunks.popleft()
+            self.consumed += len(chunk)
+            return chunk
+        if self.exhausted:
+            raise StopIteration
+        self.waiting = True
+        return None
+
+
+def _take(tokens: Iterator[RawToken], feed: _Feed, max_tokens: int,
+          max_chars: int) -> Tuple[List[Token], bool]:
+    """
+    Lex up to max_tokens tokens or max_chars characters of input, stopping
+    early when the feed runs out of input. Returns the tokens and whether
+    the end of the input was reached.
+    """
+    batch: List[Token] = []
+    limit = feed.consumed + max_chars
+    for token_type, lexeme, _, line, column in tokens:
+        if token_type is None:
+            return batch, False
+        batch.append(Token(token_type, lexeme, line, column))
+        if len(batch) >= max_tokens or feed.consumed > limit:
+            return batch, False
+    return batch, True
+
+
+async def alex(reader: asyncio.StreamReader, chunk_size: int = CHUNK_SIZE,
+               encoding: str = "utf-8", tolerant: bool = False,
+               yield_every_tokens: int = YIELD_EVERY_TOKENS,
+               yield_every_bytes: int = YIELD_EVERY_BYTES,
+               executor: Optional[Executor] = None) -> AsyncIterator[Token]:
+    """
+    Lexically analyze an asyncio.StreamReader (or any object with an async
+    read(n) method returning bytes or str), yielding tokens as they are
+    recognised:
+
+        async for token in alex(reader):
+            ...
+
+    Tokens are lexed in batches of at most yield_every_tokens tokens or
+    yield_every_bytes characters of input, and the coroutine gives control
+    back to the event loop after every batch, so other tasks keep running
+    while a large input is lexed. Nothing is read or lexed ahead of the
+    consumer beyond the current batch and one chunk of input: a slow
+    consumer stops reading from the stream, which in turn pushes back on
+    its producer.
+
+    If executor is given the batches are lexed on it instead of on the
+    event loop's thread. The token generator cannot be pickled, so it must
+    be a thread pool; it may be shared with other requests, since every
+    batch is a separate job.
+    """
+    loop = asyncio.get_running_loop()
+    feed = _Feed()
+    tokens = Scanner("", tolerant=tolerant)._raw_tokens(feed)
+    decoder = None
+    finished = False
+    while not finished:
+        while feed.waiting and not feed.exhausted:
+            data = await reader.read(chunk_size)
+            # An empty read marks the end of the stream
+            feed.exhausted = not data
+            if isinstance(data, bytes):
+                if decoder is None:
+                    decoder = codecs.getincrementaldecoder(encoding)()
+                data = decoder.decode(data, final=feed.exhausted)
+            if data:
+                feed.chunks.append(data)
+                feed.waiting = False
+        if executor is None:
+            batch, finished = _take(tokens, feed, yield_every_tokens, yield_every_bytes)
+        else:
+            batch, finished = await loop.run_in_executor(
+                executor, _take, tokens, feed, yield_every_tokens, yield_every_bytes)
+        for token in batch:
+            yield token
+        await asyncio.sleep(0)
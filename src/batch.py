@@ -0,0 +1,173 @@
+# Batch lexing of many files across a process pool
+
+import os
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
+
+from src.main import LexicalAnalyzer
+from src.token_stream import TokenStream
+
+if TYPE_CHECKING:
+    from src.cache import TokenCache
+
+SOURCE_SUFFIXES = ('.py',)
+SKIPPED_DIRECTORIES = {'__pycache__', '.git', '.hg', '.svn', '.tox', '.nox', '.venv', 'venv'}
+# Batches are sized so each worker gets several of them, which keeps the
+# pool balanced while small files still share one round trip
+BATCHES_PER_WORKER = 8
+
+
+@dataclass
+class FileResult:
+    """Outcome of lexing one file."""
+    path: str
+    size: int
+    token_count: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    tokens: Optional[TokenStream] = None
+    # True if the tokens were loaded from a TokenCache
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchSummary:
+    """Aggregate figures for a batch run."""
+    files: int = 0
+    failed: int = 0
+    cached: int = 0
+    tokens: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+
+    def add(self, result: FileResult):
+        """Account for one file result."""
+        self.files += 1
+        self.bytes += result.size
+        if result.ok:
+            self.tokens += result.token_count
+            self.cached += result.cached
+        else:
+            self.failed += 1
+
+    def __str__(self) -> str:
+        rate = self.bytes / self.elapsed / 1e6 if self.elapsed else 0.0
+        cached = f", {self.cached} cached" if self.cached else ""
+        return (f"{self.files} files ({self.failed} failed{cached}), {self.tokens} tokens, "
+                f"{self.bytes} bytes in {self.elapsed:.2f}s ({rate:.1f} MB/s)")
+
+
+def iter_source_files(paths: Iterable[str], suffixes: Tuple[str, ...] = SOURCE_SUFFIXES) -> Iterator[str]:
+    """Expand files and directory trees into the source files they contain."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, directories, files in os.walk(path):
+            directories[:] = sorted(d for d in directories if d not in SKIPPED_DIRECTORIES)
+            for name in sorted(files):
+                if name.endswith(suffixes):
+                    yield os.path.join(root, name)
+
+
+def lex_file(path: str, keep_tokens: bool = False, cache: Optional['TokenCache'] = None) -> FileResult:
+    """Lex a single file, capturing any error in the result."""
+    began = time.perf_counter()
+    size = 0
+    hits = cache.stats.hits if cache is not None else 0
+    try:
+        size = os.path.getsize(path)
+        stream = LexicalAnalyzer.from_path(path, cache).token_stream()
+    except Exception as error:
+        # Lexical, I/O and decoding errors are all reported per file
+        return FileResult(path, size, error=f"{type(error).__name__}: {error}",
+                          elapsed=time.perf_counter() - began)
+    return FileResult(path, size, len(stream), time.perf_counter() - began,
+                      tokens=stream if keep_tokens else None,
+                      cached=cache is not None and cache.stats.hits > hits)
+
+
+def _open_cache(cache_dir: Optional[str]) -> Optional['TokenCache']:
+    if cache_dir is None:
+        return None
+    from src.cache import TokenCache
+    return TokenCache(cache_dir)
+
+
+def _lex_batch(paths: List[str], keep_tokens: bool, cache_dir: Optional[str]) -> List[FileResult]:
+    """Worker entry point: lex a batch of files."""
+    cache = _open_cache(cache_dir)
+    return [lex_file(path, keep_tokens, cache) for path in paths]
+
+
+def plan_batches(sized_paths: List[Tuple[int, str]], workers: int) -> List[List[str]]:
+    """
+    Group files into batches of roughly equal total size, largest first.
+    A file bigger than the target size gets a batch of its own.
+    """
+    total = sum(size for size, _ in sized_paths)
+    target = max(1, total // (workers * BATCHES_PER_WORKER))
+    batches: List[List[str]] = []
+    current: List[str] = []
+    current_size = 0
+    for size, path in sorted(sized_paths, reverse=True):
+        if size >= target:
+            batches.append([path])
+            continue
+        current.append(path)
+        current_size += size
+        if current_size >= target:
+            batches.append(current)
+            current, current_size = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+def lex_many(paths: Iterable[str], workers: Optional[int] = None,
+             keep_tokens: bool = False, cache_dir: Optional[str] = None) -> Iterator[FileResult]:
+    """
+    Lex every source file under paths and yield one FileResult per file in
+    completion order. Work is spread over a pool of worker processes in
+    batches balanced by file size; with workers=1, or a single file, the
+    files are lexed in this process without starting a pool.
+    Errors are reported in the result rather than raised. With cache_dir,
+    unchanged files are loaded from a TokenCache shared by all workers.
+    """
+    workers = workers or os.cpu_count() or 1
+    sized_paths = []
+    for path in iter_source_files(paths):
+        try:
+            sized_paths.append((os.path.getsize(path), path))
+        except OSError as error:
+            yield FileResult(path, 0, error=f"{type(error).__name__}: {error}")
+
+    if workers == 1 or len(sized_paths) <= 1:
+        cache = _open_cache(cache_dir)
+        for _, path in sorted(sized_paths, reverse=True):
+            yield lex_file(path, keep_tokens, cache)
+        return
+
+    # Imported here: starting the pool machinery dominates short runs
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_lex_batch, batch, keep_tokens, cache_dir)
+                   for batch in plan_batches(sized_paths, workers)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def lex_many_summary(paths: Iterable[str], workers: Optional[int] = None,
+                     cache_dir: Optional[str] = None) -> BatchSummary:
+    """Lex every source file under paths and return only the aggregate summary."""
+    summary = BatchSummary()
+    began = time.perf_counter()
+    for result in lex_many(paths, workers, cache_dir=cache_dir):
+        summary.add(result)
+    summary.elapsed = time.perf_counter() - began
+    return summary
@@ -0,0 +1,213 @@
+# Persistent on-disk cache of token streams keyed by source content
+
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+
+from src.pattern_matcher import shared_master_pattern
+from src.token_definitions import TokenType
+from src.token_stream import TokenStream
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+ENTRY_SUFFIX = '.tokens'
+# Entry layout: magic, token count, then the raw type, start, length, line
+# and column columns of the stream in native byte order
+ENTRY_MAGIC = b'PLXC\x01'
+ENTRY_HEADER = struct.Struct('=5sQ')
+COLUMN_NAMES = ('types', 'starts', 'lengths', 'lines', 'columns')
+# Eviction frees space down to this fraction of the cap, so a full cache
+# is not swept again on every store
+EVICTION_TARGET = 0.9
+
+
+def lexer_fingerprint() -> str:
+    """
+    Hash identifying the current lexer: the TokenType definitions, the
+    token patterns and the native layout of the cached columns. Any change
+    to them invalidates every cache entry.
+    """
+    digest = hashlib.sha256()
+    for token_type in TokenType:
+        digest.update(f"{token_type.name}={token_type.value};".encode('utf-8'))
+    digest.update(shared_master_pattern().pattern.encode('utf-8'))
+    digest.update(shared_master_pattern(binary=True).pattern)
+    digest.update(sys.byteorder.encode('ascii'))
+    stream = TokenStream(None)
+    for name in COLUMN_NAMES:
+        column = getattr(stream, name)
+        digest.update(f"{name}:{column.typecode}{column.itemsize};".encode('ascii'))
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Counters for one TokenCache."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate), "
+                f"{self.evictions} evictions")
+
+
+class TokenCache:
+    """
+    A directory of token streams keyed by a hash of the source and of the
+    lexer itself, shared safely between processes.
+
+    Only the token columns are stored: values are sliced out of the source,
+    which the caller always has since it is what the key is computed from.
+    Entries are written to a temporary file and renamed into place, so a
+    reader never sees a partial entry. A hit refreshes the entry's
+    modification time, and once the directory grows past max_bytes the
+    least recently used entries are deleted.
+    """
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self.fingerprint = lexer_fingerprint()
+        # Estimated size of the directory, measured on the first store
+        self._size: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source: Union[str, bytes]) -> str:
+        """Cache key of a source; str and bytes sources are kept apart since their offsets differ."""
+        digest = hashlib.sha256(self.fingerprint.encode('ascii'))
+        if isinstance(source, str):
+            digest.update(b's')
+            digest.update(source.encode('utf-8', 'surrogatepass'))
+        else:
+            digest.update(b'b')
+            digest.update(source)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, source: Union[str, bytes]) -> Optional[TokenStream]:
+        """Return the cached tokens of source, or None."""
+        path = self._path(self.key(source))
+        try:
+            with open(path, 'rb') as entry:
+                data = entry.read()
+        except OSError:
+            self.stats.misses += 1
+            return None
+        stream = self._decode(data, source)
+        if stream is None:
+            # Truncated or foreign entry: drop it and treat it as a miss
+            self._remove(path)
+            self.stats.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.stats.hits += 1
+        return stream
+
+    def put(self, source: Union[str, bytes], stream: TokenStream):
+        """Store the tokens of source, evicting old entries if the cache is full."""
+        data = self._encode(stream)
+        path = self._path(self.key(source))
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as entry:
+                entry.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            self._remove(temporary)
+            raise
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def token_stream(self, source: Union[str, bytes],
+                     scan: Callable[[], TokenStream]) -> TokenStream:
+        """Return the cached tokens of source, calling scan and storing its result on a miss."""
+        stream = self.get(source)
+        if stream is None:
+            stream = scan()
+            self.put(source, stream)
+        return stream
+
+    def size(self) -> int:
+        """Total size of the entries currently in the directory."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache is below its cap."""
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            if self._remove(path):
+                self.stats.evictions += 1
+            size -= entry_size
+        self._size = size
+
+    def clear(self):
+        """Delete every entry."""
+        for _, _, path in self._entries():
+            self._remove(path)
+        self._size = 0
+
+    def _entries(self):
+        """(last use, size, path) for every entry; entries removed meanwhile are skipped."""
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                if not item.name.endswith(ENTRY_SUFFIX):
+                    continue
+                try:
+                    status = item.stat()
+                except OSError:
+                    continue
+                yield status.st_mtime, status.st_size, item.path
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.unlink(path)
+        except OSError:
+            # Another process got there first
+            return False
+        return True
+
+    @staticmethod
+    def _encode(stream: TokenStream) -> bytes:
+        parts = [ENTRY_HEADER.pack(ENTRY_MAGIC, len(stream))]
+        parts.extend(getattr(stream, name).tobytes() for name in COLUMN_NAMES)
+        return b''.join(parts)
+
+    @staticmethod
+    def _decode(data: bytes, source: Union[str, bytes]) -> Optional[TokenStream]:
+        if len(data) < ENTRY_HEADER.size:
+            return None
+        magic, count = ENTRY_HEADER.unpack_from(data)
+        stream = TokenStream(source)
+        columns = [getattr(stream, name) for name in COLUMN_NAMES]
+        if magic != ENTRY_MAGIC or len(data) != ENTRY_HEADER.size + count * sum(
+                column.itemsize for column in columns):
+            return None
+        offset = ENTRY_HEADER.size
+        for column in columns:
+            size = count * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            offset += size
+        return stream
@@ -0,0 +1,217 @@
+# Random access to the tokens of large sources through scanner checkpoints
+
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_right
+from collections import deque
+from typing import Iterator, List, Optional, Union
+
+from src.cache import lexer_fingerprint
+from src.scanner import Checkpoint, Scanner, open_source
+from src.token_stream import TokenStream
+
+# Source between two checkpoints; a range query scans at most this much
+# before its first line
+CHECKPOINT_INTERVAL = 64 * 1024
+INDEX_SUFFIX = '.lexidx'
+# Index layout: magic, source kind (b's' for str, b'b' for bytes), tolerant
+# flag, interval, size and modification time of the source file, lexer
+# fingerprint and checkpoint count; then the offset, line, column, bracket
+# depth, line start flag and indent count columns of the checkpoints, and
+# the indentation widths of all of them in a row
+INDEX_MAGIC = b'PLXI\x01'
+INDEX_HEADER = struct.Struct('=5scBQQq64sQ')
+# Checkpoint fields stored as columns, with their typecodes; the indents
+# column holds the depth of every indentation stack
+CHECKPOINT_COLUMNS = (('offset', 'q'), ('line', 'q'), ('column', 'q'), ('paren_depth', 'q'),
+                      ('at_line_start', 'B'), ('indents', 'q'))
+
+
+def index_path(path: str) -> str:
+    """Path of the checkpoint index kept next to a source file."""
+    return path + INDEX_SUFFIX
+
+
+class CheckpointIndex:
+    """
+    Scanner checkpoints taken every interval bytes (or characters) of a
+    source, so any range of lines can be lexed without scanning from the
+    top: tokens_in_range resumes from the last checkpoint at or before its
+    first line and stops at the end of its last one.
+
+    A multi-line string crossing an interval boundary is scanned to its
+    end, so checkpoints always fall between tokens and resuming never
+    starts in the middle of a literal.
+    """
+    def __init__(self, source: Union[str, bytes], checkpoints: List[Checkpoint],
+                 interval: int = CHECKPOINT_INTERVAL, tolerant: bool = False):
+        self.source = source
+        self.checkpoints = checkpoints
+        self.interval = interval
+        self.tolerant = tolerant
+        self.lines = array('q', [checkpoint.line for checkpoint in checkpoints])
+
+    @classmethod
+    def build(cls, source: Union[str, bytes], interval: int = CHECKPOINT_INTERVAL,
+              tolerant: bool = False) -> 'CheckpointIndex':
+        """Scan source once, recording a checkpoint at the first line start after every interval."""
+        scanner = Scanner(source, tolerant)
+        checkpoints = [scanner.checkpoint()]
+        newline = '\n' if isinstance(source, str) else b'\n'
+        while True:
+            stop = source.find(newline, scanner.current + interval) + 1
+            if not stop or stop >= len(source):
+                break
+            # Only the state at the end matters; the tokens are dropped
+            deque(scanner._scan(stop=stop), maxlen=0)
+            if scanner.current >= len(source):
+                # A literal ran on to the end of a source without a final
+                # newline: there is no line start left to resume from
+                break
+            checkpoints.append(scanner.checkpoint())
+        return cls(source, checkpoints, interval, tolerant)
+
+    def __len__(self) -> int:
+        return len(self.checkpoints)
+
+    def __iter__(self) -> Iterator[Checkpoint]:
+        return iter(self.checkpoints)
+
+    def nearest(self, line: int) -> Checkpoint:
+        """Last checkpoint at or before the start of line."""
+        return self.checkpoints[max(bisect_right(self.lines, line) - 1, 0)]
+
+    def _line_offset(self, checkpoint: Checkpoint, line: int) -> Optional[int]:
+        """Offset where line starts, counted from checkpoint; None if the source ends first."""
+        source = self.source
+        newline = '\n' if isinstance(source, str) else b'\n'
+        offset = checkpoint.offset
+        for _ in range(line - checkpoint.line):
+            offset = source.find(newline, offset) + 1
+            if not offset:
+                return None
+        return offset if offset < len(source) else None
+
+    def tokens_in_range(self, line_start: int, line_end: int) -> TokenStream:
+        """
+        Tokens starting on lines line_start to line_end inclusive, the same
+        as those of a full scan. Only the source from the nearest checkpoint
+        to the end of line_end is scanned, and further when a string
+        literal runs on past it.
+        """
+        stream = TokenStream(self.source)
+        if line_end < line_start:
+            return stream
+        checkpoint = self.nearest(line_start)
+        scanner = Scanner(self.source, self.tolerant)
+        scanner.restore(checkpoint)
+        stop = self._line_offset(checkpoint, line_end + 1)
+        append = stream.append
+        for token_type, lexeme, start, line, column in scanner._scan(stop=stop):
+            if line > line_end:
+                break
+            if line >= line_start:
+                append(token_type, start, len(lexeme), line, column)
+        return stream
+
+    def save(self, path: str):
+        """Write the index next to the source file at path, which it was built from."""
+        status = os.stat(path)
+        checkpoints = self.checkpoints
+        kind = b's' if isinstance(self.source, str) else b'b'
+        parts = [INDEX_HEADER.pack(INDEX_MAGIC, kind, self.tolerant, self.interval,
+                                   status.st_size, status.st_mtime_ns,
+                                   lexer_fingerprint().encode('ascii'), len(checkpoints))]
+        for field, typecode in CHECKPOINT_COLUMNS[:-1]:
+            parts.append(array(typecode, (getattr(checkpoint, field)
+                                          for checkpoint in checkpoints)).tobytes())
+        parts.append(array('q', (len(checkpoint.indents) for checkpoint in checkpoints)).tobytes())
+        parts.append(array('q', [width for checkpoint in checkpoints
+                                 for width in checkpoint.indents]).tobytes())
+        target = index_path(path)
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(target) or '.',
+                                                 suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as index:
+                index.write(b''.join(parts))
+            os.replace(temporary, target)
+        except BaseException:
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: str, source: Union[str, bytes, None] = None) -> Optional['CheckpointIndex']:
+        """
+        Read the index kept next to the source file at path, or return None
+        if there is none or it is stale: written for a file of another size
+        or modification time, or by another version of the lexer. source is
+        the file as opened by open_source, which is called if it is omitted.
+        """
+        try:
+            with open(index_path(path), 'rb') as index:
+                data = index.read()
+            status = os.stat(path)
+        except OSError:
+            return None
+        if len(data) < INDEX_HEADER.size:
+            return None
+        (magic, kind, tolerant, interval, size, mtime, fingerprint,
+         count) = INDEX_HEADER.unpack_from(data)
+        if (magic != INDEX_MAGIC or size != status.st_size or mtime != status.st_mtime_ns
+                or fingerprint != lexer_fingerprint().encode('ascii')):
+            return None
+        columns = [array(typecode) for _, typecode in CHECKPOINT_COLUMNS]
+        widths = array('q')
+        offset = INDEX_HEADER.size + count * sum(column.itemsize for column in columns)
+        if len(data) < offset or (len(data) - offset) % widths.itemsize:
+            return None
+        offset = INDEX_HEADER.size
+        for column in columns:
+            end = offset + count * column.itemsize
+            column.frombytes(data[offset:end])
+            offset = end
+        widths.frombytes(data[offset:])
+        if len(widths) != sum(columns[-1]):
+            return None
+        if source is None:
+            source = open_source(path)
+        if kind != (b's' if isinstance(source, str) else b'b'):
+            return None
+        checkpoints = []
+        done = 0
+        for offset, line, column, depth, at_line_start, indents in zip(*columns):
+            checkpoints.append(Checkpoint(offset, line, column, depth, bool(at_line_start),
+                                          tuple(widths[done:done + indents])))
+            done += indents
+        return cls(source, checkpoints, interval, bool(tolerant))
+
+    @classmethod
+    def for_path(cls, path: str, interval: int = CHECKPOINT_INTERVAL,
+                 tolerant: bool = False) -> 'CheckpointIndex':
+        """
+        The index of the source file at path: loaded from next to the file
+        when it is up to date, or built and saved there, so only the first
+        range query on a file pays for a full scan. An index that cannot be
+        saved, in a read-only directory for instance, is still returned.
+        """
+        source = open_source(path)
+        index = cls.load(path, source)
+        if index is not None and index.interval == interval and index.tolerant == tolerant:
+            return index
+        index = cls.build(source, interval, tolerant)
+        try:
+            index.save(path)
+        except OSError:
+            pass
+        return index
+
+
+def tokens_in_range(path: str, line_start: int, line_end: int,
+                    interval: int = CHECKPOINT_INTERVAL, tolerant: bool = False) -> TokenStream:
+    """Tokens on lines line_start to line_end of a file, through its checkpoint index."""
+    return CheckpointIndex.for_path(path, interval, tolerant).tokens_in_range(line_start, line_end)
@@ -0,0 +1,145 @@
+# Thin client for the lexing daemon: python -m src.client PATH [PATH ...]
+#
+# Replaces running src/main.py per file: the source is sent to a running
+# daemon (python -m src.daemon), whose warm workers return the tokens, so
+# no lexer tables are compiled in this process.
+
+import argparse
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+from http.client import HTTPConnection
+from typing import List, Optional
+from urllib.parse import urlencode, urlsplit
+
+FORMATS = ('binary', 'json')
+# Unix socket framing. A request is the header, the JSON encoded options
+# and the source; a response is the header and the body, which holds the
+# tokens or, if the status is not STATUS_OK, a UTF-8 error message
+REQUEST_HEADER = struct.Struct('!II')    # options length, source length
+RESPONSE_HEADER = struct.Struct('!BI')   # status, body length
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+def default_socket_path() -> str:
+    """PYTHONLEXICAL_SOCKET, or a per-user socket in the runtime directory."""
+    path = os.environ.get('PYTHONLEXICAL_SOCKET')
+    if path:
+        return path
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, 'getuid') else os.getpid()
+    return os.path.join(directory, f'pythonlexical-{user}.sock')
+
+
+class DaemonError(Exception):
+    """The daemon rejected a request, e.g. because the source did not lex."""
+
+
+def _read_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        part = sock.recv(size - len(data))
+        if not part:
+            raise ConnectionError("daemon closed the connection")
+        data += part
+    return bytes(data)
+
+
+class Client:
+    """
+    Connection to a lexing daemon, reused for every request. address is the
+    path of a Unix socket or an http://host:port URL.
+    """
+    def __init__(self, address: Optional[str] = None, timeout: Optional[float] = 30.0):
+        self.address = address or default_socket_path()
+        self.timeout = timeout
+        self._socket: Optional[socket.socket] = None
+        self._http: Optional[HTTPConnection] = None
+
+    def _connect(self):
+        if self.address.startswith('http://'):
+            url = urlsplit(self.address)
+            self._http = HTTPConnection(url.hostname, url.port or 80, timeout=self.timeout)
+        else:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(self.timeout)
+            self._socket.connect(self.address)
+
+    def request(self, source: bytes, format: str = 'binary', tolerant: bool = False) -> bytes:
+        """Send one source and return the encoded tokens."""
+        if format not in FORMATS:
+            raise ValueError(f"unknown format {format!r}; expected one of {FORMATS}")
+        if self._socket is None and self._http is None:
+            self._connect()
+        if self._http is not None:
+            query = urlencode({'format': format, 'tolerant': int(tolerant)})
+            self._http.request('POST', f'/lex?{query}', body=source)
+            response = self._http.getresponse()
+            body = response.read()
+            if response.status != 200:
+                raise DaemonError(body.decode('utf-8', 'replace'))
+            return body
+        options = json.dumps({'format': format, 'tolerant': tolerant}).encode()
+        self._socket.sendall(REQUEST_HEADER.pack(len(options), len(source)) + options + source)
+        status, length = RESPONSE_HEADER.unpack(_read_exactly(self._socket, RESPONSE_HEADER.size))
+        body = _read_exactly(self._socket, length)
+        if status != STATUS_OK:
+            raise DaemonError(body.decode('utf-8', 'replace'))
+        return body
+
+    def lex(self, source: bytes, tolerant: bool = False) -> list:
+        """Lex a source in the daemon and return its tokens."""
+        from src.serialization import loads
+        return loads(self.request(source, 'binary', tolerant))
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+    def __enter__(self) -> 'Client':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.client",
+                                     description="Lex files with a running lexing daemon.")
+    parser.add_argument("paths", nargs="+", help="files to lex")
+    parser.add_argument("--address", default=None,
+                        help="daemon Unix socket path or http://host:port URL "
+                             "(default: $PYTHONLEXICAL_SOCKET or a per-user socket)")
+    parser.add_argument("--json", action="store_true",
+                        help="print the daemon's JSON output instead of one token per line")
+    parser.add_argument("--tolerant", action="store_true",
+                        help="turn lexical errors into ERROR tokens instead of failing")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    with Client(args.address) as client:
+        for path in args.paths:
+            try:
+                with open(path, 'rb') as source:
+                    data = source.read()
+                if args.json:
+                    print(client.request(data, 'json', args.tolerant).decode())
+                    continue
+                for token in client.lex(data, args.tolerant):
+                    print(token)
+            except (OSError, DaemonError) as error:
+                print(f"{path}: error: {error}", file=sys.stderr)
+                failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+# Local lexing daemon: python -m src.daemon [--socket PATH | --http HOST:PORT]
+#
+# Keeps a pool of warm worker processes, whose patterns are compiled once,
+# and serves lexing requests over a Unix socket or localhost HTTP. Requests
+# that arrive while every worker is busy are lexed together in one job, so
+# small files share a single round trip to the pool.
+
+import argparse
+import json
+import os
+import queue
+import socketserver
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from src.client import (
+    FORMATS, REQUEST_HEADER, RESPONSE_HEADER, STATUS_ERROR, STATUS_OK, default_socket_path
+)
+from src.main import LexicalAnalyzer
+from src.pattern_matcher import MAX_DIAGNOSTICS, LexicalError
+from src.scanner import detect_encoding
+from src.serialization import dumps
+
+# Most requests lexed in one pool job, and most source bytes per job
+MAX_BATCH = 64
+MAX_BATCH_BYTES = 1024 * 1024
+DEFAULT_HTTP_PORT = 8765
+
+# (source, format, tolerant, max_diagnostics)
+Request = Tuple[bytes, str, bool, int]
+# (ok, body): encoded tokens, or an error message
+Response = Tuple[bool, bytes]
+
+
+def decode_source(source: bytes) -> str:
+    """Decode an uploaded source as UTF-8, or as its BOM or PEP 263 cookie declares."""
+    encoding = detect_encoding(source[:1024])
+    # utf-8-sig also drops the BOM
+    return source.decode('utf-8-sig' if encoding == 'utf-8' else encoding)
+
+
+def lex_request(source: bytes, format: str = 'binary', tolerant: bool = False,
+                max_diagnostics: int = MAX_DIAGNOSTICS) -> Response:
+    """Lex one source and encode its tokens in the requested format."""
+    try:
+        text = decode_source(source)
+    except (LookupError, UnicodeDecodeError) as error:
+        return False, f"cannot decode source: {error}".encode()
+    try:
+        analyzer = LexicalAnalyzer(text, tolerant=tolerant, max_diagnostics=max_diagnostics)
+        stream = analyzer.token_stream()
+    except LexicalError as error:
+        return False, str(error).encode()
+    if format == 'binary':
+        return True, dumps(stream)
+    document = {'tokens': [[token.type.name, token.value, token.line, token.column]
+                           for token in stream]}
+    if tolerant:
+        document['diagnostics'] = [str(error) for error in analyzer.diagnostics]
+    return True, json.dumps(document, ensure_ascii=False).encode()
+
+
+def lex_requests(requests: List[Request]) -> List[Response]:
+    """
+    Worker job: lex a batch of requests. A request that fails unexpectedly,
+    while encoding its tokens for instance, gets an error response of its
+    own instead of failing the others in the batch.
+    """
+    responses = []
+    for request in requests:
+        try:
+            responses.append(lex_request(*request))
+        except Exception as error:
+            responses.append((False, f"internal error: {type(error).__name__}: {error}".encode()))
+    return responses
+
+
+def _warm_up():
+    """Worker initializer: run every code path once before the first request."""
+    lex_request(b"def f(x):\n    return x + 1\n", 'json', True)
+
+
+class LexDaemon:
+    """
+    Dispatches lexing requests to a pool of warm worker processes.
+
+    A dispatcher thread takes the queued requests in order; once a worker
+    is free it sends every request waiting at that moment (up to MAX_BATCH
+    requests or MAX_BATCH_BYTES) as one job. Idle, a request is sent on its
+    own straight away; under load the queue fills up while the workers are
+    busy and requests are batched without waiting for a timer.
+
+    With workers=0 requests are lexed on the dispatcher thread itself.
+    Tolerant requests keep at most max_diagnostics errors each.
+    """
+    def __init__(self, workers: Optional[int] = None, max_batch: int = MAX_BATCH,
+                 max_batch_bytes: int = MAX_BATCH_BYTES, max_diagnostics: int = MAX_DIAGNOSTICS):
+        if workers == 0:
+            self.pool = None
+            slots = 1
+        else:
+            slots = workers or os.cpu_count() or 1
+            self.pool = ProcessPoolExecutor(slots, initializer=_warm_up)
+            # Start the workers now rather than on the first request
+            self.pool.submit(len, b'').result()
+        self.max_batch = max_batch
+        self.max_batch_bytes = max_batch_bytes
+        self.max_diagnostics = max_diagnostics
+        self._queue: "queue.Queue[Optional[Tuple[Request, Future]]]" = queue.Queue()
+        self._slots = threading.Semaphore(slots)
+        self._dispatcher = threading.Thread(target=self._dispatch, name="lex-dispatcher",
+                                            daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, source: bytes, format: str = 'binary', tolerant: bool = False) -> Future:
+        """Queue a request; the future resolves to an (ok, body) Response."""
+        if format not in FORMATS:
+            raise ValueError(f"unknown format {format!r}; expected one of {FORMATS}")
+        future: Future = Future()
+        self._queue.put(((source, format, tolerant, self.max_diagnostics), future))
+        return future
+
+    def lex(self, source: bytes, format: str = 'binary', tolerant: bool = False) -> Response:
+        return self.submit(source, format, tolerant).result()
+
+    def _dispatch(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self._slots.acquire()
+            batch = [item]
+            size = len(item[0][0])
+            while len(batch) < self.max_batch and size < self.max_batch_bytes:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+                size += len(item[0][0])
+            requests = [request for request, _ in batch]
+            futures = [future for _, future in batch]
+            if self.pool is None:
+                done: Future = Future()
+                try:
+                    done.set_result(lex_requests(requests))
+                except Exception as error:
+                    done.set_exception(error)
+                self._deliver(futures, done)
+            else:
+                job = self.pool.submit(lex_requests, requests)
+                job.add_done_callback(lambda job, futures=futures: self._deliver(futures, job))
+
+    def _deliver(self, futures: List[Future], job: Future):
+        self._slots.release()
+        error = job.exception()
+        if error is not None:
+            for future in futures:
+                future.set_exception(error)
+            return
+        for future, response in zip(futures, job.result()):
+            future.set_result(response)
+
+    def close(self):
+        """Finish the queued requests and stop the workers."""
+        self._queue.put(None)
+        self._dispatcher.join()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def __enter__(self) -> 'LexDaemon':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _UnixHandler(socketserver.StreamRequestHandler):
+    """Serves framed requests until the client disconnects."""
+    def handle(self):
+        lexer: LexDaemon = self.server.lexer
+        while True:
+            header = self.rfile.read(REQUEST_HEADER.size)
+            if len(header) < REQUEST_HEADER.size:
+                return
+            options_length, source_length = REQUEST_HEADER.unpack(header)
+            options = self.rfile.read(options_length)
+            source = self.rfile.read(source_length)
+            try:
+                options = json.loads(options or b'{}')
+                if not isinstance(options, dict):
+                    raise ValueError("request options must be a JSON object")
+                ok, body = lexer.lex(source, options.get('format', 'binary'),
+                                     bool(options.get('tolerant', False)))
+            except ValueError as error:
+                ok, body = False, str(error).encode()
+            self.wfile.write(RESPONSE_HEADER.pack(STATUS_OK if ok else STATUS_ERROR, len(body)) + body)
+
+
+class UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, lexer: LexDaemon):
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, _UnixHandler)
+        self.lexer = lexer
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    """POST /lex?format=binary|json&tolerant=0|1 with the source as body."""
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this every reply
+    # waits for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/lex':
+            return self._reply(404, b'not found\n')
+        query = parse_qs(url.query)
+        format = query.get('format', ['binary'])[0]
+        tolerant = query.get('tolerant', ['0'])[0] not in ('0', 'false', '')
+        source = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            ok, body = self.server.lexer.lex(source, format, tolerant)
+        except ValueError as error:
+            ok, body = False, str(error).encode()
+        content_type = 'application/json' if format == 'json' else 'application/octet-stream'
+        self._reply(200 if ok else 400, body, content_type if ok else 'text/plain; charset=utf-8')
+
+    def do_GET(self):
+        if urlsplit(self.path).path != '/health':
+            return self._reply(404, b'not found\n')
+        self._reply(200, b'ok\n')
+
+    def _reply(self, status: int, body: bytes, content_type: str = 'text/plain; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HTTPServer(ThreadingHTTPServer):
+    def __init__(self, host: str, port: int, lexer: LexDaemon):
+        super().__init__((host, port), _HTTPHandler)
+        self.lexer = lexer
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.daemon",
+                                     description="Serve lexing requests from warm worker processes.")
+    parser.add_argument("--socket", default=None,
+                        help="Unix socket to listen on (default: $PYTHONLEXICAL_SOCKET "
+                             "or a per-user socket)")
+    parser.add_argument("--http", default=None, metavar="HOST:PORT",
+                        help=f"listen on HTTP instead, e.g. 127.0.0.1:{DEFAULT_HTTP_PORT}")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU, 0 to lex in the daemon)")
+    parser.add_argument("--max-diagnostics", type=int, default=MAX_DIAGNOSTICS,
+                        help=f"errors kept per tolerant request (default: {MAX_DIAGNOSTICS})")
+    args = parser.parse_args(argv)
+
+    with LexDaemon(args.workers, max_diagnostics=args.max_diagnostics) as daemon:
+        if args.http:
+            host, _, port = args.http.rpartition(':')
+            server = HTTPServer(host or '127.0.0.1', int(port or DEFAULT_HTTP_PORT), daemon)
+            address = f"http://{server.server_address[0]}:{server.server_address[1]}"
+        else:
+            server = UnixServer(args.socket or default_socket_path(), daemon)
+            address = server.server_address
+        print(f"listening on {address}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,433 @@
+# Table-driven lexer generated from the token definitions
+#
+# The token rules are written in a small regular expression dialect and
+# compiled into one deterministic automaton: Thompson construction, subset
+# construction over character classes, then flattening into arrays. The
+# alphabet is the 128 ASCII characters plus one symbol, written \x80, that
+# stands for every non-ASCII character (or UTF-8 byte of a bytes source).
+
+import hashlib
+import os
+import re
+import struct
+import tempfile
+from array import array
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from src.token_definitions import TokenType, KEYWORDS, OPERATORS, DELIMITERS
+from src.pattern_matcher import IDENTIFIER_REGEX, NUMBER_REGEX, STRING_START_REGEX
+from src.scanner import Scanner
+
+# Bumped whenever the generator or the table layout changes
+GENERATOR_VERSION = 1
+NON_ASCII = 128
+ALPHABET_SIZE = 129
+DEAD = -1
+TABLE_MAGIC = b'PLXD'
+TABLE_HEADER = struct.Struct('=4sIII')
+
+
+class Rule(NamedTuple):
+    """One token rule: the master pattern group it stands for, its type and its pattern."""
+    kind: str
+    token_type: Optional[TokenType]
+    pattern: str
+
+
+def default_spec() -> Tuple[Rule, ...]:
+    """
+    The lexer's token rules, highest priority first. When two rules match
+    the same longest lexeme, the earlier one wins, so keywords come before
+    identifiers. Identifier candidates with non-ASCII characters are checked
+    against the full Unicode identifier rule when they are matched.
+    As in the master pattern, strings and comments are only matched up to
+    their opening quotes and '#'; the scanner finds where they end.
+    """
+    rules = [Rule('IDENTIFIER', token_type, re.escape(keyword))
+             for keyword, token_type in KEYWORDS.items()]
+    rules += [Rule('OPERATOR', token_type, re.escape(symbol))
+              for symbol, token_type in {**OPERATORS, **DELIMITERS}.items()]
+    rules += [
+        Rule('IDENTIFIER', TokenType.IDENTIFIER, r'[A-Za-z_\x80][A-Za-z0-9_\x80]*'),
+        Rule('NUMBER', TokenType.NUMBER, NUMBER_REGEX),
+        Rule('STRING', TokenType.STRING, STRING_START_REGEX),
+        Rule('COMMENT', TokenType.COMMENT, '#'),
+        Rule('NEWLINE', TokenType.NEWLINE, r'\r?\n'),
+        Rule('CONTINUATION', None, r'\\\r?\n'),
+    ]
+    return tuple(rules)
+
+
+def spec_hash(spec: Tuple[Rule, ...]) -> str:
+    """Hash identifying the tables generated for a spec."""
+    digest = hashlib.sha256(f"generator {GENERATOR_VERSION}\n".encode('ascii'))
+    for rule in spec:
+        token_type = rule.token_type.name if rule.token_type else ''
+        digest.update(f"{rule.kind}\0{token_type}\0{rule.pattern}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+# --- Regular expressions to NFA -------------------------------------------
+
+class _NFA:
+    """States are indices; each has symbol-set edges and epsilon edges."""
+    def __init__(self):
+        self.edges: List[List[Tuple[FrozenSet[int], int]]] = []
+        self.epsilon: List[List[int]] = []
+
+    def state(self) -> int:
+        self.edges.append([])
+        self.epsilon.append([])
+        return len(self.edges) - 1
+
+
+_ESCAPES = {'n': '\n', 'r': '\r', 't': '\t', 'f': '\f'}
+_EVERYTHING = frozenset(range(ALPHABET_SIZE))
+
+
+class _Parser:
+    """
+    Recursive descent parser for the pattern dialect: literals, escapes,
+    '.', character classes with ranges and negation, groups (including
+    '(?:'), alternation and the * + ? quantifiers. Each parse method
+    returns a (start, end) pair of NFA states.
+    """
+    def __init__(self, nfa: _NFA, pattern: str):
+        self.nfa = nfa
+        self.pattern = pattern
+        self.pos = 0
+
+    def parse(self) -> Tuple[int, int]:
+        fragment = self._alternation()
+        if self.pos != len(self.pattern):
+            raise ValueError(f"unexpected {self.pattern[self.pos]!r} in pattern {self.pattern!r}")
+        return fragment
+
+    def _peek(self) -> str:
+        return self.pattern[self.pos] if self.pos < len(self.pattern) else ''
+
+    def _alternation(self) -> Tuple[int, int]:
+        branches = [self._sequence()]
+        while self._peek() == '|':
+            self.pos += 1
+            branches.append(self._sequence())
+        if len(branches) == 1:
+            return branches[0]
+        start, end = self.nfa.state(), self.nfa.state()
+        for branch_start, branch_end in branches:
+            self.nfa.epsilon[start].append(branch_start)
+            self.nfa.epsilon[branch_end].append(end)
+        return start, end
+
+    def _sequence(self) -> Tuple[int, int]:
+        start = end = self.nfa.state()
+        while self._peek() not in ('', '|', ')'):
+            item_start, item_end = self._quantified()
+            self.nfa.epsilon[end].append(item_start)
+            end = item_end
+        return start, end
+
+    def _quantified(self) -> Tuple[int, int]:
+        start, end = self._atom()
+        while self._peek() in ('*', '+', '?'):
+            quantifier = self._peek()
+            self.pos += 1
+            outer_start, outer_end = self.nfa.state(), self.nfa.state()
+            self.nfa.epsilon[outer_start].append(start)
+            self.nfa.epsilon[end].append(outer_end)
+            if quantifier != '+':
+                self.nfa.epsilon[outer_start].append(outer_end)
+            if quantifier != '?':
+                self.nfa.epsilon[end].append(start)
+            start, end = outer_start, outer_end
+        return start, end
+
+    def _atom(self) -> Tuple[int, int]:
+        char = self._peek()
+        if char == '(':
+            self.pos += 1
+            if self.pattern.startswith('?:', self.pos):
+                self.pos += 2
+            fragment = self._alternation()
+            if self._peek() != ')':
+                raise ValueError(f"unbalanced parenthesis in pattern {self.pattern!r}")
+            self.pos += 1
+            return fragment
+        if char == '[':
+            symbols = self._class()
+        elif char == '.':
+            self.pos += 1
+            symbols = _EVERYTHING - {ord('\n')}
+        else:
+            symbols = frozenset([self._symbol()])
+        start, end = self.nfa.state(), self.nfa.state()
+        self.nfa.edges[start].append((symbols, end))
+        return start, end
+
+    def _symbol(self) -> int:
+        """One literal character, possibly escaped."""
+        char = self.pattern[self.pos]
+        self.pos += 1
+        if char == '\\':
+            char = self.pattern[self.pos]
+            self.pos += 1
+            if char == 'x':
+                char = chr(int(self.pattern[self.pos:self.pos + 2], 16))
+                self.pos += 2
+            else:
+                char = _ESCAPES.get(char, char)
+        return min(ord(char), NON_ASCII)
+
+    def _class(self) -> FrozenSet[int]:
+        self.pos += 1
+        negated = self._peek() == '^'
+        if negated:
+            self.pos += 1
+        symbols = set()
+        while self._peek() != ']':
+            if not self._peek():
+                raise ValueError(f"unterminated class in pattern {self.pattern!r}")
+            low = self._symbol()
+            if self._peek() == '-' and self.pattern[self.pos + 1] != ']':
+                self.pos += 1
+                symbols.update(range(low, self._symbol() + 1))
+            else:
+                symbols.add(low)
+        self.pos += 1
+        return _EVERYTHING - symbols if negated else frozenset(symbols)
+
+
+# --- NFA to DFA ---------------------------------------------------------------
+
+class DFATables:
+    """
+    Flat lexer tables. classes maps each alphabet symbol to its character
+    class; the successor of state s on class c is transitions[s * class_count + c]
+    (DEAD if there is none); accepts[s] is the index of the rule recognised
+    in state s, or -1. State 0 is the start state.
+    """
+    def __init__(self, spec: Tuple[Rule, ...], classes: array, transitions: array, accepts: array):
+        self.spec = spec
+        self.classes = classes
+        self.transitions = transitions
+        self.accepts = accepts
+        self.class_count = max(classes) + 1
+
+    @property
+    def state_count(self) -> int:
+        return len(self.accepts)
+
+    def to_bytes(self) -> bytes:
+        header = TABLE_HEADER.pack(TABLE_MAGIC, len(self.classes), len(self.transitions),
+                                   len(self.accepts))
+        return header + self.classes.tobytes() + self.transitions.tobytes() + self.accepts.tobytes()
+
+    @classmethod
+    def from_bytes(cls, spec: Tuple[Rule, ...], data: bytes) -> Optional['DFATables']:
+        """Tables saved by to_bytes, or None if data is not a complete table file."""
+        if len(data) < TABLE_HEADER.size:
+            return None
+        magic, class_size, transition_size, accept_size = TABLE_HEADER.unpack_from(data)
+        classes, transitions, accepts = array('B'), array('i'), array('i')
+        sizes = (class_size * classes.itemsize, transition_size * transitions.itemsize,
+                 accept_size * accepts.itemsize)
+        if magic != TABLE_MAGIC or len(data) != TABLE_HEADER.size + sum(sizes):
+            return None
+        offset = TABLE_HEADER.size
+        for column, size in zip((classes, transitions, accepts), sizes):
+            column.frombytes(data[offset:offset + size])
+            offset += size
+        return cls(spec, classes, transitions, accepts)
+
+
+def build_tables(spec: Tuple[Rule, ...]) -> DFATables:
+    """Compile a spec into DFA tables."""
+    nfa = _NFA()
+    start = nfa.state()
+    # NFA accepting state -> rule index
+    finals: Dict[int, int] = {}
+    for index, rule in enumerate(spec):
+        rule_start, rule_end = _Parser(nfa, rule.pattern).parse()
+        nfa.epsilon[start].append(rule_start)
+        finals[rule_end] = index
+
+    # Symbols that no edge tells apart share a character class
+    signatures: Dict[Tuple, int] = {}
+    edge_sets = sorted({symbols for edges in nfa.edges for symbols, _ in edges}, key=sorted)
+    classes = array('B')
+    for symbol in range(ALPHABET_SIZE):
+        signature = tuple(symbol in symbols for symbols in edge_sets)
+        classes.append(signatures.setdefault(signature, len(signatures)))
+    class_count = len(signatures)
+    representatives = {}
+    for symbol, symbol_class in enumerate(classes):
+        representatives.setdefault(symbol_class, symbol)
+
+    def closure(states) -> FrozenSet[int]:
+        stack, seen = list(states), set(states)
+        while stack:
+            for target in nfa.epsilon[stack.pop()]:
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return frozenset(seen)
+
+    initial = closure([start])
+    numbering = {initial: 0}
+    pending = [initial]
+    transitions = array('i')
+    accepts = array('i')
+    while pending:
+        current = pending.pop(0)
+        rules = [finals[state] for state in current if state in finals]
+        accepts.append(min(rules) if rules else -1)
+        for symbol_class in range(class_count):
+            symbol = representatives[symbol_class]
+            targets = [target for state in current for symbols, target in nfa.edges[state]
+                       if symbol in symbols]
+            if not targets:
+                transitions.append(DEAD)
+                continue
+            successor = closure(targets)
+            if successor not in numbering:
+                numbering[successor] = len(numbering)
+                pending.append(successor)
+            transitions.append(numbering[successor])
+    return DFATables(spec, classes, transitions, accepts)
+
+
+# --- Table cache ----------------------------------------------------------------
+
+def default_cache_dir() -> str:
+    """Directory for generated tables: $PYTHONLEXICAL_CACHE_DIR, else under the user cache directory."""
+    directory = os.environ.get('PYTHONLEXICAL_CACHE_DIR')
+    if directory:
+        return directory
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pythonlexical')
+
+
+def load_tables(spec: Optional[Tuple[Rule, ...]] = None,
+                cache_dir: Optional[str] = None) -> DFATables:
+    """
+    Return the tables for a spec (the default spec if None), reading them
+    from the cache directory when they were generated before and writing
+    them there otherwise. An unusable cache directory only costs the build.
+    """
+    spec = default_spec() if spec is None else spec
+    directory = default_cache_dir() if cache_dir is None else cache_dir
+    path = os.path.join(directory, f"dfa-{spec_hash(spec)}.bin")
+    try:
+        with open(path, 'rb') as table_file:
+            tables = DFATables.from_bytes(spec, table_file.read())
+        if tables is not None:
+            return tables
+    except OSError:
+        pass
+    tables = build_tables(spec)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as table_file:
+            table_file.write(tables.to_bytes())
+        os.replace(temporary, path)
+    except OSError:
+        pass
+    return tables
+
+
+# --- Matching ---------------------------------------------------------------------
+
+class DFAMatch:
+    """The parts of re.Match the scanner uses, for a match found by DFAPattern."""
+    __slots__ = ('lastgroup', 'string', '_start', '_end')
+
+    def __init__(self, kind: str, string, start: int, end: int):
+        self.lastgroup = kind
+        self.string = string
+        self._start = start
+        self._end = end
+
+    def start(self, group=None) -> int:
+        return self._start
+
+    def end(self, group=None) -> int:
+        return self._end
+
+    def group(self, group=None):
+        return self.string[self._start:self._end]
+
+
+class DFAPattern:
+    """
+    Drop-in replacement for the master pattern driven by DFA tables. Like
+    the master pattern, match() skips blanks before the token and reports
+    the group the token belongs to; the automaton is run for the longest
+    lexeme any rule accepts (maximal munch), so '**' wins over '*' and
+    '+=' over '+'.
+    """
+    def __init__(self, tables: DFATables):
+        self.tables = tables
+        self.kinds = [rule.kind for rule in tables.spec]
+        self.token_types = [rule.token_type for rule in tables.spec]
+        # Class of every byte value (0x80-0xff stand for non-ASCII text) and
+        # of every ASCII character; other characters are non-ASCII text
+        self.non_ascii = tables.classes[NON_ASCII]
+        self.byte_classes = {code: tables.classes[min(code, NON_ASCII)] for code in range(256)}
+        self.char_classes = {chr(code): tables.classes[code] for code in range(NON_ASCII)}
+        self.identifier = re.compile(IDENTIFIER_REGEX)
+
+    def match(self, source, pos: int = 0, end: Optional[int] = None) -> Optional[DFAMatch]:
+        if end is None:
+            end = len(source)
+        text = isinstance(source, str)
+        blanks = ' \t\f' if text else b' \t\f'
+        while pos < end and source[pos:pos + 1] in blanks:
+            pos += 1
+        if pos == end:
+            return DFAMatch('WHITESPACE', source, pos, pos)
+        transitions = self.tables.transitions
+        accepts = self.tables.accepts
+        class_count = self.tables.class_count
+        classes = (self.char_classes if text else self.byte_classes).get
+        non_ascii = self.non_ascii
+
+        state = 0
+        accepted = -1
+        accepted_end = index = pos
+        while index < end:
+            state = transitions[state * class_count + classes(source[index], non_ascii)]
+            if state == DEAD:
+                break
+            index += 1
+            rule = accepts[state]
+            if rule >= 0:
+                accepted, accepted_end = rule, index
+        if accepted < 0:
+            return None
+        kind = self.kinds[accepted]
+        if text and kind == 'IDENTIFIER' and not source[pos:accepted_end].isascii():
+            # Non-ASCII identifiers follow the Unicode rules of the regex
+            identifier = self.identifier.match(source, pos, end)
+            if identifier is None:
+                return None
+            accepted_end = identifier.end()
+        return DFAMatch(kind, source, pos, accepted_end)
+
+
+_DEFAULT_PATTERN: Optional[DFAPattern] = None
+
+
+def default_pattern() -> DFAPattern:
+    """DFAPattern for the default spec, generated or loaded on first use."""
+    global _DEFAULT_PATTERN
+    if _DEFAULT_PATTERN is None:
+        _DEFAULT_PATTERN = DFAPattern(load_tables())
+    return _DEFAULT_PATTERN
+
+
+class DFAScanner(Scanner):
+    """Scanner whose tokens are recognised by the generated DFA instead of the master regex."""
+    def __init__(self, source, pattern: Optional[DFAPattern] = None, **options):
+        super().__init__(source, **options)
+        self.master_pattern = self.master_pattern_bytes = pattern or default_pattern()
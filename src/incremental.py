@@ -0,0 +1,150 @@
+# Incremental re-lexing of edited sources
+
+from bisect import bisect_left
+from typing import List, Tuple
+
+from src.scanner import Scanner, TAB_SIZE
+from src.token_definitions import TokenType
+from src.token_stream import TokenStream, TYPE_CODES
+
+NEWLINE_CODE = TYPE_CODES[TokenType.NEWLINE]
+INDENT_CODE = TYPE_CODES[TokenType.INDENT]
+DEDENT_CODE = TYPE_CODES[TokenType.DEDENT]
+
+
+def _restart_index(stream: TokenStream, offset: int) -> int:
+    """
+    Index of the first token of the logical line containing offset: the
+    token right after the last NEWLINE that ends at or before offset.
+    A NEWLINE is only emitted outside brackets, so scanning can resume
+    there from a clean state.
+    """
+    codes = stream.types.tobytes()
+    newline = bytes([NEWLINE_CODE])
+    index = stream._bisect_starts(offset)
+    while True:
+        index = codes.rfind(newline, 0, index)
+        if index < 0 or stream._start(index) + stream.lengths[index] <= offset:
+            return index + 1
+
+
+def _indent_stack(stream: TokenStream, index: int) -> List[int]:
+    """Indentation widths open before token index, walking back over INDENT/DEDENT tokens."""
+    codes = stream.types.tobytes()
+    indent, dedent = bytes([INDENT_CODE]), bytes([DEDENT_CODE])
+    depth = codes.count(indent, 0, index) - codes.count(dedent, 0, index)
+    widths: List[int] = []
+    pending = 0
+    position = index
+    while len(widths) < depth:
+        position = max(codes.rfind(indent, 0, position), codes.rfind(dedent, 0, position))
+        if stream.types[position] == DEDENT_CODE:
+            pending += 1
+        elif pending:
+            pending -= 1
+        else:
+            widths.append(len(stream.value_at(position).expandtabs(TAB_SIZE)))
+    return [0] + widths[::-1]
+
+
+def _relex(previous: TokenStream, edit_offset: int, removed_len: int,
+           inserted_text: str) -> Tuple[TokenStream, int]:
+    """relex() that also returns the number of tokens scanned again."""
+    old_source = previous.source
+    source = old_source[:edit_offset] + inserted_text + old_source[edit_offset + removed_len:]
+    delta = len(inserted_text) - removed_len
+    edit_end = edit_offset + len(inserted_text)
+
+    restart = _restart_index(previous, edit_offset)
+    # The old tokens from restart on are now stored short of their true
+    # offsets and lines by the same amounts
+    previous._move_shift(restart)
+    old_start_shift, old_line_shift = previous._shift_starts, previous._shift_lines
+    scanner = Scanner(source)
+    if restart:
+        scanner.current = previous._start(restart - 1) + previous.lengths[restart - 1]
+        scanner.line = previous._line(restart - 1) + 1
+        scanner.indents = _indent_stack(previous, restart)
+
+    # Old indentation stack, replayed alongside the new tokens to detect
+    # the point where both scans are in the same state again
+    old_indents = list(scanner.indents)
+    old_index = restart
+    old_starts = previous._starts
+
+    middle = TokenStream(source)
+    resume = len(previous)
+    line_delta = 0
+    for token_type, lexeme, start, line, column in scanner._scan():
+        middle.append(token_type, start, len(lexeme), line, column)
+        if token_type is not TokenType.NEWLINE or start < edit_end:
+            continue
+        # Candidate sync point: an old NEWLINE at the same shifted offset
+        # with the same indentation stack behind it
+        old_start = start - delta - old_start_shift
+        match = bisect_left(old_starts, old_start, old_index)
+        if match >= resume or old_starts[match] != old_start:
+            continue
+        if previous.types[match] != NEWLINE_CODE:
+            continue
+        for position in range(old_index, match):
+            code = previous.types[position]
+            if code == INDENT_CODE:
+                old_indents.append(len(previous.value_at(position).expandtabs(TAB_SIZE)))
+            elif code == DEDENT_CODE:
+                old_indents.pop()
+        old_index = match
+        if old_indents == scanner.indents:
+            resume = match + 1
+            line_delta = line - previous._lines[match] - old_line_shift
+            break
+
+    # The reused tokens are copied as they are; the offsets and lines of
+    # those after the edit are shifted lazily, so an edit costs no work per
+    # token after it
+    stream = TokenStream(source)
+    for name in ('types', '_starts', 'lengths', '_lines', 'columns'):
+        old = getattr(previous, name)
+        setattr(stream, name, old[:restart] + getattr(middle, name) + old[resume:])
+    stream._shift_index = restart + len(middle)
+    stream._shift_starts = old_start_shift + delta
+    stream._shift_lines = old_line_shift + line_delta
+    # Decoded numbers and symbol ids of the reused tokens are kept; only the
+    # rescanned tokens are decoded and interned
+    if previous._numbers is not None:
+        stream._numbers = previous._numbers.replace(restart, resume, middle.numbers, len(middle))
+    if previous._symbol_ids is not None:
+        middle._symbols = previous._symbols
+        stream._symbols = previous._symbols
+        stream._symbol_ids = (previous._symbol_ids[:restart] + middle.symbol_ids
+                              + previous._symbol_ids[resume:])
+    return stream, len(middle)
+
+
+def relex(previous: TokenStream, edit_offset: int, removed_len: int,
+          inserted_text: str) -> TokenStream:
+    """
+    Update a token stream for an edit that replaces removed_len characters
+    at edit_offset with inserted_text. Scanning resumes at the start of the
+    logical line containing the edit and stops at the first NEWLINE after
+    it where the new tokens line up with the old ones again; the old tokens
+    from there on are reused with their offsets and lines shifted.
+    """
+    return _relex(previous, edit_offset, removed_len, inserted_text)[0]
+
+
+class IncrementalLexer:
+    """Keeps the token stream of an editor buffer up to date across edits."""
+    def __init__(self, source: str):
+        self.tokens = Scanner(source).scan_token_stream()
+        # Tokens scanned again by the most recent edit
+        self.last_rescanned = len(self.tokens)
+
+    @property
+    def source(self) -> str:
+        return self.tokens.source
+
+    def edit(self, offset: int, removed_len: int, inserted_text: str) -> TokenStream:
+        """Apply an edit and return the updated tokens."""
+        self.tokens, self.last_rescanned = _relex(self.tokens, offset, removed_len, inserted_text)
+        return self.tokens
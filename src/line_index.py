@@ -0,0 +1,107 @@
+# Mapping between source offsets and line/column positions
+
+from array import array
+from bisect import bisect_right
+from typing import Tuple, Union
+
+from src.token_definitions import Position
+
+
+class LineIndex:
+    """
+    Offsets at which every line of a source starts, found with one bulk
+    find() per line. Any offset is mapped to its (line, column) with a
+    binary search, so positions can be worked out on demand instead of
+    being tracked character by character. Lines and columns are 1-based;
+    for a UTF-8 bytes source offsets count bytes and columns characters.
+    """
+    def __init__(self, source: Union[str, bytes]):
+        self.source = source
+        newline = '\n' if isinstance(source, str) else b'\n'
+        starts = array('q', [0])
+        find = source.find
+        append = starts.append
+        index = find(newline)
+        while index >= 0:
+            append(index + 1)
+            index = find(newline, index + 1)
+        self.starts = starts
+
+    def __len__(self) -> int:
+        """Number of lines; text after the last newline counts as a line."""
+        return len(self.starts)
+
+    def line_of(self, offset: int) -> int:
+        """Line containing offset."""
+        return bisect_right(self.starts, offset)
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        """(line, column) of offset."""
+        line = bisect_right(self.starts, offset)
+        line_start = self.starts[line - 1]
+        if isinstance(self.source, str):
+            return line, offset - line_start + 1
+        return line, len(self.source[line_start:offset].decode('utf-8', 'replace')) + 1
+
+    def offset(self, line: int, column: int) -> int:
+        """
+        Offset of a (line, column) position; columns past the end of the
+        line are clamped to its line ending, or to the end of the source on
+        the last line.
+        """
+        if not 1 <= line <= len(self.starts):
+            raise IndexError(f"line {line} out of range")
+        line_start = self.starts[line - 1]
+        line_end = self.starts[line] if line < len(self.starts) else len(self.source)
+        ending = self.source[max(line_start, line_end - 2):line_end]
+        if ending.endswith('\r\n' if isinstance(ending, str) else b'\r\n'):
+            line_end -= 2
+        elif ending.endswith('\n' if isinstance(ending, str) else b'\n'):
+            line_end -= 1
+        if isinstance(self.source, str):
+            return min(line_start + column - 1, line_end)
+        text = self.source[line_start:line_end].decode('utf-8', 'replace')
+        return line_start + len(text[:column - 1].encode('utf-8'))
+
+    def line_text(self, line: int) -> str:
+        """Text of a line without its line ending, for diagnostics."""
+        line_start = self.starts[line - 1]
+        line_end = self.starts[line] if line < len(self.starts) else len(self.source)
+        text = self.source[line_start:line_end]
+        if not isinstance(text, str):
+            text = text.decode('utf-8', 'replace')
+        return text.rstrip('\r\n')
+
+    def make_position(self, offset: int, filename: str = "<unknown>") -> 'LazyPosition':
+        """Position of offset, with its line and column resolved on first access."""
+        return LazyPosition(self, offset, filename)
+
+
+class LazyPosition(Position):
+    """A Position known by its offset whose line and column come from a LineIndex when read."""
+    def __init__(self, line_index: LineIndex, index: int, filename: str = "<unknown>"):
+        self.line_index = line_index
+        self.index = index
+        self.filename = filename
+        self._line_column = None
+
+    def _resolve(self) -> list:
+        if self._line_column is None:
+            self._line_column = list(self.line_index.position(self.index))
+        return self._line_column
+
+    @property
+    def line(self) -> int:
+        return self._resolve()[0]
+
+    @line.setter
+    def line(self, value: int):
+        self._resolve()[0] = value
+
+    @property
+    def column(self) -> int:
+        return self._resolve()[1]
+
+    @column.setter
+    def column(self, value: int):
+        self._resolve()[1] = value
@@ -1,20 +1,99 @@
 # Main lexical analyzer that integrates all components
 
-from src.token_definitions import Token, TokenType
-from src.scanner import Scanner
-from src.pattern_matcher import PatternMatcher
+import time
+from typing import IO, TYPE_CHECKING, Callable, Iterator, Optional, Sized, TypeVar, Union
+from src.token_definitions import Token
+from src.scanner import Scanner, read_chunks, open_source, CHUNK_SIZE
+from src.pattern_matcher import MAX_DIAGNOSTICS, PatternMatcher, DiagnosticLog
+from src.token_stream import TokenStream
+
+if TYPE_CHECKING:
+    # Only passed in by callers; not imported at startup
+    from src.cache import TokenCache
+    from src.profiling import Profiler
+
+Result = TypeVar('Result', bound=Sized)
 
 class LexicalAnalyzer:
-    def __init__(self, source_code: str):
-        self.scanner = Scanner(source_code)
+    def __init__(self, source_code: Union[str, bytes], cache: Optional['TokenCache'] = None,
+                 tolerant: bool = False, profiler: Optional['Profiler'] = None,
+                 name: str = "<string>", max_diagnostics: int = MAX_DIAGNOSTICS):
+        # In error-tolerant mode at most max_diagnostics errors are kept
+        self.scanner = Scanner(source_code, tolerant=tolerant, max_diagnostics=max_diagnostics)
         self.pattern_matcher = PatternMatcher()
+        # Optional persistent cache consulted before scanning. Error-tolerant
+        # analysis always scans, since its diagnostics are not cached.
+        self.cache = None if tolerant else cache
+        # Optional instrumentation; the source is reported under name
+        self.profiler = profiler
+        self.name = name
+        if profiler is not None:
+            self.scanner.profiler = profiler
+
+    @classmethod
+    def from_path(cls, path: str, cache: Optional['TokenCache'] = None,
+                  tolerant: bool = False, profiler: Optional['Profiler'] = None,
+                  max_diagnostics: int = MAX_DIAGNOSTICS) -> 'LexicalAnalyzer':
+        """
+        Create an analyzer for a file on disk. UTF-8 files are memory-mapped
+        and scanned as bytes, so nothing is read or decoded up front and
+        token values are only decoded when accessed. Files declaring another
+        encoding through a PEP 263 cookie are decoded first.
+        """
+        return cls(open_source(path), cache, tolerant, profiler, path, max_diagnostics)
+
+    @property
+    def diagnostics(self) -> DiagnosticLog:
+        """Errors recovered from in error-tolerant mode."""
+        return self.scanner.diagnostics
 
     def analyze(self):
         """
         Perform lexical analysis on the source code
         Returns a list of tokens
         """
-        return self.scanner.scan_tokens()
+        if self.cache is not None:
+            self.scanner.tokens.extend(self._run(self._token_stream))
+            return self.scanner.tokens
+        return self._run(self.scanner.scan_tokens)
+
+    def token_stream(self) -> TokenStream:
+        """
+        Perform lexical analysis on the source code
+        Returns the tokens as a columnar TokenStream
+        """
+        return self._run(self._token_stream)
+
+    def _token_stream(self) -> TokenStream:
+        if self.cache is not None:
+            stream = self.cache.token_stream(self.scanner.source, self.scanner.scan_token_stream)
+            if stream._symbol_ids is None:
+                # Loaded from the cache: intern into the scanner's table, as a scan does
+                stream._symbols = self.scanner.symbols
+                stream._intern()
+            return stream
+        return self.scanner.scan_token_stream()
+
+    def _run(self, analysis: Callable[[], Result]) -> Result:
+        """Run an analysis, reporting it to the profiler if there is one."""
+        if self.profiler is None:
+            return analysis()
+        source = self.scanner.source
+        size = len(source.encode('utf-8', 'surrogatepass') if isinstance(source, str) else source)
+        began = time.perf_counter()
+        result = analysis()
+        self.profiler.record_file(self.name, size, len(result), time.perf_counter() - began)
+        return result
+
+    @staticmethod
+    def stream(fileobj: IO, chunk_size: int = CHUNK_SIZE) -> Iterator[Token]:
+        """
+        Lexically analyze a text or binary file object chunk by chunk.
+        Tokens are yielded as they are recognised and nothing is kept
+        afterwards, so memory use is bounded by the longest line rather
+        than by the size of the input.
+        """
+        return Scanner("").iter_tokens(read_chunks(fileobj, chunk_size))
 
 def main():
     # Example usage
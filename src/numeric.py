@@ -0,0 +1,286 @@
+# Decoded values of numeric literals, kept beside a token stream
+#
+# Every NUMBER token is decoded once, when it is scanned, into one of three
+# typed arrays: int64 for integers that fit, float64 for floats and for the
+# imaginary part of imaginary literals, and a plain list for larger
+# integers. Passes that need the values read them from there instead of
+# parsing the lexemes again, and the arrays can be handed to numpy without
+# a copy.
+
+from array import array
+from bisect import bisect_left
+from itertools import compress, repeat
+from operator import add
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+# Kinds of decoded values, selecting the array that holds them
+INTEGER, FLOAT, IMAGINARY, BIG_INTEGER = range(4)
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+# Slot shift of every kind of value when nothing is shifted
+NO_SHIFT = (0, 0, 0, 0)
+
+Number = Union[int, float, complex]
+
+
+def decode_number(lexeme: Union[str, bytes]) -> Number:
+    """Value of a numeric literal as matched by NUMBER_REGEX."""
+    if not isinstance(lexeme, str):
+        lexeme = lexeme.decode('ascii')
+    if lexeme[-1] in 'jJ':
+        return complex(0.0, float(lexeme[:-1]))
+    if lexeme[:2] in ('0x', '0X', '0o', '0O', '0b', '0B'):
+        return int(lexeme, 0)
+    if '.' in lexeme or 'e' in lexeme or 'E' in lexeme:
+        return float(lexeme)
+    # Decimal integers; only zeros may have a leading zero
+    return int(lexeme)
+
+
+class NumberTable:
+    """
+    Values of the NUMBER tokens of a stream, by token index.
+
+    tokens holds the index of every decoded token in increasing order;
+    kinds and slots give, for each of them, the array holding its value and
+    the position in that array.
+
+    A table spliced by replace() may hold its later entries short of their
+    true token index and slot, by a shift that is only applied when the
+    tokens or slots columns are read; lookups of single values account for
+    it. An edit therefore costs no work per number after it.
+    """
+    def __init__(self):
+        self._tokens = array('q')
+        self.kinds = array('B')
+        self._slots = array('q')
+        self.ints = array('q')
+        self.floats = array('d')
+        self.big_ints: List[int] = []
+        # Pending shift: entries from _shift_position on hold token indices
+        # _shift_tokens short, and slots _shift_slots[kind] short
+        self._shift_position = 0
+        self._shift_tokens = 0
+        self._shift_slots = NO_SHIFT
+
+    @property
+    def tokens(self) -> array:
+        self._settle()
+        return self._tokens
+
+    @tokens.setter
+    def tokens(self, column: array):
+        self._settle()
+        self._tokens = column
+
+    @property
+    def slots(self) -> array:
+        self._settle()
+        return self._slots
+
+    @slots.setter
+    def slots(self, column: array):
+        self._settle()
+        self._slots = column
+
+    def add(self, index: int, lexeme: Union[str, bytes]):
+        """Decode the lexeme of the token at index. Tokens must be added in order."""
+        if lexeme.isdigit():
+            # Plain decimal integers, by far the most common literals
+            self._store(index, int(lexeme))
+        else:
+            self._store(index, decode_number(lexeme))
+
+    def _store(self, index: int, value: Number):
+        # Tables are filled while scanning, before anything is shifted
+        self._tokens.append(index)
+        if type(value) is int:
+            if INT64_MIN <= value <= INT64_MAX:
+                self.kinds.append(INTEGER)
+                self._slots.append(len(self.ints))
+                self.ints.append(value)
+            else:
+                self.kinds.append(BIG_INTEGER)
+                self._slots.append(len(self.big_ints))
+                self.big_ints.append(value)
+        else:
+            self.kinds.append(FLOAT if type(value) is float else IMAGINARY)
+            self._slots.append(len(self.floats))
+            self.floats.append(value if type(value) is float else value.imag)
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def value(self, position: int) -> Number:
+        """Value of the position-th decoded token."""
+        kind, slot = self.kinds[position], self._slots[position]
+        if position >= self._shift_position:
+            slot += self._shift_slots[kind]
+        if kind == INTEGER:
+            return self.ints[slot]
+        if kind == FLOAT:
+            return self.floats[slot]
+        if kind == IMAGINARY:
+            return complex(0.0, self.floats[slot])
+        return self.big_ints[slot]
+
+    def value_of(self, index: int) -> Optional[Number]:
+        """Value of the token at a stream index, or None if it is not a number."""
+        position = self._position(index)
+        if position == len(self._tokens) or self._token(position) != index:
+            return None
+        return self.value(position)
+
+    def _token(self, position: int) -> int:
+        """Token index of the position-th entry."""
+        index = self._tokens[position]
+        return index + self._shift_tokens if position >= self._shift_position else index
+
+    def _position(self, index: int) -> int:
+        """Position of the first entry whose token index is index or more."""
+        shift = self._shift_position
+        position = bisect_left(self._tokens, index, 0, shift)
+        if position < shift:
+            return position
+        return bisect_left(self._tokens, index - self._shift_tokens, shift)
+
+    def _move_shift(self, position: int):
+        """
+        Make the pending shift start at position, applying it to the entries
+        between its old start and position or taking it back from them.
+        Only those entries are touched.
+        """
+        here = self._shift_position
+        if self._shift_tokens or self._shift_slots != NO_SHIFT:
+            low, high, sign = (here, position, 1) if position > here else (position, here, -1)
+            self._tokens[low:high] = shifted(self._tokens[low:high], sign * self._shift_tokens)
+            ints, floats, _, big_ints = self._shift_slots
+            self._slots[low:high] = _shifted_slots(self.kinds[low:high], self._slots[low:high],
+                                                   sign * ints, sign * floats, sign * big_ints)
+        self._shift_position = position
+
+    def _settle(self):
+        """Apply the pending shift to every entry."""
+        if self._shift_tokens or self._shift_slots != NO_SHIFT:
+            self._move_shift(len(self._tokens))
+        self._shift_position, self._shift_tokens, self._shift_slots = 0, 0, NO_SHIFT
+
+    def __iter__(self) -> Iterator[Number]:
+        self._settle()
+        return (self.value(position) for position in range(len(self._tokens)))
+
+    def slice(self, start: int, stop: int) -> 'NumberTable':
+        """Table of the tokens start to stop of the stream, renumbered from 0."""
+        tokens = self.tokens
+        first = bisect_left(tokens, start)
+        last = bisect_left(tokens, stop)
+        table = NumberTable()
+        table.tokens = shifted(tokens[first:last], -start)
+        table.kinds = self.kinds[first:last]
+        # Values are stored in token order, so those of a run of tokens are
+        # contiguous in every value array, starting after those of the
+        # tokens before it
+        ints, floats, big_ints = _value_counts(self.kinds[:first])
+        kinds = table.kinds
+        count_ints, count_floats, count_big_ints = _value_counts(kinds)
+        table.ints = self.ints[ints:ints + count_ints]
+        table.floats = self.floats[floats:floats + count_floats]
+        table.big_ints = self.big_ints[big_ints:big_ints + count_big_ints]
+        table.slots = _shifted_slots(kinds, self.slots[first:last], -ints, -floats, -big_ints)
+        return table
+
+    def select(self, selectors: bytes) -> 'NumberTable':
+        """Table of the tokens whose selector is set, renumbered in order."""
+        self._settle()
+        kept = compress(range(len(selectors)), selectors)
+        renumbered = {index: new_index for new_index, index in enumerate(kept)}
+        positions = [position for position, index in enumerate(self._tokens) if index in renumbered]
+        table = NumberTable()
+        table.tokens = array('q', [renumbered[self._tokens[position]] for position in positions])
+        table.kinds = array('B', [self.kinds[position] for position in positions])
+        sources = (self.ints, self.floats, self.floats, self.big_ints)
+        targets = (table.ints, table.floats, table.floats, table.big_ints)
+        slots = table._slots.append
+        for kind, position in zip(table.kinds, positions):
+            target = targets[kind]
+            slots(len(target))
+            target.append(sources[kind][self._slots[position]])
+        return table
+
+    def extend(self, other: 'NumberTable', offset: int):
+        """Append the values of another table, whose token indices start at offset."""
+        self._settle()
+        self._tokens.extend(shifted(other.tokens, offset))
+        self.kinds.extend(other.kinds)
+        self._slots.extend(_shifted_slots(other.kinds, other.slots, len(self.ints),
+                                          len(self.floats), len(self.big_ints)))
+        self.ints.extend(other.ints)
+        self.floats.extend(other.floats)
+        self.big_ints.extend(other.big_ints)
+
+    def replace(self, start: int, stop: int, other: 'NumberTable', count: int) -> 'NumberTable':
+        """
+        Table of the stream after its tokens start to stop are replaced by
+        count tokens, whose numbers are those of other, indexed from 0. The
+        entries after the replaced ones are copied as they are and shifted
+        lazily, so the work done grows with the replaced tokens and the
+        distance from the previous replace(), not with the whole table.
+        """
+        first = self._position(start)
+        last = self._position(stop)
+        self._move_shift(first)
+        kinds = self.kinds
+        ints, floats, big_ints = _value_counts(kinds[:first])
+        removed_ints, removed_floats, removed_big_ints = _value_counts(kinds[first:last])
+        added_ints, added_floats, added_big_ints = _value_counts(other.kinds)
+        table = NumberTable()
+        table._tokens = self._tokens[:first] + shifted(other.tokens, start) + self._tokens[last:]
+        table.kinds = kinds[:first] + other.kinds + kinds[last:]
+        table._slots = (self._slots[:first]
+                        + _shifted_slots(other.kinds, other.slots, ints, floats, big_ints)
+                        + self._slots[last:])
+        table.ints = self.ints[:ints] + other.ints + self.ints[ints + removed_ints:]
+        table.floats = self.floats[:floats] + other.floats + self.floats[floats + removed_floats:]
+        table.big_ints = (self.big_ints[:big_ints] + other.big_ints
+                          + self.big_ints[big_ints + removed_big_ints:])
+        table._shift_position = first + len(other)
+        table._shift_tokens = self._shift_tokens + start + count - stop
+        shift_ints, shift_floats, _, shift_big_ints = self._shift_slots
+        shift_ints += added_ints - removed_ints
+        shift_floats += added_floats - removed_floats
+        shift_big_ints += added_big_ints - removed_big_ints
+        table._shift_slots = (shift_ints, shift_floats, shift_floats, shift_big_ints)
+        return table
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the arrays, excluding the big integers."""
+        return sum(column.itemsize * len(column) for column in
+                   (self._tokens, self.kinds, self._slots, self.ints, self.floats))
+
+
+def shifted(column: array, delta: int) -> array:
+    """Return a copy of column with delta added to every entry."""
+    if not delta:
+        return array(column.typecode, column)
+    return array(column.typecode, map(add, column, repeat(delta)))
+
+
+def _value_counts(kinds: array) -> Tuple[int, int, int]:
+    """Number of values of kinds held in the ints, floats and big_ints arrays."""
+    floats = kinds.count(FLOAT) + kinds.count(IMAGINARY)
+    return kinds.count(INTEGER), floats, kinds.count(BIG_INTEGER)
+
+
+def _shifted_slots(kinds: Sequence[int], slots: array, ints: int, floats: int,
+                   big_ints: int) -> array:
+    """
+    Return slots moved by ints, floats or big_ints according to the kind of
+    value they point at, for value arrays that start that many entries
+    later (or earlier, when negative).
+    """
+    delta = (ints, floats, floats, big_ints)
+    deltas = {delta[kind] for kind in set(kinds)}
+    if len(deltas) <= 1:
+        # One kind of value, or several moving together: no lookup per slot
+        return shifted(slots, deltas.pop() if deltas else 0)
+    return array('q', [slot + delta[kind] for kind, slot in zip(kinds, slots)])
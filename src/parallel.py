@@ -0,0 +1,204 @@
+# Parallel lexing of a single large source
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Tuple, Union
+
+from src.pattern_matcher import LexicalError
+from src.scanner import Scanner, TAB_SIZE
+from src.token_definitions import Token, TokenType
+from src.token_stream import TokenStream, TYPE_CODES
+
+# Chunks are never smaller than this; below it the pool overhead dominates
+MIN_CHUNK_SIZE = 256 * 1024
+INDENT_CODE = TYPE_CODES[TokenType.INDENT]
+
+# Scanner state at a line boundary: (bracket depth, at start of a logical line).
+# Every chunk is first scanned assuming it starts outside brackets.
+BoundaryState = Tuple[int, bool]
+SPECULATIVE_STATE: BoundaryState = (0, True)
+ChunkResult = Optional[Tuple[TokenStream, BoundaryState]]
+
+
+class _ChunkScanner(Scanner):
+    """
+    Scanner for one chunk whose indentation context is unknown. Instead of
+    INDENT/DEDENT it emits an INDENT entry at every logical line start,
+    holding the line's indentation and the column of its first token; the
+    real INDENT/DEDENT tokens are worked out when the chunks are merged.
+    """
+    def __init__(self, text: Union[str, bytes], offset: int, line: int, state: BoundaryState):
+        super().__init__(text)
+        if offset:
+            self.current = 0
+        self.offset = offset
+        self.line = line
+        self.paren_depth, self.at_line_start = state
+        # Never equal to a real width, so every logical line start is reported
+        self.indents = [-1]
+
+    def _indent(self, width, indentation, line_offset, line, column):
+        return [(TokenType.INDENT, indentation, line_offset, line, column)]
+
+    def scan_token_stream(self) -> TokenStream:
+        """
+        The token columns only. The merged stream decodes numbers and
+        interns values itself on first access, so decoding them here would
+        only add to what the workers send back.
+        """
+        stream = TokenStream(self.source)
+        codes = TYPE_CODES
+        types = stream.types.append
+        starts = stream.starts.append
+        lengths = stream.lengths.append
+        lines = stream.lines.append
+        columns = stream.columns.append
+        for token_type, lexeme, start, line, column in self._raw_tokens():
+            types(codes[token_type])
+            starts(start)
+            lengths(len(lexeme))
+            lines(line)
+            columns(column)
+        return stream
+
+
+def _scan_chunk(text: Union[str, bytes], offset: int, line: int, state: BoundaryState) -> ChunkResult:
+    """
+    Worker entry point: scan one chunk from the given start state. Returns
+    the chunk's tokens, ending with an EOF token at the end of the chunk,
+    and the state there; or None if the chunk could not be scanned from
+    that state.
+    """
+    scanner = _ChunkScanner(text, offset, line, state)
+    try:
+        stream = scanner.scan_token_stream()
+    except LexicalError:
+        return None
+    stream.source = None
+    return stream, (scanner.paren_depth, scanner.at_line_start)
+
+
+def split_source(source: Union[str, bytes], chunk_count: int) -> List[int]:
+    """Return chunk start offsets, each just after a newline, ending with len(source)."""
+    newline = '\n' if isinstance(source, str) else b'\n'
+    size = max(1, len(source) // chunk_count)
+    boundaries = [0]
+    while True:
+        cut = source.find(newline, boundaries[-1] + size)
+        if cut < 0 or cut + 1 >= len(source):
+            break
+        boundaries.append(cut + 1)
+    boundaries.append(len(source))
+    return boundaries
+
+
+def _extend(target: TokenStream, part: TokenStream, start: int, stop: int):
+    """Append part[start:stop] to target column by column."""
+    target.types.extend(part.types[start:stop])
+    target.starts.extend(part.starts[start:stop])
+    target.lengths.extend(part.lengths[start:stop])
+    target.lines.extend(part.lines[start:stop])
+    target.columns.extend(part.columns[start:stop])
+
+
+def _merge(target: TokenStream, part: TokenStream, indents: List[int]):
+    """
+    Append a chunk's tokens except its EOF to target, replacing its logical
+    line markers with INDENT/DEDENT tokens computed against the running
+    indent stack.
+    """
+    source = target.source
+    marker = bytes([INDENT_CODE])
+    codes = part.types.tobytes()
+    done = 0
+    index = codes.find(marker)
+    while index >= 0:
+        _extend(target, part, done, index)
+        start, length = part.starts[index], part.lengths[index]
+        line, column = part.lines[index], part.columns[index]
+        width = len(source[start:start + length].expandtabs(TAB_SIZE))
+        if width > indents[-1]:
+            indents.append(width)
+            target.append(TokenType.INDENT, start, length, line, 1)
+        else:
+            while width < indents[-1]:
+                indents.pop()
+                target.append(TokenType.DEDENT, start + length, 0, line, column)
+            if width != indents[-1]:
+                raise LexicalError("Unindent does not match any outer indentation level",
+                                   line, column)
+        done = index + 1
+        index = codes.find(marker, done)
+    _extend(target, part, done, len(part) - 1)
+
+
+def parallel_token_stream(source: Union[str, bytes], workers: Optional[int] = None,
+                          chunk_size: Optional[int] = None,
+                          executor: Optional[Executor] = None) -> TokenStream:
+    """
+    Scan one large source on several processes. The source is cut into
+    chunks at newlines and every chunk is scanned speculatively, assuming
+    it starts outside any bracket. The chunks are then checked in order:
+    a chunk whose true start state differs, or that could not be scanned
+    (for example because it starts inside a string), is scanned again in
+    this process from its true state, joined with the following chunks
+    until it scans cleanly. The result is identical to
+    Scanner(source).scan_token_stream(), including the errors raised.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_count = workers * 4
+    if chunk_size is not None:
+        chunk_count = max(1, len(source) // chunk_size)
+    elif len(source) < MIN_CHUNK_SIZE * 2:
+        chunk_count = 1
+    boundaries = split_source(source, chunk_count)
+    newline = '\n' if isinstance(source, str) else b'\n'
+    lines = [1]
+    for previous, start in zip(boundaries, boundaries[1:-1]):
+        lines.append(lines[-1] + source.count(newline, previous, start))
+
+    def chunk_args(first: int, last: int) -> Tuple:
+        return source[boundaries[first]:boundaries[last]], boundaries[first], lines[first]
+
+    chunks = len(boundaries) - 1
+    if executor is None and workers > 1 and chunks > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return parallel_token_stream(source, workers, chunk_size, pool)
+    if executor is None:
+        results = [_scan_chunk(*chunk_args(i, i + 1), SPECULATIVE_STATE) for i in range(chunks)]
+    else:
+        futures = [executor.submit(_scan_chunk, *chunk_args(i, i + 1), SPECULATIVE_STATE)
+                   for i in range(chunks)]
+        results = [future.result() for future in futures]
+
+    stream = TokenStream(source)
+    indents = [0]
+    state = SPECULATIVE_STATE
+    index = 0
+    while index < chunks:
+        result = results[index] if state == SPECULATIVE_STATE else None
+        last = index + 1
+        while result is None:
+            result = _scan_chunk(*chunk_args(index, last), state)
+            if result is None:
+                if last == chunks:
+                    # A genuine error: raise exactly what the serial scan raises
+                    Scanner(source).scan_token_stream()
+                    raise RuntimeError("parallel scan failed where the serial scan did not")
+                last += 1
+        part, state = result
+        _merge(stream, part, indents)
+        index = last
+
+    # DEDENT and EOF tokens at the end of the input, as the serial scan emits them
+    end, end_line, end_column = part.starts[-1], part.lines[-1], part.columns[-1]
+    for _ in indents[1:]:
+        stream.append(TokenType.DEDENT, end, 0, end_line, end_column)
+    stream.append(TokenType.EOF, end, 0, end_line, end_column)
+    return stream
+
+
+def parallel_scan_tokens(source: Union[str, bytes], workers: Optional[int] = None,
+                         chunk_size: Optional[int] = None) -> List[Token]:
+    """Parallel equivalent of Scanner(source).scan_tokens()."""
+    return list(parallel_token_stream(source, workers, chunk_size))
@@ -2,45 +2,352 @@
 # Responsibility: Pattern Matching and Special Cases
 
 import re
-from typing import Optional, Pattern
-from token_definitions import Token, TokenType
-from scanner import Scanner
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Pattern, Tuple, Union
+from src.token_definitions import Token, TokenType, KEYWORDS, OPERATORS, DELIMITERS
+
+# Regex sources for the individual token classes. They are used both on their
+# own (anchored, by PatternMatcher) and as branches of the master pattern.
+IDENTIFIER_REGEX = r'[^\W\d]\w*'
+# UTF-8 variant: any non-ASCII byte may be part of an identifier. Candidates
+# containing such bytes are checked with str.isidentifier() by the scanner.
+IDENTIFIER_BYTES_REGEX = r'[A-Za-z_\x80-\xff][A-Za-z0-9_\x80-\xff]*'
+# Numeric literals as in the tokenize module: hex, octal and binary
+# integers, decimal integers without leading zeros, floats with a point or
+# an exponent, and imaginary numbers; digits may be grouped by underscores
+DIGITS_REGEX = r'[0-9](?:_?[0-9])*'
+EXPONENT_REGEX = r'[eE][-+]?' + DIGITS_REGEX
+FLOAT_REGEX = (rf'(?:{DIGITS_REGEX}\.(?:{DIGITS_REGEX})?|\.{DIGITS_REGEX})(?:{EXPONENT_REGEX})?'
+               rf'|{DIGITS_REGEX}{EXPONENT_REGEX}')
+INTEGER_REGEX = (r'0[xX](?:_?[0-9a-fA-F])+|0[bB](?:_?[01])+|0[oO](?:_?[0-7])+'
+                 r'|0(?:_?0)*|[1-9](?:_?[0-9])*')
+NUMBER_REGEX = rf'(?:{DIGITS_REGEX}|{FLOAT_REGEX})[jJ]|{FLOAT_REGEX}|{INTEGER_REGEX}'
+# String literals: an optional prefix, then one or three quotes. A backslash
+# escapes the next character, a line break included, in raw strings too.
+STRING_PREFIX_REGEX = r'(?:[rR][bBfF]?|[bBfF][rR]?|[uU])'
+STRING_START_REGEX = STRING_PREFIX_REGEX + "?(?:'''|\"\"\"|'|\")"
+# Literal bodies by closing quotes: runs of ordinary characters and escaped
+# ones, unrolled so that matching stays linear
+STRING_BODY_REGEXES = {
+    "'''": r"[^'\\]*(?:(?:\\[\s\S]|'(?!''))[^'\\]*)*",
+    '"""': r'[^"\\]*(?:(?:\\[\s\S]|"(?!""))[^"\\]*)*',
+    "'": r"[^'\\\n]*(?:\\(?:\r\n|[\s\S])[^'\\\n]*)*",
+    '"': r'[^"\\\n]*(?:\\(?:\r\n|[\s\S])[^"\\\n]*)*',
+}
+# A whole literal; one quote never opens a literal where three do
+STRING_REGEX = (STRING_PREFIX_REGEX + '?(?:' +
+                '|'.join(f"{quote}{body}{quote}" if len(quote) == 3
+                         else f"(?!{quote * 3}){quote}{body}{quote}"
+                         for quote, body in STRING_BODY_REGEXES.items()) +
+                ')')
+COMMENT_REGEX = r'#[^\r\n]*'
+TRIPLE_QUOTES = ("'''", '"""', b"'''", b'"""')
+WHITESPACE_REGEX = r'[ \t\f]*'
+
+# Token type produced by each named group of the master pattern. Groups that
+# map to None produce no token by themselves (whitespace, line joins) or need
+# the lexeme to pick a type (identifiers may be keywords, operators).
+GROUP_TYPES: Dict[str, Optional[TokenType]] = {
+    'WHITESPACE': None,
+    'IDENTIFIER': TokenType.IDENTIFIER,
+    'OPERATOR': None,
+    'NEWLINE': TokenType.NEWLINE,
+    'NUMBER': TokenType.NUMBER,
+    'STRING': TokenType.STRING,
+    'COMMENT': TokenType.COMMENT,
+    'CONTINUATION': None,
+}
+
+# Lexeme -> token type for every token whose type is fixed by its text
+LEXEME_TYPES: Dict[str, TokenType] = {**KEYWORDS, **OPERATORS, **DELIMITERS}
+LEXEME_TYPES_BYTES: Dict[bytes, TokenType] = {
+    lexeme.encode('ascii'): token_type for lexeme, token_type in LEXEME_TYPES.items()
+}
+
+
+class LexicalError(Exception):
+    """Raised when the source cannot be tokenized."""
+    def __init__(self, message: str, line: int, column: int):
+        super().__init__(f"{message} at line {line}, column {column}")
+        self.message = message
+        self.line = line
+        self.column = column
+
+
+# Diagnostics kept by default in error-tolerant mode
+MAX_DIAGNOSTICS = 100
+
+
+class DiagnosticLog:
+    """
+    Lexical errors collected in error-tolerant mode. At most limit errors
+    are kept; further ones are only counted, so hostile input cannot make
+    the log grow without bound.
+    """
+    def __init__(self, limit: int = MAX_DIAGNOSTICS):
+        self.limit = limit
+        self.errors: List[LexicalError] = []
+        self.suppressed = 0
+
+    def add(self, message: str, line: int, column: int):
+        """Record an error, or count it once the log is full."""
+        if len(self.errors) < self.limit:
+            self.errors.append(LexicalError(message, line, column))
+        else:
+            self.suppressed += 1
+
+    @property
+    def total(self) -> int:
+        """Errors seen, including suppressed ones."""
+        return len(self.errors) + self.suppressed
+
+    def __len__(self) -> int:
+        return len(self.errors)
+
+    def __iter__(self) -> Iterator[LexicalError]:
+        return iter(self.errors)
+
+    def __bool__(self) -> bool:
+        return self.total > 0
+
+
+# Error recovery. After a character no token can start with, scanning
+# resumes at the next blank, line break or character that can start a
+# token; an unterminated string takes the rest of its line. Every error
+# consumes the input it covers and each pattern below stops at the first
+# line break, so recovery keeps scanning linear on any input.
+RESYNC_CHARACTERS = r'\s\w\'"#(){}\[\],.:;+\-*/%=!<>\\'
+RESYNC_PATTERN: Pattern = re.compile(f'[^{RESYNC_CHARACTERS}]*')
+RESYNC_PATTERN_BYTES: Pattern = re.compile(f'[^{RESYNC_CHARACTERS}\\x80-\\xff]*'.encode('ascii'))
+LINE_REST_PATTERN: Pattern = re.compile(r'[^\r\n]*')
+LINE_REST_PATTERN_BYTES: Pattern = re.compile(rb'[^\r\n]*')
+BLANKS_PATTERN: Pattern = re.compile(WHITESPACE_REGEX)
+BLANKS_PATTERN_BYTES: Pattern = re.compile(WHITESPACE_REGEX.encode('ascii'))
+
+
+def error_span(source: Union[str, bytes], start: int, end: int) -> Tuple[int, str]:
+    """
+    Return where scanning resumes after an error at start and the message
+    for the error. The character at start must be one that no token
+    matches from.
+    """
+    char = source[start:start + 1]
+    text = isinstance(source, str)
+    if not text:
+        char = char.decode('utf-8', 'replace')
+    if char in ('"', "'"):
+        rest = LINE_REST_PATTERN if text else LINE_REST_PATTERN_BYTES
+        return rest.match(source, start, end).end(), "Unterminated string literal"
+    resync = RESYNC_PATTERN if text else RESYNC_PATTERN_BYTES
+    return resync.match(source, start + 1, end).end(), f"Unexpected character {char!r}"
+
+
+@lru_cache(maxsize=None)
+def _string_body(quote: Union[str, bytes]) -> Pattern:
+    if isinstance(quote, str):
+        return re.compile(STRING_BODY_REGEXES[quote])
+    return re.compile(STRING_BODY_REGEXES[quote.decode('ascii')].encode('ascii'))
+
+
+def string_end(source: Union[str, bytes], pos: int, quote: Union[str, bytes],
+               end: int) -> Tuple[int, bool]:
+    """
+    Find the end of a string literal whose body starts at pos and which is
+    closed by quote, one or three quote characters. Returns the offset just
+    past the closing quote and True; or, if the literal is not closed before
+    end, the offset where it is cut and False: for a single-quoted literal
+    its first unescaped line break (or a carriage return before it),
+    otherwise end.
+
+    The body is not walked character by character: str.find jumps to the
+    closing quotes and the first line break, and a body without backslashes,
+    which is most of them, needs nothing else. Only a body holding escapes
+    is matched by a regex, which skips the escaped characters in C.
+    """
+    if isinstance(source, str):
+        backslash, newline, carriage = '\\', '\n', '\r'
+    else:
+        backslash, newline, carriage = b'\\', b'\n', b'\r'
+    close = source.find(quote, pos, end)
+    if len(quote) == 3:
+        limit = end
+    else:
+        # Only the body is searched for a line break, so a long line of
+        # short literals is not scanned to its end once per literal
+        limit = source.find(newline, pos, end if close < 0 else close)
+        if limit < 0:
+            limit = end
+        else:
+            close = -1
+    if source.find(backslash, pos, limit if close < 0 else close) < 0:
+        stop = limit
+        if close >= 0:
+            return close + len(quote), True
+    else:
+        stop = _string_body(quote).match(source, pos, end).end()
+        if source[stop:stop + len(quote)] == quote:
+            return stop + len(quote), True
+    if len(quote) == 3 or stop == end:
+        return end, False
+    line_start = source.rfind(newline, pos, stop) + 1 or pos
+    cut = source.find(carriage, line_start, stop)
+    return (stop if cut < 0 else cut), False
+
+
+def comment_end(source: Union[str, bytes], pos: int, end: int) -> int:
+    """Offset where a comment starting at pos ends: at the next line break or carriage return."""
+    if isinstance(source, str):
+        newline, carriage = '\n', '\r'
+    else:
+        newline, carriage = b'\n', b'\r'
+    stop = source.find(newline, pos, end)
+    if stop < 0:
+        stop = end
+    cut = source.find(carriage, pos, stop)
+    return stop if cut < 0 else cut
+
+
+def build_master_pattern(binary: bool = False) -> Pattern:
+    """
+    Compile every token class into a single alternation of named groups.
+    Blanks before a token are consumed by the same match, so the token itself
+    starts at match.start(match.lastgroup); trailing blanks at the end of the
+    input match the empty WHITESPACE group.
+    Operators and delimiters are ordered longest first so that maximal munch
+    picks '**' over '*' and '+=' over '+'. Strings come before identifiers,
+    so that a prefix such as r or b followed by a quote opens a string, and
+    numbers before operators, so that '.5' is a number rather than a '.'.
+    The STRING and COMMENT groups only match the opening quotes and the
+    '#': the scanner finds where the literal or comment ends with
+    string_end and comment_end, without running the regex over its body.
+    With binary=True the pattern matches UTF-8 encoded bytes instead of str.
+    """
+    symbols = sorted(list(OPERATORS) + list(DELIMITERS), key=len, reverse=True)
+    branches = {
+        'STRING': STRING_START_REGEX,
+        'IDENTIFIER': IDENTIFIER_BYTES_REGEX if binary else IDENTIFIER_REGEX,
+        'NUMBER': NUMBER_REGEX,
+        'OPERATOR': '|'.join(re.escape(symbol) for symbol in symbols),
+        'NEWLINE': r'\r?\n',
+        'COMMENT': '#',
+        'CONTINUATION': r'\\\r?\n',
+        'WHITESPACE': r'\Z',
+    }
+    alternation = '|'.join(f'(?P<{name}>{regex})' for name, regex in branches.items())
+    pattern = WHITESPACE_REGEX + '(?:' + alternation + ')'
+    if binary:
+        return re.compile(pattern.encode('latin-1'))
+    return re.compile(pattern)
+
+
+@lru_cache(maxsize=None)
+def shared_master_pattern(binary: bool = False) -> Pattern:
+    """The master pattern, compiled on first use and then shared by the process."""
+    return build_master_pattern(binary)
+
+
+def __getattr__(name: str) -> Pattern:
+    # MASTER_PATTERN and MASTER_PATTERN_BYTES are compiled on first access,
+    # so importing the lexer does not pay for them
+    if name == 'MASTER_PATTERN':
+        return shared_master_pattern()
+    if name == 'MASTER_PATTERN_BYTES':
+        return shared_master_pattern(binary=True)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LazyPattern:
+    """
+    Class attribute whose pattern is built on first access and shared by
+    every instance, instead of being compiled at import or per instance.
+    Instances and subclasses may still assign their own pattern.
+    """
+    def __init__(self, build: Callable[[], Pattern]):
+        self.build = build
+        self.pattern: Optional[Pattern] = None
+
+    def __get__(self, instance, owner) -> Pattern:
+        if self.pattern is None:
+            self.pattern = self.build()
+        return self.pattern
+
 
 class PatternMatcher:
-    def __init__(self):
-        # Compile regex patterns for different token types
-        self.identifier_pattern: Pattern = re.compile(r'^[a-zA-Z_][a-zA-Z0-9_]*')
-        self.number_pattern: Pattern = re.compile(r'^[0-9]+(\.[0-9]+)?')
-        self.string_pattern: Pattern = re.compile(r'^"[^"]*"')
-        
+    # Regex patterns for the different token types
+    identifier_pattern = LazyPattern(lambda: re.compile('^' + IDENTIFIER_REGEX))
+    number_pattern = LazyPattern(lambda: re.compile('^(?:' + NUMBER_REGEX + ')'))
+    string_pattern = LazyPattern(lambda: re.compile('^(?:' + STRING_REGEX + ')'))
+    string_start_pattern = LazyPattern(lambda: re.compile(STRING_START_REGEX))
+    master_pattern = LazyPattern(shared_master_pattern)
+
+    def __init__(self, max_diagnostics: int = MAX_DIAGNOSTICS):
+        # Errors reported by handle_errors
+        self.diagnostics = DiagnosticLog(max_diagnostics)
+
     def match_pattern(self, text: str, line: int, column: int) -> Optional[Token]:
         """
         Match text against various patterns and return appropriate token
         """
-        # TODO: Implement pattern matching logic for different token types
-        pass
+        match = self.master_pattern.match(text)
+        if match is None:
+            return self.handle_errors(text, line, column)
+        kind = match.lastgroup
+        if kind == 'STRING':
+            return self.handle_string_literal(text, line, column)
+        if kind == 'COMMENT':
+            return self.handle_comment(text, line, column)
+        lexeme = match.group(kind)
+        token_type = LEXEME_TYPES.get(lexeme) or GROUP_TYPES[kind]
+        if token_type is None:
+            return None
+        return Token(token_type, lexeme, line, column)
 
     def handle_string_literal(self, text: str, line: int, column: int) -> Optional[Token]:
         """
-        Handle string literals with proper escaping
+        Handle string literals with proper escaping. The token's value is
+        the body between the quotes; an unterminated literal is recorded as
+        a diagnostic and returned as an ERROR token.
         """
-        # TODO: Implement string literal handling
-        pass
+        match = self.string_start_pattern.match(text)
+        if match is None:
+            return None
+        opener = match.group()
+        quote = opener[-3:] if opener[-3:] in ("'''", '"""') else opener[-1]
+        stop, closed = string_end(text, match.end(), quote, len(text))
+        if not closed:
+            self.diagnostics.add("Unterminated triple-quoted string literal" if len(quote) == 3
+                                 else "Unterminated string literal", line, column)
+            return Token(TokenType.ERROR, text[:stop], line, column)
+        return Token(TokenType.STRING, text[match.end():stop - len(quote)], line, column)
 
     def handle_comment(self, text: str, line: int, column: int) -> Optional[Token]:
         """
-        Handle both single-line and multi-line comments
+        Handle both single-line and multi-line comments: a '#' comment, or
+        a triple-quoted string standing for a block comment. Comments
+        produce no token; an unterminated block comment is recorded as a
+        diagnostic and returned as an ERROR token.
         """
-        # TODO: Implement comment handling
-        pass
+        match = self.string_start_pattern.match(text)
+        if match is None or match.group()[-3:] not in ("'''", '"""'):
+            return None
+        stop, closed = string_end(text, match.end(), match.group()[-3:], len(text))
+        if closed:
+            return None
+        self.diagnostics.add("Unterminated triple-quoted string literal", line, column)
+        return Token(TokenType.ERROR, text[:stop], line, column)
 
     def handle_errors(self, text: str, line: int, column: int) -> Optional[Token]:
         """
-        Handle lexical errors and provide meaningful error messages
+        Handle lexical errors and provide meaningful error messages.
+        Records a diagnostic and returns an ERROR token covering the text up
+        to the point where scanning can safely resume.
         """
-        # TODO: Implement error handling and reporting
-        pass
+        start = BLANKS_PATTERN.match(text).end()
+        if start == len(text):
+            return None
+        column += start
+        stop, message = error_span(text, start, len(text))
+        self.diagnostics.add(message, line, column)
+        return Token(TokenType.ERROR, text[start:stop], line, column)
 
 # TODO: Add more specialized pattern matching methods
-# TODO: Implement support for different number formats (hex, octal, etc.)
-# TODO: Add error recovery mechanisms
@@ -0,0 +1,171 @@
+# Opt-in instrumentation for the scanner, pattern matcher and analyzer
+
+import heapq
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src import pattern_matcher
+from src.token_definitions import TokenType
+
+HOOK_EVENTS = ('token', 'handler', 'file')
+PROFILED_HANDLERS = ('handle_string_literal', 'handle_comment', 'handle_errors')
+# Functions of src.pattern_matcher the scanning loop calls to find the end
+# of a string literal, of a comment and of a run of invalid input
+SCANNER_HANDLERS = ('string_end', 'comment_end', 'error_span')
+# Slowest files kept for the report
+SLOWEST_FILES = 10
+
+
+@dataclass
+class Timing:
+    """Call count and cumulative time of one token type or handler."""
+    count: int = 0
+    seconds: float = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+
+
+@dataclass(order=True)
+class FileProfile:
+    """One analyzed source."""
+    seconds: float
+    name: str
+    size: int
+    tokens: int
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.size / self.seconds / 1e6 if self.seconds else 0.0
+
+
+class Profiler:
+    """
+    Collects counts and cumulative time per token type, per handler and per
+    analyzed file, and passes every measurement on to the registered hooks.
+
+    Nothing is measured unless a profiler is attached: only when
+    Scanner.profiler is set does the scanner wrap its token generator and
+    call the timed SCANNER_HANDLERS from scanner_handlers instead of the
+    plain functions. PatternMatcher handlers are likewise wrapped on one
+    instance by instrument_matcher, so the uninstrumented code paths are
+    left untouched.
+
+    The time of a token is the time the scanner took to produce it since
+    the previous one, including the blanks and line breaks in between.
+    """
+    def __init__(self, slowest_files: int = SLOWEST_FILES):
+        self.token_types: Dict[TokenType, Timing] = defaultdict(Timing)
+        self.handlers: Dict[str, Timing] = defaultdict(Timing)
+        self.slowest_files = slowest_files
+        self.files: List[FileProfile] = []
+        self.total_files = 0
+        self.total_bytes = 0
+        self.total_seconds = 0.0
+        self.hooks: Dict[str, List[Callable]] = {event: [] for event in HOOK_EVENTS}
+        self._scanner_handlers: Optional[Tuple[Callable, ...]] = None
+
+    def add_hook(self, event: str, callback: Callable):
+        """
+        Call callback for every measurement of an event:
+        'token' with (token_type, seconds), 'handler' with (name, seconds)
+        and 'file' with a FileProfile.
+        """
+        if event not in self.hooks:
+            raise ValueError(f"unknown hook event {event!r}; expected one of {HOOK_EVENTS}")
+        self.hooks[event].append(callback)
+
+    def remove_hook(self, event: str, callback: Callable):
+        self.hooks[event].remove(callback)
+
+    def instrument(self, tokens: Iterator[Tuple]) -> Iterator[Tuple]:
+        """Pass raw scanner tokens through, timing each one."""
+        timings = self.token_types
+        hooks = self.hooks['token']
+        clock = time.perf_counter
+        last = clock()
+        for token in tokens:
+            now = clock()
+            elapsed = now - last
+            timings[token[0]].add(elapsed)
+            for hook in hooks:
+                hook(token[0], elapsed)
+            yield token
+            # Time spent by the consumer is not charged to the next token
+            last = clock()
+
+    def scanner_handlers(self) -> Tuple[Callable, ...]:
+        """Timed versions of the SCANNER_HANDLERS functions, in that order."""
+        if self._scanner_handlers is None:
+            self._scanner_handlers = tuple(self._timed(name, getattr(pattern_matcher, name))
+                                           for name in SCANNER_HANDLERS)
+        return self._scanner_handlers
+
+    def instrument_matcher(self, matcher):
+        """Time the profiled handlers of one PatternMatcher instance."""
+        for name in PROFILED_HANDLERS:
+            setattr(matcher, name, self._timed(name, getattr(matcher, name)))
+
+    def _timed(self, name: str, handler: Callable) -> Callable:
+        timings = self.handlers
+        hooks = self.hooks['handler']
+        def timed(*args, **kwargs):
+            began = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - began
+                # Looked up per call, so handlers never called are not reported
+                timings[name].add(elapsed)
+                for hook in hooks:
+                    hook(name, elapsed)
+        timed.__wrapped__ = handler
+        return timed
+
+    def record_file(self, name: str, size: int, tokens: int, seconds: float):
+        """Account for one analyzed source."""
+        profile = FileProfile(seconds, name, size, tokens)
+        self.total_files += 1
+        self.total_bytes += size
+        self.total_seconds += seconds
+        if len(self.files) < self.slowest_files:
+            heapq.heappush(self.files, profile)
+        else:
+            heapq.heappushpop(self.files, profile)
+        for hook in self.hooks['file']:
+            hook(profile)
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.total_bytes / self.total_seconds / 1e6 if self.total_seconds else 0.0
+
+    def slowest(self) -> List[FileProfile]:
+        """The slowest files seen, slowest first."""
+        return sorted(self.files, reverse=True)
+
+    def report(self) -> str:
+        """Summary table of everything measured so far."""
+        lines = []
+        total = sum(timing.seconds for timing in self.token_types.values()) or 1.0
+        lines.append(f"{'token type':16} {'count':>10} {'seconds':>10} {'us/token':>9} {'share':>7}")
+        for token_type, timing in sorted(self.token_types.items(),
+                                         key=lambda item: item[1].seconds, reverse=True):
+            lines.append(f"{token_type.name:16} {timing.count:10d} {timing.seconds:10.4f} "
+                         f"{timing.seconds / timing.count * 1e6:9.2f} {timing.seconds / total:7.1%}")
+        if self.handlers:
+            lines.append("")
+            lines.append(f"{'handler':24} {'calls':>10} {'seconds':>10} {'us/call':>9}")
+            for name, timing in sorted(self.handlers.items()):
+                mean = timing.seconds / timing.count * 1e6 if timing.count else 0.0
+                lines.append(f"{name:24} {timing.count:10d} {timing.seconds:10.4f} {mean:9.2f}")
+        if self.total_files:
+            lines.append("")
+            lines.append(f"{self.total_files} files, {self.total_bytes} bytes in "
+                         f"{self.total_seconds:.3f}s ({self.mb_per_sec:.2f} MB/s)")
+            for profile in self.slowest():
+                lines.append(f"  {profile.seconds:8.4f}s {profile.mb_per_sec:8.2f} MB/s "
+                             f"{profile.tokens:8d} tokens  {profile.name}")
+        return "\n".join(lines)
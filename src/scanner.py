@@ -1,39 +1,640 @@
 # Assigned to: Raj
 # Responsibility: Scanner/Tokenizer Core
 
-from typing import List, Optional
-from token_definitions import Token, TokenType
+from array import array
+import codecs
+import mmap
+import os
+import re
+from typing import IO, Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from src.token_definitions import Token, SourceToken, TokenType
+from src.token_stream import TokenStream, TYPE_CODES
+from src.numeric import NumberTable
+from src.symbols import NO_SYMBOL, SymbolTable
+from src.pattern_matcher import (
+    GROUP_TYPES, LEXEME_TYPES, LEXEME_TYPES_BYTES,
+    BLANKS_PATTERN, BLANKS_PATTERN_BYTES, MAX_DIAGNOSTICS, TRIPLE_QUOTES, DiagnosticLog,
+    LexicalError, LazyPattern, comment_end, error_span, shared_master_pattern, string_end
+)
+
+OPENING_BRACKETS = (TokenType.LPAREN, TokenType.LBRACKET, TokenType.LBRACE)
+CLOSING_BRACKETS = (TokenType.RPAREN, TokenType.RBRACKET, TokenType.RBRACE)
+TAB_SIZE = 8
+# First tokens of the logical lines end_of_imports lets through
+IMPORT_BLOCK_STARTS = (TokenType.IMPORT, TokenType.FROM, TokenType.STRING, TokenType.EOF)
+
+# (type, lexeme, offset, line, column) as produced by the scanning loop
+RawToken = Tuple[TokenType, str, int, int, int]
+# Yielded by the scanning loop when its chunk iterator returns None, i.e.
+# has no input yet but is not exhausted; the loop resumes by asking again
+INPUT_PENDING = (None, "", -1, 0, 0)
+CHUNK_SIZE = 64 * 1024
+
+NON_ASCII = re.compile(rb'[\x80-\xff]')
+# PEP 263 encoding declaration, only honoured on the first two lines
+CODING_COOKIE = re.compile(rb'^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)')
+UTF8_BOM = codecs.BOM_UTF8
+MMAP_THRESHOLD = 32 * 1024 * 1024
+# Whole in-memory sources of at least this many characters go through the
+# numpy prepass of src.vectorized when numpy is installed
+VECTORIZE_THRESHOLD = 64 * 1024
+
+class LineColumns:
+    """
+    Character columns of offsets in a UTF-8 bytes source, for lines that
+    hold non-ASCII bytes. Offsets on a line are looked up in increasing
+    order, so only the bytes since the previous lookup are decoded, and
+    placing every token of a line costs one pass over it.
+    """
+    __slots__ = ('source', 'end', 'non_ascii', 'offset', 'column')
+
+    def __init__(self, source: Union[bytes, mmap.mmap], end: int):
+        self.source = source
+        # Non-ASCII bytes are only searched for up to end
+        self.end = end
+        # First non-ASCII byte at or after the line last searched, or end
+        self.non_ascii = -1
+        # Last offset looked up and its column
+        self.offset = -1
+        self.column = 1
+
+    def column_of(self, line_start: int, offset: int) -> int:
+        """Column of offset on the line starting at line_start."""
+        if self.non_ascii < line_start:
+            found = NON_ASCII.search(self.source, line_start, self.end)
+            self.non_ascii = self.end if found is None else found.start()
+        if offset <= self.non_ascii:
+            return offset - line_start + 1
+        if not line_start <= self.offset <= offset:
+            self.offset, self.column = line_start, 1
+        column = self.column + len(self.source[self.offset:offset].decode('utf-8', 'replace'))
+        self.offset, self.column = offset, column
+        return column
+
+class Checkpoint(NamedTuple):
+    """
+    Scanner state at the start of a line, from which scanning can resume.
+    Checkpoints are taken between tokens, never inside a string or comment.
+    """
+    offset: int
+    line: int
+    column: int
+    paren_depth: int
+    at_line_start: bool
+    indents: Tuple[int, ...]
+
+def detect_encoding(head: bytes) -> str:
+    """
+    Return the normalized source encoding from a UTF-8 BOM or a PEP 263
+    cookie in the first two lines of head, defaulting to UTF-8.
+    """
+    if head.startswith(UTF8_BOM):
+        return 'utf-8'
+    for line in head.split(b'\n', 2)[:2]:
+        cookie = CODING_COOKIE.match(line)
+        if cookie:
+            return codecs.lookup(cookie.group(1).decode('ascii')).name
+        if line.strip() and not line.lstrip().startswith(b'#'):
+            break
+    return 'utf-8'
+
+def open_source(path: str, mmap_threshold: int = MMAP_THRESHOLD) -> Union[str, bytes, mmap.mmap]:
+    """
+    Open a source file for scanning without decoding it. UTF-8 (and ASCII)
+    files are scanned as bytes, memory-mapped once they reach mmap_threshold
+    bytes; files declaring any other encoding are decoded to str.
+
+    Smaller files are read instead of mapped because the regex engine has to
+    acquire the mmap buffer again on every match, which costs more than a
+    single read() for anything short of very large files.
+    """
+    with open(path, 'rb') as source_file:
+        head = source_file.read(1024)
+        if not head:
+            return b''
+        encoding = detect_encoding(head)
+        source_file.seek(0)
+        if encoding not in ('utf-8', 'ascii'):
+            return source_file.read().decode(encoding)
+        if os.fstat(source_file.fileno()).st_size < mmap_threshold:
+            return source_file.read()
+        return mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+def read_chunks(fileobj: IO, chunk_size: int = CHUNK_SIZE, encoding: str = "utf-8") -> Iterator[str]:
+    """
+    Read a file-like object in chunks of text. Binary streams are decoded
+    incrementally, so a multi-byte character split between two reads is
+    carried over to the next chunk.
+    """
+    decoder = None
+    while True:
+        data: Union[str, bytes] = fileobj.read(chunk_size)
+        if not data:
+            break
+        if isinstance(data, bytes):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            data = decoder.decode(data)
+        yield data
+    if decoder is not None:
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+def end_of_imports() -> Callable[[Token], bool]:
+    """
+    stop_when predicate for scan_tokens that ends the scan at the first
+    logical line of a module that is not an import statement, a docstring
+    or a comment, i.e. after the leading block of imports.
+    """
+    at_line_start = True
+    def stop(token: Token) -> bool:
+        nonlocal at_line_start
+        token_type = token.type
+        if token_type is TokenType.NEWLINE:
+            at_line_start = True
+        elif at_line_start and token_type is not TokenType.COMMENT:
+            at_line_start = False
+            return token_type not in IMPORT_BLOCK_STARTS
+        return False
+    return stop
 
 class Scanner:
-    def __init__(self, source: str):
+    # Matchers for one token at an offset; subclasses may substitute any
+    # object with a compatible match(source, pos, endpos) method
+    master_pattern = LazyPattern(shared_master_pattern)
+    master_pattern_bytes = LazyPattern(lambda: shared_master_pattern(binary=True))
+
+    def __init__(self, source: Union[str, bytes, mmap.mmap], tolerant: bool = False,
+                 max_diagnostics: int = MAX_DIAGNOSTICS):
         self.source = source
+        # Offset of self.source within the whole input (non-zero when streaming)
+        self.offset = 0
         self.tokens: List[Token] = []
         self.start = 0
         self.current = 0
         self.line = 1
         self.column = 1
+        # Indentation widths of the enclosing blocks, innermost last
+        self.indents: List[int] = [0]
+        # Open brackets; newlines inside brackets do not end a logical line
+        self.paren_depth = 0
+        # True until the first significant token of a logical line is seen
+        self.at_line_start = True
+        # In error-tolerant mode errors become ERROR tokens and are logged
+        # in diagnostics instead of raising LexicalError
+        self.tolerant = tolerant
+        self.diagnostics = DiagnosticLog(max_diagnostics)
+        # Interned identifier, keyword, operator and delimiter values; tokens
+        # refer to them by id and share their strings
+        self.symbols = SymbolTable()
+        # Optional src.profiling.Profiler timing every token
+        self.profiler = None
+        # Use the numpy prepass: None above VECTORIZE_THRESHOLD, True for
+        # any size and False never; it needs numpy and the shared patterns
+        self.vectorize: Optional[bool] = None
+        if not isinstance(source, str) and source[:len(UTF8_BOM)] == UTF8_BOM:
+            self.current = len(UTF8_BOM)
 
-    def scan_tokens(self) -> List[Token]:
+    def scan_tokens(self, include: Optional[Iterable[TokenType]] = None,
+                    exclude: Optional[Iterable[TokenType]] = None,
+                    stop_when: Optional[Callable[[Token], bool]] = None) -> List[Token]:
         """
         Main method to scan the source code and produce tokens.
         Returns a list of tokens.
+
+        include and exclude restrict the result to some token types; no
+        Token object is created for the others. Scanning ends before the
+        first token for which stop_when returns true, so the rest of the
+        source is never read. See iter_tokens.
         """
-        while not self.is_at_end():
-            self.start = self.current
-            self.scan_token()
-        
-        self.tokens.append(Token(TokenType.EOF, "", self.line, self.column))
+        self.tokens.extend(self.iter_tokens(include=include, exclude=exclude, stop_when=stop_when))
         return self.tokens
 
-    def scan_token(self):
+    def iter_tokens(self, chunks: Optional[Iterable[str]] = None,
+                    include: Optional[Iterable[TokenType]] = None,
+                    exclude: Optional[Iterable[TokenType]] = None,
+                    stop_when: Optional[Callable[[Token], bool]] = None) -> Iterator[Token]:
+        """
+        Yield tokens one at a time, ending with EOF.
+
+        When chunks is given the source is pulled from it incrementally and
+        self.source only holds the unfinished part of the input. Matching is
+        limited to complete lines, so a token cut by a chunk boundary is
+        simply matched again once the rest of its line has arrived.
+
+        Values are not interned into self.symbols then: the table would
+        grow with every new name of an unbounded input, so streamed tokens
+        carry no symbol id.
+
+        Only tokens whose type is in include (all types by default) and not
+        in exclude are yielded. stop_when is called with every token scanned,
+        excluded ones included, and iteration ends, without EOF, before the
+        first token it returns true for.
+        """
+        source = self.source
+        if include is not None or exclude is not None or stop_when is not None:
+            yield from self._filtered_tokens(chunks, include, exclude, stop_when)
+            return
+        if chunks is not None:
+            for token_type, lexeme, _, line, column in self._raw_tokens(chunks):
+                yield Token(token_type, lexeme, line, column)
+            return
+        # Keywords, operators and delimiters all have a category flag;
+        # testing it is much cheaper than hashing the type into a set
+        identifier = TokenType.IDENTIFIER
+        intern = self.symbols.intern
+        names = self.symbols.names
+        if isinstance(source, str):
+            ids = self.symbols.ids
+            for token_type, lexeme, _, line, column in self._raw_tokens(chunks):
+                if token_type.flags or token_type is identifier:
+                    symbol = ids.get(lexeme)
+                    if symbol is None:
+                        symbol = intern(lexeme)
+                    yield Token(token_type, names[symbol], line, column, None, symbol)
+                else:
+                    yield Token(token_type, lexeme, line, column)
+        else:
+            ids = self.symbols.byte_ids
+            for token_type, lexeme, start, line, column in self._raw_tokens():
+                symbol = None
+                if token_type.flags or token_type is identifier:
+                    symbol = ids.get(lexeme)
+                    if symbol is None:
+                        symbol = intern(lexeme)
+                yield SourceToken(token_type, source, start, start + len(lexeme), line, column,
+                                  symbol)
+
+    def _filtered_tokens(self, chunks: Optional[Iterable[str]],
+                         include: Optional[Iterable[TokenType]],
+                         exclude: Optional[Iterable[TokenType]],
+                         stop_when: Optional[Callable[[Token], bool]]) -> Iterator[Token]:
+        """iter_tokens with filters: token types are tested before any Token is built."""
+        source = self.source
+        wanted = frozenset(TokenType if include is None else include) - frozenset(exclude or ())
+        text = isinstance(source, str) or chunks is not None
+        intern = self.symbols.intern
+        names = self.symbols.names
+        for token_type, lexeme, start, line, column in self._raw_tokens(chunks):
+            if token_type not in wanted and stop_when is None:
+                continue
+            symbol = None
+            if chunks is None and (token_type.flags or token_type is TokenType.IDENTIFIER):
+                symbol = intern(lexeme)
+            if text:
+                token = Token(token_type, lexeme if symbol is None else names[symbol], line, column,
+                              None, symbol)
+            else:
+                token = SourceToken(token_type, source, start, start + len(lexeme), line, column,
+                                    symbol)
+            if stop_when is not None and stop_when(token):
+                return
+            if token_type in wanted:
+                yield token
+
+    def scan_token_stream(self) -> TokenStream:
+        """
+        Scan the source into a columnar TokenStream without creating a
+        Token object per token. Number values are decoded into the stream's
+        NumberTable and other values interned into its SymbolTable on the way.
+        """
+        stream = TokenStream(self.source)
+        codes = TYPE_CODES
+        types = stream.types.append
+        starts = stream.starts.append
+        lengths = stream.lengths.append
+        lines = stream.lines.append
+        columns = stream.columns.append
+        # Number values are decoded and other values interned as the tokens
+        # are scanned
+        stream._numbers = numbers = NumberTable()
+        number = TokenType.NUMBER
+        stream._symbols = self.symbols
+        stream._symbol_ids = array('i')
+        symbol_ids = stream._symbol_ids.append
+        identifier = TokenType.IDENTIFIER
+        intern = self.symbols.intern
+        ids = self.symbols.ids if isinstance(self.source, str) else self.symbols.byte_ids
+        for token_type, lexeme, start, line, column in self._raw_tokens():
+            if token_type.flags or token_type is identifier:
+                symbol = ids.get(lexeme)
+                symbol_ids(intern(lexeme) if symbol is None else symbol)
+            else:
+                symbol_ids(NO_SYMBOL)
+                if token_type is number:
+                    numbers.add(len(stream.types), lexeme)
+            types(codes[token_type])
+            starts(start)
+            lengths(len(lexeme))
+            lines(line)
+            columns(column)
+        return stream
+
+    def _raw_tokens(self, chunks: Optional[Iterable[str]] = None) -> Iterator[RawToken]:
+        """
+        The scanning loop, instrumented when a profiler is attached. The
+        check is made once per scan, so an unprofiled scan runs _scan as is.
         """
-        Scan a single token.
-        TODO: Implement the scanning logic for different token types
+        if chunks is None and self._vectorizable():
+            from src import vectorized
+            tokens = vectorized.scan(self)
+        else:
+            tokens = self._scan(chunks)
+        if self.profiler is None:
+            return tokens
+        return self.profiler.instrument(tokens)
+
+    def _vectorizable(self) -> bool:
+        """Whether the whole source can go through the numpy prepass."""
+        if self.vectorize is False:
+            return False
+        if self.vectorize is None and len(self.source) < VECTORIZE_THRESHOLD:
+            return False
+        # Subclasses matching other tokens keep the scalar loop
+        if isinstance(self.source, str):
+            if self.master_pattern is not shared_master_pattern():
+                return False
+        elif self.master_pattern_bytes is not shared_master_pattern(binary=True):
+            return False
+        from src import vectorized
+        return vectorized.available()
+
+    def _scan(self, chunks: Optional[Iterable[str]] = None,
+              stop: Optional[int] = None) -> Iterator[RawToken]:
         """
-        char = self.advance()
-        # TODO: Implement basic token scanning logic
-        # TODO: Add switch-case like structure for different characters
-        # TODO: Handle basic tokens like operators and delimiters
+        Core scanning loop, shared by every output format. Yields
+        (type, lexeme, offset, line, column) tuples ending with EOF, where
+        offset is the position of the lexeme in the whole input.
+
+        With stop, only the source up to that offset, which must be the
+        start of a line, is scanned and no closing DEDENT and EOF tokens are
+        produced; the scanner state is left for another call to carry on.
+
+        A chunk iterator may return None to signal that no input is
+        available yet; INPUT_PENDING is then yielded so the caller can
+        supply more before resuming.
+
+        Every token is recognised by a single match of the master pattern at
+        the current offset; the name of the group that matched selects how
+        the lexeme is turned into a token.
+        """
+        source = self.source
+        group_types = GROUP_TYPES
+        if self.profiler is None:
+            find_string_end, find_comment_end, find_error_span = string_end, comment_end, error_span
+        else:
+            find_string_end, find_comment_end, find_error_span = self.profiler.scanner_handlers()
+        if isinstance(source, str):
+            match = self.master_pattern.match
+            lexeme_types = LEXEME_TYPES
+            blanks = BLANKS_PATTERN.match
+            newline = '\n'
+            ascii_only = True
+        else:
+            # UTF-8 bytes: columns count characters, so lines holding
+            # non-ASCII bytes are decoded to place their tokens
+            match = self.master_pattern_bytes.match
+            lexeme_types = LEXEME_TYPES_BYTES
+            blanks = BLANKS_PATTERN_BYTES.match
+            newline = b'\n'
+            line_columns = LineColumns(source, len(source) if stop is None else stop)
+            ascii_only = NON_ASCII.search(source, self.current, line_columns.end) is None
+            column_of = line_columns.column_of
+        indents = self.indents
+        base = self.offset
+        pos = self.current
+        line = self.line
+        line_start = pos - self.column + 1
+        depth = self.paren_depth
+        at_line_start = self.at_line_start
+        # Closing quotes of a literal cut by the end of the input read so far
+        pending = None
+        if chunks is None:
+            end = len(source) if stop is None else stop
+        else:
+            chunks = iter(chunks)
+            end = source.rfind('\n') + 1
+
+        while True:
+            while pos < end:
+                m = match(source, pos, end)
+                if m is None:
+                    start = blanks(source, pos, end).end()
+                    column = start - line_start + 1 if ascii_only else column_of(line_start, start)
+                    pos, message = find_error_span(source, start, end)
+                    if not self.tolerant:
+                        self.source, self.offset = source, base
+                        self.current, self.line, self.column = start, line, column
+                        raise LexicalError(message, line, column)
+                    self.diagnostics.add(message, line, column)
+                    lexeme = source[start:pos]
+                    token_type = TokenType.ERROR
+                else:
+                    kind = m.lastgroup
+                    start = m.start(kind)
+                    pos = m.end()
+
+                    if kind == 'NEWLINE':
+                        if not at_line_start and not depth:
+                            column = (start - line_start + 1 if ascii_only
+                                      else column_of(line_start, start))
+                            yield (TokenType.NEWLINE, m.group(kind), base + start, line, column)
+                            at_line_start = True
+                        line += 1
+                        line_start = pos
+                        continue
+                    if kind == 'CONTINUATION':
+                        line += 1
+                        line_start = pos
+                        continue
+                    if kind == 'WHITESPACE':
+                        continue
+                    if kind == 'STRING':
+                        opener = m.group(kind)
+                        quote = opener[-3:] if opener[-3:] in TRIPLE_QUOTES else opener[-1:]
+                        pos, closed = find_string_end(source, pos, quote,
+                                                      len(source) if chunks is None else end)
+                        if not closed and pos == end and chunks is not None:
+                            # Read on until the literal is complete
+                            pos = start
+                            pending = quote if len(quote) == 3 else None
+                            break
+                        lexeme = source[start:pos]
+                        column = start - line_start + 1 if ascii_only else column_of(line_start, start)
+                        token_type = TokenType.STRING
+                        if not closed:
+                            message = ("Unterminated triple-quoted string literal" if len(quote) == 3
+                                       else "Unterminated string literal")
+                            if not self.tolerant:
+                                self.source, self.offset = source, base
+                                self.current, self.line, self.column = start, line, column
+                                raise LexicalError(message, line, column)
+                            self.diagnostics.add(message, line, column)
+                            token_type = TokenType.ERROR
+                        if at_line_start:
+                            at_line_start = False
+                            width = len(source[line_start:start].expandtabs(TAB_SIZE))
+                            if width != indents[-1]:
+                                yield from self._indent(width, source[line_start:start],
+                                                        base + line_start, line, column)
+                        yield (token_type, lexeme, base + start, line, column)
+                        # Line breaks inside the literal
+                        lines = lexeme.count(newline)
+                        if lines:
+                            line += lines
+                            line_start = source.rfind(newline, start, pos) + 1
+                            if pos > end:
+                                # Scanning up to stop: finish the line the literal ends on
+                                end = source.find(newline, pos)
+                                end = len(source) if end < 0 else end + 1
+                                if not isinstance(source, str):
+                                    line_columns.end = end
+                                    # The rest of the line is past the part checked so far
+                                    ascii_only = NON_ASCII.search(source, line_start, end) is None
+                        continue
+
+                    if kind == 'COMMENT':
+                        pos = find_comment_end(source, pos, end)
+                        lexeme = source[start:pos]
+                    else:
+                        lexeme = m.group(kind)
+                    column = start - line_start + 1
+                    token_type = lexeme_types.get(lexeme) or group_types[kind]
+                    if not ascii_only:
+                        column = column_of(line_start, start)
+                        if (token_type is TokenType.IDENTIFIER and not lexeme.isascii()
+                                and not lexeme.decode('utf-8').isidentifier()):
+                            message = f"Invalid identifier {lexeme.decode('utf-8')!r}"
+                            if not self.tolerant:
+                                self.source, self.offset = source, base
+                                self.current, self.line, self.column = start, line, column
+                                raise LexicalError(message, line, column)
+                            self.diagnostics.add(message, line, column)
+                            token_type = TokenType.ERROR
+
+                if at_line_start and token_type is not TokenType.COMMENT:
+                    at_line_start = False
+                    width = len(source[line_start:start].expandtabs(TAB_SIZE))
+                    if width != indents[-1]:
+                        yield from self._indent(width, source[line_start:start],
+                                                base + line_start, line, column)
+
+                if token_type in OPENING_BRACKETS:
+                    depth += 1
+                elif token_type in CLOSING_BRACKETS and depth:
+                    depth -= 1
+                yield (token_type, lexeme, base + start, line, column)
+
+            if chunks is None:
+                break
+            # Drop the consumed lines and read until another line is complete
+            pos -= line_start
+            base += line_start
+            source, end, exhausted = yield from self._fill(source[line_start:], chunks, pending)
+            pending = None
+            line_start = 0
+            if exhausted:
+                chunks = None
+
+        self.source = source
+        self.offset = base
+        self.start = self.current = pos
+        self.line = line
+        self.column = self._column(source, line_start, pos)
+        self.paren_depth = depth
+        self.at_line_start = at_line_start
+        if stop is not None:
+            return
+
+        while len(indents) > 1:
+            indents.pop()
+            yield (TokenType.DEDENT, "", base + pos, self.line, self.column)
+        yield (TokenType.EOF, "", base + pos, self.line, self.column)
+
+    @staticmethod
+    def _column(source: Union[str, bytes], line_start: int, offset: int) -> int:
+        """Column of offset, counting characters rather than UTF-8 bytes."""
+        if isinstance(source, str):
+            return offset - line_start + 1
+        return len(source[line_start:offset].decode('utf-8', 'replace')) + 1
+
+    def _fill(self, source: str, chunks: Iterator[Optional[str]],
+              closing: Optional[str] = None) -> Iterator[RawToken]:
+        """
+        Append chunks to source until one more line is complete, yielding
+        INPUT_PENDING whenever the chunks run out of input for now. Returns
+        the new source, the matching limit (the offset just past its last
+        newline, or its full length once the input is exhausted) and whether
+        the input is exhausted.
+
+        The chunks are joined once, when the line is complete, however many
+        reads it takes. With closing, the quotes of a pending triple-quoted
+        literal, the line must also come after the next occurrence of
+        closing, so a long literal is joined once rather than again for
+        each of its lines.
+        """
+        parts = [source]
+        size = len(source)
+        # End of the text read before the chunk, which closing may straddle
+        tail = source[-2:]
+        for chunk in chunks:
+            if chunk is None:
+                yield INPUT_PENDING
+                continue
+            parts.append(chunk)
+            size += len(chunk)
+            newline = chunk.rfind('\n')
+            if closing is not None:
+                window = tail + chunk
+                found = window.rfind(closing)
+                tail = window[-2:]
+                if found < 0:
+                    continue
+                closing = None
+                if newline < found - len(window) + len(chunk):
+                    continue
+            if newline >= 0:
+                return "".join(parts), size - len(chunk) + newline + 1, False
+        source = "".join(parts)
+        return source, len(source), True
+
+    def _indent(self, width: int, indentation: str, line_offset: int,
+                line: int, column: int) -> List[RawToken]:
+        """Return the INDENT or DEDENT tokens for a logical line starting at the given width."""
+        indents = self.indents
+        if width > indents[-1]:
+            indents.append(width)
+            return [(TokenType.INDENT, indentation, line_offset, line, 1)]
+        dedents = []
+        while width < indents[-1]:
+            indents.pop()
+            dedents.append((TokenType.DEDENT, "", line_offset + column - 1, line, column))
+        if width != indents[-1]:
+            message = "Unindent does not match any outer indentation level"
+            if not self.tolerant:
+                raise LexicalError(message, line, column)
+            # Recover by opening a block at this width, which keeps the
+            # INDENT and DEDENT tokens balanced
+            self.diagnostics.add(message, line, column)
+            indents.append(width)
+            dedents.append((TokenType.INDENT, indentation, line_offset, line, 1))
+        return dedents
+
+    def checkpoint(self) -> Checkpoint:
+        """State of a scan stopped at the start of a line, as _scan(stop=...) leaves it."""
+        return Checkpoint(self.offset + self.current, self.line, self.column,
+                          self.paren_depth, self.at_line_start, tuple(self.indents))
+
+    def restore(self, checkpoint: Checkpoint):
+        """Resume scanning the whole source from a checkpoint taken on it."""
+        self.offset = 0
+        self.start = self.current = checkpoint.offset
+        self.line = checkpoint.line
+        self.column = checkpoint.column
+        self.paren_depth = checkpoint.paren_depth
+        self.at_line_start = checkpoint.at_line_start
+        self.indents = list(checkpoint.indents)
 
     def is_at_end(self) -> bool:
         """Check if we've reached the end of source code."""
@@ -46,6 +647,9 @@ class Scanner:
         self.column += 1
         return char
 
-    # TODO: Implement helper methods for peeking and matching characters
-    # TODO: Implement methods for handling whitespace and newlines
-    # TODO: Add basic token recognition logic
+    def peek(self, offset: int = 0) -> str:
+        """Return the character at current + offset without consuming it."""
+        index = self.current + offset
+        if index >= len(self.source):
+            return ""
+        return self.source[index]
@@ -0,0 +1,358 @@
+# Compact binary serialization of token streams
+#
+# Layout (integers are unsigned LEB128 varints unless noted):
+#
+#   header   MAGIC, FORMAT_VERSION, number of types, then every TokenType
+#            name as length + ASCII bytes. Type codes index this table, so
+#            a file stays readable when TokenType is reordered or extended.
+#   block    token count, payload length, payload. A count of 0 ends the stream.
+#   payload  flags: BLOCK_RESET_SHARED if the shared table is emptied first
+#            new shared strings: count, then length + UTF-8 bytes for each
+#            block strings: count, then length + UTF-8 bytes for each
+#            type codes: byte length, one varint per token
+#            line deltas: byte length, one zigzag varint per token
+#            columns: byte length, one varint per token
+#            values: item width (1, 2 or 4), then one little-endian index
+#            per token into the shared strings followed by the block strings
+#
+# Identifier, keyword, operator and delimiter values, which repeat all
+# through a file, go into a shared table that spans blocks: each block
+# appends the values it introduces, so they are written once. Other values
+# (strings, comments, numbers) rarely repeat far apart and go into a table
+# of their own block. The shared table is emptied once it holds
+# MAX_SHARED_STRINGS values, so neither side ever holds more than that plus
+# one block. The payload is stored column by column, so the usual blocks,
+# where every varint fits in one byte, are encoded and decoded at C speed.
+
+import io
+import sys
+from array import array
+from itertools import accumulate
+from typing import IO, Iterable, Iterator, List, Optional, Union
+
+from src.symbols import INTERNED_TYPES
+from src.token_definitions import Token, TokenType
+from src.token_stream import TokenStream, TOKEN_TYPES, TYPE_CODES
+
+MAGIC = b'PLXT'
+FORMAT_VERSION = 2
+# Tokens per block; a reader holds at most one block in memory
+BLOCK_TOKENS = 8192
+# Shared table size past which it is emptied at the next block
+MAX_SHARED_STRINGS = 1 << 16
+BLOCK_RESET_SHARED = 1
+# Type codes whose values go into the shared table
+SHARED_CODES = frozenset(TYPE_CODES[token_type] for token_type in INTERNED_TYPES)
+REFERENCE_TYPECODES = {1: 'B', 2: 'H', 4: 'L' if array('L').itemsize == 4 else 'I'}
+# Zigzag decoding of every single-byte varint
+UNZIGZAG = [value >> 1 if not value & 1 else -((value + 1) >> 1) for value in range(128)]
+
+
+class TokenFormatError(ValueError):
+    """Raised when reading data that is not a valid token stream."""
+
+
+def _varint(out: bytearray, value: int):
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _encode_column(out: bytearray, values: List[int]):
+    """Append a length-prefixed column of varints."""
+    if not values or max(values) < 0x80:
+        data = bytes(values)
+    else:
+        data = bytearray()
+        for value in values:
+            _varint(data, value)
+    _varint(out, len(data))
+    out += data
+
+
+def _decode_varint(data: bytes, pos: int):
+    """Decode the varint at pos, returning its value and the position after it."""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _decode_column(data: bytes, pos: int, count: int):
+    """Decode a length-prefixed column of count varints at pos."""
+    size, pos = _decode_varint(data, pos)
+    end = pos + size
+    column = data[pos:end]
+    if size == count:
+        # Every value fits in one byte
+        return column, end
+    values = []
+    index = 0
+    while index < size:
+        value, index = _decode_varint(column, index)
+        values.append(value)
+    if len(values) != count:
+        raise TokenFormatError("corrupt token stream block")
+    return values, end
+
+
+class TokenWriter:
+    """
+    Writes tokens to a binary file object one block at a time, so only the
+    current block and the bounded shared string table are held in memory.
+    """
+    def __init__(self, fileobj: IO[bytes], block_tokens: int = BLOCK_TOKENS,
+                 max_shared_strings: int = MAX_SHARED_STRINGS):
+        self.fileobj = fileobj
+        self.block_tokens = block_tokens
+        self.max_shared_strings = max_shared_strings
+        # Shared table index of every identifier, keyword, operator and
+        # delimiter value written since the table was last emptied
+        self.strings = {}
+        self._flags = 0
+        self.closed = False
+        self._line = 0
+        self._reset()
+        header = bytearray(MAGIC)
+        _varint(header, FORMAT_VERSION)
+        _varint(header, len(TOKEN_TYPES))
+        for token_type in TOKEN_TYPES:
+            name = token_type.name.encode('ascii')
+            _varint(header, len(name))
+            header += name
+        fileobj.write(header)
+
+    def _reset(self):
+        self._new_strings: List[bytes] = []
+        # Index of every other value in the block table, and its data
+        self._block_strings = {}
+        self._block_data: List[bytes] = []
+        self._codes: List[int] = []
+        self._line_deltas: List[int] = []
+        self._columns: List[int] = []
+        self._references: List[int] = []
+
+    def _append(self, code: int, value: Union[str, bytes], line: int, column: int):
+        """Add one token; value is the text or its UTF-8 bytes."""
+        if code in SHARED_CODES:
+            reference = self.strings.get(value)
+            if reference is None:
+                reference = self.strings[value] = len(self.strings)
+                self._new_strings.append(value.encode('utf-8') if isinstance(value, str)
+                                         else bytes(value))
+        else:
+            # Block references are stored negated until the size of the
+            # shared table, which they follow, is known
+            reference = self._block_strings.get(value)
+            if reference is None:
+                reference = self._block_strings[value] = ~len(self._block_data)
+                self._block_data.append(value.encode('utf-8') if isinstance(value, str)
+                                        else bytes(value))
+        self._references.append(reference)
+        self._codes.append(code)
+        delta = line - self._line
+        self._line_deltas.append(delta << 1 if delta >= 0 else _zigzag(delta))
+        self._line = line
+        self._columns.append(column)
+        if len(self._codes) >= self.block_tokens:
+            self.flush()
+
+    def write(self, token: Token):
+        """Append one token."""
+        self._append(TYPE_CODES[token.type], token.value, token.line, token.column)
+
+    def write_all(self, tokens: Iterable[Token]):
+        """
+        Append every token. A TokenStream is read column by column without
+        materializing Token objects; values from a bytes source are stored
+        without being decoded.
+        """
+        if not isinstance(tokens, TokenStream):
+            for token in tokens:
+                self.write(token)
+            return
+        source = tokens.source
+        append = self._append
+        for code, start, length, line, column in zip(tokens.types, tokens.starts, tokens.lengths,
+                                                     tokens.lines, tokens.columns):
+            append(code, source[start:start + length], line, column)
+
+    def flush(self):
+        """Write out the current block."""
+        count = len(self._codes)
+        if not count:
+            return
+        payload = bytearray()
+        _varint(payload, self._flags)
+        for strings in (self._new_strings, self._block_data):
+            _varint(payload, len(strings))
+            for data in strings:
+                _varint(payload, len(data))
+                payload += data
+        _encode_column(payload, self._codes)
+        _encode_column(payload, self._line_deltas)
+        _encode_column(payload, self._columns)
+        references = self._references
+        shared = len(self.strings)
+        if self._block_data:
+            references = [reference if reference >= 0 else shared + ~reference
+                          for reference in references]
+        largest = max(references)
+        width = 1 if largest < 1 << 8 else 2 if largest < 1 << 16 else 4
+        references = array(REFERENCE_TYPECODES[width], references)
+        if sys.byteorder == 'big':
+            references.byteswap()
+        payload.append(width)
+        payload += references.tobytes()
+
+        head = bytearray()
+        _varint(head, count)
+        _varint(head, len(payload))
+        self.fileobj.write(head)
+        self.fileobj.write(payload)
+        self._flags = 0
+        if shared >= self.max_shared_strings:
+            self.strings = {}
+            self._flags = BLOCK_RESET_SHARED
+        self._reset()
+
+    def close(self):
+        """Write the last block and the end marker. The file object is left open."""
+        if self.closed:
+            return
+        self.flush()
+        self.fileobj.write(b'\x00')
+        self.closed = True
+
+    def __enter__(self) -> 'TokenWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.close()
+
+
+class TokenReader:
+    """Reads tokens written by TokenWriter, one block at a time."""
+    def __init__(self, fileobj: IO[bytes]):
+        self.fileobj = fileobj
+        if fileobj.read(len(MAGIC)) != MAGIC:
+            raise TokenFormatError("not a token stream")
+        version = self._read_varint()
+        if version != FORMAT_VERSION:
+            raise TokenFormatError(f"unsupported token stream version {version}")
+        self.types: List[Optional[TokenType]] = []
+        for _ in range(self._read_varint()):
+            name = self._read(self._read_varint()).decode('ascii')
+            self.types.append(TokenType.__members__.get(name))
+        # The shared table; block tables are dropped with their block
+        self.strings: List[str] = []
+        self._line = 0
+
+    def _read(self, size: int) -> bytes:
+        data = self.fileobj.read(size)
+        if len(data) != size:
+            raise TokenFormatError("truncated token stream")
+        return data
+
+    def _read_varint(self) -> int:
+        value = shift = 0
+        while True:
+            byte = self._read(1)[0]
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def read_block(self) -> Optional[List[Token]]:
+        """Return the tokens of the next block, or None at the end of the stream."""
+        count = self._read_varint()
+        if not count:
+            return None
+        block = self._read(self._read_varint())
+        try:
+            return self._decode_block(block, count)
+        except (IndexError, KeyError, UnicodeDecodeError):
+            raise TokenFormatError("corrupt token stream block") from None
+
+    def _decode_block(self, block: bytes, count: int) -> List[Token]:
+        flags, pos = _decode_varint(block, 0)
+        if flags & BLOCK_RESET_SHARED:
+            self.strings = []
+        strings = self.strings
+        for table in (strings, []):
+            new_strings, pos = _decode_varint(block, pos)
+            for _ in range(new_strings):
+                length, pos = _decode_varint(block, pos)
+                table.append(block[pos:pos + length].decode('utf-8'))
+                pos += length
+        if table:
+            strings = strings + table
+        codes, pos = _decode_column(block, pos, count)
+        line_deltas, pos = _decode_column(block, pos, count)
+        columns, pos = _decode_column(block, pos, count)
+        width = block[pos]
+        references = array(REFERENCE_TYPECODES[width])
+        references.frombytes(block[pos + 1:pos + 1 + width * count])
+        if len(references) != count:
+            raise TokenFormatError("corrupt token stream block")
+        if sys.byteorder == 'big':
+            references.byteswap()
+
+        token_types = list(map(self.types.__getitem__, codes))
+        if None in token_types:
+            raise TokenFormatError("unknown token type in token stream")
+        deltas = (map(UNZIGZAG.__getitem__, line_deltas) if isinstance(line_deltas, bytes)
+                  else map(_unzigzag, line_deltas))
+        lines = list(accumulate(deltas, initial=self._line))
+        self._line = lines[-1]
+        return list(map(Token, token_types, map(strings.__getitem__, references),
+                        lines[1:], columns))
+
+    def __iter__(self) -> Iterator[Token]:
+        while True:
+            tokens = self.read_block()
+            if tokens is None:
+                return
+            yield from tokens
+
+
+def dump(tokens: Iterable[Token], fileobj: IO[bytes], block_tokens: int = BLOCK_TOKENS):
+    """Serialize tokens (a TokenStream or any iterable of Token) to a binary file object."""
+    with TokenWriter(fileobj, block_tokens) as writer:
+        writer.write_all(tokens)
+
+
+def dumps(tokens: Iterable[Token]) -> bytes:
+    """Serialize tokens to bytes."""
+    buffer = io.BytesIO()
+    dump(tokens, buffer)
+    return buffer.getvalue()
+
+
+def iter_load(fileobj: IO[bytes]) -> Iterator[Token]:
+    """Yield the tokens of a serialized stream as they are read."""
+    return iter(TokenReader(fileobj))
+
+
+def load(fileobj: IO[bytes]) -> List[Token]:
+    """Read a whole serialized stream into a list of tokens."""
+    return list(TokenReader(fileobj))
+
+
+def loads(data: bytes) -> List[Token]:
+    """Deserialize tokens from bytes."""
+    return load(io.BytesIO(data))
@@ -0,0 +1,75 @@
+# Interned token values, numbered by a per-stream symbol table
+#
+# Identifier, keyword, operator and delimiter values repeat constantly: a
+# name used 100,000 times in a file would otherwise be 100,000 separate
+# strings. The scanner interns them into a SymbolTable, so equal values
+# share one string object and are also known by a small integer id;
+# comparing two values is then comparing two ints.
+
+import sys
+from typing import Dict, Iterator, List, Optional, Union
+
+from src.token_definitions import DELIMITERS, KEYWORDS, OPERATORS, TokenType
+
+# Id of the tokens whose value is not interned
+NO_SYMBOL = -1
+# Values every table starts with, so keywords, operators and delimiters
+# have the same ids in every table
+PRESEEDED: List[str] = [*KEYWORDS, *OPERATORS, *DELIMITERS]
+# Token types whose values are interned: identifiers and every type with a
+# category flag, which is how the scanner tests for them
+INTERNED_TYPES = frozenset([TokenType.IDENTIFIER, *KEYWORDS.values(), *OPERATORS.values(),
+                            *DELIMITERS.values()])
+
+
+class SymbolTable:
+    """
+    Distinct token values, numbered in order of first appearance after the
+    preseeded keywords, operators and delimiters.
+
+    Values from a bytes source are looked up by their UTF-8 bytes and only
+    decoded the first time they are seen.
+    """
+    def __init__(self):
+        self.names: List[str] = list(PRESEEDED)
+        self.ids: Dict[str, int] = {name: symbol for symbol, name in enumerate(self.names)}
+        self.byte_ids: Dict[bytes, int] = {name.encode('ascii'): symbol
+                                            for symbol, name in enumerate(self.names)}
+
+    def intern(self, value: Union[str, bytes]) -> int:
+        """Id of a value, adding it to the table if it is new."""
+        ids = self.ids if isinstance(value, str) else self.byte_ids
+        symbol = ids.get(value)
+        if symbol is None:
+            symbol = self._add(value)
+        return symbol
+
+    def _add(self, value: Union[str, bytes]) -> int:
+        if isinstance(value, str):
+            name = sys.intern(value)
+        else:
+            value = bytes(value)
+            name = sys.intern(value.decode('utf-8'))
+        symbol = self.ids.get(name)
+        if symbol is None:
+            symbol = self.ids[name] = len(self.names)
+            self.names.append(name)
+        if not isinstance(value, str):
+            self.byte_ids[value] = symbol
+        return symbol
+
+    def find(self, value: str) -> Optional[int]:
+        """Id of a value, or None if no token had it."""
+        return self.ids.get(value)
+
+    def __getitem__(self, symbol: int) -> str:
+        return self.names[symbol]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, value: str) -> bool:
+        return value in self.ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
@@ -2,8 +2,7 @@
 # Responsibility: Token Definition and Management
 
 from enum import Enum
-from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Union
 
 class TokenType(Enum):
     # Keywords
@@ -60,6 +59,70 @@ class TokenType(Enum):
     INDENT = "INDENT"        # Increase in indentation
     DEDENT = "DEDENT"        # Decrease in indentation
     EOF = "EOF"              # End of file marker
+    ERROR = "ERROR"          # Unrecognized input, in error-tolerant mode
+
+# Category flags stored on every TokenType member, so category checks are a
+# single bitwise test instead of a lookup by name
+KEYWORD_FLAG = 1 << 0
+OPERATOR_FLAG = 1 << 1
+DELIMITER_FLAG = 1 << 2
+
+# Lexeme lookup tables shared by the token factories and the scanner
+KEYWORDS = {
+    'if': TokenType.IF,
+    'else': TokenType.ELSE,
+    'while': TokenType.WHILE,
+    'for': TokenType.FOR,
+    'def': TokenType.DEF,
+    'class': TokenType.CLASS,
+    'return': TokenType.RETURN,
+    'import': TokenType.IMPORT,
+    'from': TokenType.FROM,
+    'as': TokenType.AS,
+    'try': TokenType.TRY,
+    'except': TokenType.EXCEPT,
+    'finally': TokenType.FINALLY,
+    'raise': TokenType.RAISE
+}
+
+OPERATORS = {
+    '+': TokenType.PLUS,
+    '-': TokenType.MINUS,
+    '*': TokenType.MULTIPLY,
+    '/': TokenType.DIVIDE,
+    '%': TokenType.MODULO,
+    '**': TokenType.POWER,
+    '=': TokenType.ASSIGN,
+    '+=': TokenType.PLUSASSIGN,
+    '-=': TokenType.MINUSASSIGN,
+    '==': TokenType.EQUALS,
+    '!=': TokenType.NOTEQUALS,
+    '>': TokenType.GREATER,
+    '<': TokenType.LESS,
+    '>=': TokenType.GREATEREQUAL,
+    '<=': TokenType.LESSEQUAL
+}
+
+DELIMITERS = {
+    '(': TokenType.LPAREN,
+    ')': TokenType.RPAREN,
+    '{': TokenType.LBRACE,
+    '}': TokenType.RBRACE,
+    '[': TokenType.LBRACKET,
+    ']': TokenType.RBRACKET,
+    ',': TokenType.COMMA,
+    '.': TokenType.DOT,
+    ':': TokenType.COLON,
+    ';': TokenType.SEMICOLON
+}
+
+for _token_type in TokenType:
+    _token_type.flags = 0
+for _table, _flag in ((KEYWORDS, KEYWORD_FLAG), (OPERATORS, OPERATOR_FLAG),
+                      (DELIMITERS, DELIMITER_FLAG)):
+    for _token_type in _table.values():
+        _token_type.flags |= _flag
+del _token_type, _table, _flag
 
 class Position:
     """Tracks position in source code, including file, line, and column information."""
@@ -92,57 +155,70 @@ class Position:
     def __str__(self) -> str:
         return f"line {self.line}, column {self.column}"
 
-@dataclass
 class Token:
-    type: TokenType
-    value: str
-    line: int
-    column: int
-    position: Optional[Position] = None
+    """
+    A lexical token. Slotted to keep per-token memory small.
+
+    symbol is the id of the value in the scanner's SymbolTable for
+    identifiers, keywords, operators and delimiters, and None otherwise.
+    """
+    __slots__ = ('type', 'value', 'line', 'column', 'position', 'symbol')
+
+    def __init__(self, type: TokenType, value: str, line: int, column: int,
+                 position: Optional[Position] = None, symbol: Optional[int] = None):
+        self.type = type
+        self.value = value
+        self.line = line
+        self.column = column
+        self.position = position
+        self.symbol = symbol
 
     @property
     def is_keyword(self) -> bool:
         """Check if the token is a keyword."""
-        return self.type.name in [
-            'IF', 'ELSE', 'WHILE', 'FOR', 'DEF', 'CLASS', 'RETURN',
-            'IMPORT', 'FROM', 'AS', 'TRY', 'EXCEPT', 'FINALLY', 'RAISE'
-        ]
+        return self.type.flags & KEYWORD_FLAG != 0
 
     @property
     def is_operator(self) -> bool:
         """Check if the token is an operator."""
-        return self.type.name in [
-            'PLUS', 'MINUS', 'MULTIPLY', 'DIVIDE', 'MODULO', 'POWER',
-            'ASSIGN', 'PLUSASSIGN', 'MINUSASSIGN', 'EQUALS', 'NOTEQUALS',
-            'GREATER', 'LESS', 'GREATEREQUAL', 'LESSEQUAL'
-        ]
+        return self.type.flags & OPERATOR_FLAG != 0
 
     @property
     def is_delimiter(self) -> bool:
         """Check if the token is a delimiter."""
-        return self.type.name in [
-            'LPAREN', 'RPAREN', 'LBRACE', 'RBRACE', 'LBRACKET', 'RBRACKET',
-            'COMMA', 'DOT', 'COLON', 'SEMICOLON'
-        ]
-
-    def matches(self, token_type: TokenType, value: Optional[str] = None) -> bool:
-        """Check if token matches a specific type and optionally a value."""
-        if self.type != token_type:
-            return False
-        if value is not None and self.value != value:
+        return self.type.flags & DELIMITER_FLAG != 0
+
+    def matches(self, token_type: TokenType, value: Union[str, int, None] = None) -> bool:
+        """
+        Check if token matches a specific type and optionally a value. The
+        value may be given as a symbol id, which is compared without
+        looking at the text.
+        """
+        if self.type is not token_type:
             return False
-        return True
+        if value is None:
+            return True
+        if type(value) is int:
+            return self.symbol == value
+        return self.value == value
 
     def validate(self) -> bool:
         """Validate token based on its type."""
         try:
             if self.type == TokenType.NUMBER:
-                # Try parsing as float to validate number format
-                float(self.value)
+                # Check the format without decoding the value; imported
+                # here as the pattern matcher depends on this module
+                from src.pattern_matcher import PatternMatcher
+                if PatternMatcher.number_pattern.fullmatch(self.value) is None:
+                    return False
             elif self.type == TokenType.STRING:
-                # Check if string is properly quoted
-                if not (self.value.startswith('"') and self.value.endswith('"') or
-                       self.value.startswith("'") and self.value.endswith("'")):
+                # Check if string is properly quoted, after an optional
+                # prefix such as r, b or f
+                literal = self.value.lstrip('rRbBfFuU')
+                if len(self.value) - len(literal) > 2 or literal[:1] not in ('"', "'"):
+                    return False
+                quote = literal[:3] if literal[:3] in ('"""', "'''") else literal[:1]
+                if len(literal) < 2 * len(quote) or not literal.endswith(quote):
                     return False
             elif self.type == TokenType.IDENTIFIER:
                 # Check identifier naming rules
@@ -156,65 +232,58 @@ class Token:
         pos_str = f" @ {self.position}" if self.position else f", line={self.line}, col={self.column}"
         return f"Token({self.type}, '{self.value}'{pos_str})"
 
+    def __repr__(self) -> str:
+        return (f"Token(type={self.type}, value={self.value!r}, line={self.line}, "
+                f"column={self.column}, position={self.position!r})")
+
     def __eq__(self, other: object) -> bool:
         """Compare two tokens for equality."""
         if not isinstance(other, Token):
             return NotImplemented
         return (
-            self.type == other.type and
+            self.type is other.type and
             self.value == other.value and
             self.line == other.line and
             self.column == other.column
         )
 
+class SourceToken(Token):
+    """
+    A token whose value stays in the UTF-8 encoded source (bytes or mmap)
+    until it is read. Only the offsets of the lexeme are stored.
+    """
+    __slots__ = ('source', 'start', 'end')
+
+    def __init__(self, type: TokenType, source, start: int, end: int, line: int, column: int,
+                 symbol: Optional[int] = None):
+        self.type = type
+        self.source = source
+        self.start = start
+        self.end = end
+        self.line = line
+        self.column = column
+        self.position = None
+        self.symbol = symbol
+
+    @property
+    def value(self) -> str:
+        """Decode the lexeme from the source."""
+        return self.source[self.start:self.end].decode('utf-8')
+
 # Utility functions for token operations
 def create_keyword_token(keyword: str, position: Position) -> Token:
     """Create a token for a keyword."""
-    try:
-        token_type = TokenType[keyword.upper()]
-        return Token(token_type, keyword, position.line, position.column, position)
-    except KeyError:
-        return Token(TokenType.IDENTIFIER, keyword, position.line, position.column, position)
+    token_type = KEYWORDS.get(keyword, TokenType.IDENTIFIER)
+    return Token(token_type, keyword, position.line, position.column, position)
 
 def create_operator_token(operator: str, position: Position) -> Optional[Token]:
     """Create a token for an operator."""
-    operator_map = {
-        '+': TokenType.PLUS,
-        '-': TokenType.MINUS,
-        '*': TokenType.MULTIPLY,
-        '/': TokenType.DIVIDE,
-        '%': TokenType.MODULO,
-        '**': TokenType.POWER,
-        '=': TokenType.ASSIGN,
-        '+=': TokenType.PLUSASSIGN,
-        '-=': TokenType.MINUSASSIGN,
-        '==': TokenType.EQUALS,
-        '!=': TokenType.NOTEQUALS,
-        '>': TokenType.GREATER,
-        '<': TokenType.LESS,
-        '>=': TokenType.GREATEREQUAL,
-        '<=': TokenType.LESSEQUAL
-    }
-    
-    if operator in operator_map:
-        return Token(operator_map[operator], operator, position.line, position.column, position)
+    if operator in OPERATORS:
+        return Token(OPERATORS[operator], operator, position.line, position.column, position)
     return None
 
 def create_delimiter_token(delimiter: str, position: Position) -> Optional[Token]:
     """Create a token for a delimiter."""
-    delimiter_map = {
-        '(': TokenType.LPAREN,
-        ')': TokenType.RPAREN,
-        '{': TokenType.LBRACE,
-        '}': TokenType.RBRACE,
-        '[': TokenType.LBRACKET,
-        ']': TokenType.RBRACKET,
-        ',': TokenType.COMMA,
-        '.': TokenType.DOT,
-        ':': TokenType.COLON,
-        ';': TokenType.SEMICOLON
-    }
-    
-    if delimiter in delimiter_map:
-        return Token(delimiter_map[delimiter], delimiter, position.line, position.column, position)
+    if delimiter in DELIMITERS:
+        return Token(DELIMITERS[delimiter], delimiter, position.line, position.column, position)
     return None
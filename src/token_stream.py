@@ -0,0 +1,336 @@
+# Columnar token storage for large token sequences
+
+from array import array
+from bisect import bisect_left
+from itertools import compress
+from typing import Iterable, Iterator, List, Optional, Union, overload
+from src.token_definitions import Token, SourceToken, TokenType
+from src.line_index import LineIndex, LazyPosition
+from src.numeric import Number, NumberTable, shifted
+from src.symbols import INTERNED_TYPES, NO_SYMBOL, SymbolTable
+
+# Compact integer code for every token type, stored in the type column
+TOKEN_TYPES: List[TokenType] = list(TokenType)
+TYPE_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+
+
+class TokenStream:
+    """
+    A sequence of tokens stored as parallel arrays instead of Token objects.
+
+    Each token costs a type code, a source offset, a length, a line and a
+    column. Token values are not stored; they are sliced out of the source
+    when a Token is materialized by indexing or iteration. A bytes or mmap
+    source holds UTF-8 text; offsets and lengths then count bytes and tokens
+    are materialized as SourceToken, which decodes its value on access.
+
+    The values of NUMBER tokens are kept decoded in a NumberTable. The
+    scanner fills it as it scans; for streams built otherwise (from a cache
+    entry, for instance) it is decoded once, on first access.
+
+    Identifier, keyword, operator and delimiter values are interned the
+    same way into a SymbolTable shared with the scanner, and symbol_ids
+    holds the id of every token's value (NO_SYMBOL for the others).
+    Materialized tokens carry that id and share the table's strings.
+
+    After an incremental edit the tokens following it may be stored short
+    of their true offset and line, by a shift that is applied when the
+    starts or lines columns are read. Single tokens, values and positions
+    are looked up without applying it.
+    """
+    def __init__(self, source):
+        self.source = source
+        self.types = array('B')
+        self._starts = array('q')
+        self.lengths = array('l')
+        self._lines = array('l')
+        self.columns = array('l')
+        # Pending shift: tokens from _shift_index on are stored _shift_starts
+        # short of their offset and _shift_lines short of their line
+        self._shift_index = 0
+        self._shift_starts = 0
+        self._shift_lines = 0
+        self._line_index: Optional[LineIndex] = None
+        self._numbers: Optional[NumberTable] = None
+        self._symbols: Optional[SymbolTable] = None
+        self._symbol_ids: Optional[array] = None
+
+    @property
+    def starts(self) -> array:
+        """Offset of every token in the source."""
+        self._settle()
+        return self._starts
+
+    @starts.setter
+    def starts(self, column: array):
+        self._settle()
+        self._starts = column
+
+    @property
+    def lines(self) -> array:
+        """Line of every token."""
+        self._settle()
+        return self._lines
+
+    @lines.setter
+    def lines(self, column: array):
+        self._settle()
+        self._lines = column
+
+    def _move_shift(self, index: int):
+        """
+        Make the pending shift start at token index, applying it to the
+        tokens between its old start and index or taking it back from them.
+        Only those tokens are touched.
+        """
+        here = self._shift_index
+        if self._shift_starts or self._shift_lines:
+            low, high, sign = (here, index, 1) if index > here else (index, here, -1)
+            self._starts[low:high] = shifted(self._starts[low:high], sign * self._shift_starts)
+            self._lines[low:high] = shifted(self._lines[low:high], sign * self._shift_lines)
+        self._shift_index = index
+
+    def _settle(self):
+        """Apply the pending shift to every token."""
+        if self._shift_starts or self._shift_lines:
+            self._move_shift(len(self.types))
+        self._shift_index = self._shift_starts = self._shift_lines = 0
+
+    def _start(self, index: int) -> int:
+        """Offset of the token at a non-negative index."""
+        start = self._starts[index]
+        return start + self._shift_starts if index >= self._shift_index else start
+
+    def _line(self, index: int) -> int:
+        """Line of the token at a non-negative index."""
+        line = self._lines[index]
+        return line + self._shift_lines if index >= self._shift_index else line
+
+    def _bisect_starts(self, offset: int, low: int = 0) -> int:
+        """bisect_left of offset in the token offsets from low on."""
+        shift = self._shift_index
+        if low < shift:
+            index = bisect_left(self._starts, offset, low, shift)
+            if index < shift:
+                return index
+            low = shift
+        return bisect_left(self._starts, offset - self._shift_starts, low)
+
+    def append(self, token_type: TokenType, start: int, length: int, line: int, column: int):
+        """Add a token given by its position in the source."""
+        if self._shift_starts or self._shift_lines:
+            self._settle()
+        self.types.append(TYPE_CODES[token_type])
+        self._starts.append(start)
+        self.lengths.append(length)
+        self._lines.append(line)
+        self.columns.append(column)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    @overload
+    def __getitem__(self, index: int) -> Token: ...
+    @overload
+    def __getitem__(self, index: slice) -> 'TokenStream': ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Token, 'TokenStream']:
+        if isinstance(index, slice):
+            stream = TokenStream(self.source)
+            stream.types = self.types[index]
+            stream.starts = self.starts[index]
+            stream.lengths = self.lengths[index]
+            stream.lines = self.lines[index]
+            stream.columns = self.columns[index]
+            if self._numbers is not None:
+                start, stop, step = index.indices(len(self))
+                if step == 1:
+                    stream._numbers = self._numbers.slice(start, stop)
+                else:
+                    selectors = bytearray(len(self))
+                    selectors[index] = b'\x01' * len(stream)
+                    stream._numbers = self._numbers.select(selectors)
+            if self._symbol_ids is not None:
+                stream._symbols = self._symbols
+                stream._symbol_ids = self._symbol_ids[index]
+            return stream
+        if index < 0:
+            index += len(self.types)
+        token_type = TOKEN_TYPES[self.types[index]]
+        start, line = self._start(index), self._line(index)
+        end = start + self.lengths[index]
+        symbol = None
+        if self._symbol_ids is not None and self._symbol_ids[index] != NO_SYMBOL:
+            symbol = self._symbol_ids[index]
+        if not isinstance(self.source, str):
+            return SourceToken(token_type, self.source, start, end,
+                               line, self.columns[index], symbol)
+        value = self.source[start:end] if symbol is None else self._symbols.names[symbol]
+        return Token(token_type, value, line, self.columns[index], None, symbol)
+
+    def __iter__(self) -> Iterator[Token]:
+        if self._symbol_ids is not None:
+            yield from self._iter_symbols()
+            return
+        source = self.source
+        token_types = TOKEN_TYPES
+        columns = zip(self.types, self.starts, self.lengths, self.lines, self.columns)
+        if not isinstance(source, str):
+            for code, start, length, line, column in columns:
+                yield SourceToken(token_types[code], source, start, start + length, line, column)
+            return
+        for code, start, length, line, column in columns:
+            yield Token(token_types[code], source[start:start + length], line, column)
+
+    def _iter_symbols(self) -> Iterator[Token]:
+        """__iter__ for a stream with symbol ids: interned values are shared."""
+        source = self.source
+        token_types = TOKEN_TYPES
+        names = self._symbols.names
+        columns = zip(self.types, self.starts, self.lengths, self.lines, self.columns,
+                      self._symbol_ids)
+        if not isinstance(source, str):
+            for code, start, length, line, column, symbol in columns:
+                yield SourceToken(token_types[code], source, start, start + length, line, column,
+                                  None if symbol == NO_SYMBOL else symbol)
+            return
+        for code, start, length, line, column, symbol in columns:
+            if symbol == NO_SYMBOL:
+                yield Token(token_types[code], source[start:start + length], line, column)
+            else:
+                yield Token(token_types[code], names[symbol], line, column, None, symbol)
+
+    def type_at(self, index: int) -> TokenType:
+        """Return the type of a token without materializing it."""
+        return TOKEN_TYPES[self.types[index]]
+
+    def value_at(self, index: int) -> str:
+        """Return the value of a token without materializing it."""
+        if index < 0:
+            index += len(self.types)
+        start = self._start(index)
+        value = self.source[start:start + self.lengths[index]]
+        if not isinstance(value, str):
+            value = value.decode('utf-8')
+        return value
+
+    def count(self, token_type: TokenType) -> int:
+        """Count tokens of the given type."""
+        return self.types.count(TYPE_CODES[token_type])
+
+    def filter(self, token_types: Iterable[TokenType]) -> 'TokenStream':
+        """Return a new stream holding only the tokens of the given types."""
+        table = bytearray(256)
+        for token_type in token_types:
+            table[TYPE_CODES[token_type]] = 1
+        selectors = self.types.tobytes().translate(table)
+        stream = TokenStream(self.source)
+        for name in ('types', 'starts', 'lengths', 'lines', 'columns'):
+            column = getattr(self, name)
+            setattr(stream, name, array(column.typecode, compress(column, selectors)))
+        if self._numbers is not None:
+            stream._numbers = self._numbers.select(selectors)
+        if self._symbol_ids is not None:
+            stream._symbols = self._symbols
+            stream._symbol_ids = array('i', compress(self._symbol_ids, selectors))
+        return stream
+
+    @property
+    def symbols(self) -> SymbolTable:
+        """Interned values of the identifier, keyword, operator and delimiter tokens."""
+        if self._symbol_ids is None:
+            self._intern()
+        return self._symbols
+
+    @property
+    def symbol_ids(self) -> array:
+        """Symbol id of every token, or NO_SYMBOL for values that are not interned."""
+        if self._symbol_ids is None:
+            self._intern()
+        return self._symbol_ids
+
+    def symbol_at(self, index: int) -> Optional[int]:
+        """Symbol id of a token's value, or None if it is not interned."""
+        symbol = self.symbol_ids[index]
+        return None if symbol == NO_SYMBOL else symbol
+
+    def _intern(self):
+        """Intern the values of a stream that was not built by the scanner."""
+        symbols = SymbolTable() if self._symbols is None else self._symbols
+        intern = symbols.intern
+        interned = bytearray(256)
+        for token_type in INTERNED_TYPES:
+            interned[TYPE_CODES[token_type]] = 1
+        source = self.source
+        self._symbol_ids = array('i', (
+            intern(source[start:start + length]) if interned[code] else NO_SYMBOL
+            for code, start, length in zip(self.types, self.starts, self.lengths)))
+        self._symbols = symbols
+
+    @property
+    def numbers(self) -> NumberTable:
+        """Decoded values of the NUMBER tokens."""
+        if self._numbers is None:
+            numbers = NumberTable()
+            code = TYPE_CODES[TokenType.NUMBER]
+            for index, token_code in enumerate(self.types):
+                if token_code == code:
+                    numbers.add(index, self.value_at(index))
+            self._numbers = numbers
+        return self._numbers
+
+    def number_at(self, index: int) -> Optional[Number]:
+        """Value of the token at index if it is a NUMBER, without parsing it again."""
+        if index < 0:
+            index += len(self)
+        return self.numbers.value_of(index)
+
+    @property
+    def line_index(self) -> LineIndex:
+        """Line start offsets of the source, built on first use."""
+        if self._line_index is None or self._line_index.source is not self.source:
+            self._line_index = LineIndex(self.source)
+        return self._line_index
+
+    def index_at(self, offset: int) -> Optional[int]:
+        """
+        Index of the token covering a source offset, or None if the offset
+        falls between tokens. Tokens are ordered by offset, so this is a
+        binary search.
+        """
+        index = self._bisect_starts(offset + 1) - 1
+        if index < 0:
+            return None
+        start, length = self._start(index), self.lengths[index]
+        if offset < start + length or (offset == start and not length):
+            return index
+        return None
+
+    def token_at(self, line: int, column: int) -> Optional[Token]:
+        """The token covering a line and column, or None."""
+        index = self.index_at(self.line_index.offset(line, column))
+        return None if index is None else self[index]
+
+    def position(self, index: int, filename: str = "<unknown>") -> LazyPosition:
+        """Position of a token, with its line and column resolved from the line index on access."""
+        if index < 0:
+            index += len(self.types)
+        return self.line_index.make_position(self._start(index), filename)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # Cheap to rebuild, and would otherwise carry a second copy of the source
+        state['_line_index'] = None
+        if not isinstance(self.source, (str, bytes, type(None))):
+            # A memory-mapped source is copied so the stream can be pickled
+            state['source'] = self.source[:]
+        return state
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the token columns, excluding the source."""
+        size = sum(column.itemsize * len(column) for column in
+                   (self.types, self._starts, self.lengths, self._lines, self.columns))
+        if self._symbol_ids is not None:
+            size += self._symbol_ids.itemsize * len(self._symbol_ids)
+        return size + (self._numbers.nbytes if self._numbers is not None else 0)
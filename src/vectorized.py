@@ -0,0 +1,285 @@
+# Optional numpy prepass for large, mostly ASCII sources
+#
+# Every character is mapped to a class through a lookup table, and the
+# boundaries of identifier, number, operator, delimiter and line break
+# tokens are found with vectorized run detection. Lines made only of such
+# simple tokens are emitted from those boundaries without running the
+# master pattern; every other line (strings, comments, line joins,
+# non-ASCII text, errors and operators that need munching) is handed back
+# to the scalar scanning loop, so the output is exactly that of Scanner.
+
+import string
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from src.pattern_matcher import LEXEME_TYPES, LEXEME_TYPES_BYTES
+from src.token_definitions import OPERATORS, TokenType
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if TYPE_CHECKING:
+    from src.scanner import RawToken, Scanner
+
+# Character classes
+WORD, DIGIT, BLANK, NEWLINE, OPERATOR, DELIMITER, TRICKY = range(7)
+# Kinds of the tokens found by the prepass, indexing KIND_TYPES
+IDENTIFIER_KIND, NUMBER_KIND, SYMBOL_KIND, NEWLINE_KIND = range(4)
+# Symbols take their type from LEXEME_TYPES
+KIND_TYPES = (TokenType.IDENTIFIER, TokenType.NUMBER, None, TokenType.NEWLINE)
+
+OPERATOR_CHARACTERS = '+-*/%=!<>'
+DELIMITER_CHARACTERS = '()[]{},.:;'
+# Operator characters that are not a token on their own
+INCOMPLETE_OPERATORS = '!'
+# Shortest run of simple lines taken out of the scalar loop, and smallest
+# share of the source in such runs for the prepass to be used at all
+MIN_SIMPLE_LINES = 2
+MIN_SIMPLE_SHARE = 0.25
+# Characters at the start of a large source classified first to estimate
+# that share
+SAMPLE_SIZE = 16 * 1024
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _class_table():
+    """Class of every character code up to 255; TRICKY for anything else."""
+    table = np.full(256, TRICKY, dtype=np.uint8)
+    for characters, char_class in ((string.ascii_letters + '_', WORD), (string.digits, DIGIT),
+                                   (' \t\f', BLANK), ('\n', NEWLINE),
+                                   (OPERATOR_CHARACTERS, OPERATOR),
+                                   (DELIMITER_CHARACTERS, DELIMITER)):
+        table[[ord(char) for char in characters]] = char_class
+    return table
+
+
+if np is not None:
+    CLASS_TABLE = _class_table()
+    # Token kind of a simple token by the class of its first character
+    KIND_TABLE = np.array([IDENTIFIER_KIND, NUMBER_KIND, 0, NEWLINE_KIND, SYMBOL_KIND,
+                           SYMBOL_KIND, 0], dtype=np.uint8)
+    # Two-character operators, as first code * 256 + second code
+    OPERATOR_PAIRS = np.array([ord(op[0]) * 256 + ord(op[1]) for op in OPERATORS if len(op) == 2])
+
+
+# Consecutive lines that are all simple or all handed to the scalar loop:
+# (begin, end, simple, first token, last token), the tokens being the slice
+# of Prepass.starts holding those of a simple segment
+Segment = Tuple[int, int, bool, int, int]
+
+
+class Prepass(NamedTuple):
+    # Offsets and kinds of the tokens of the simple lines, in source order
+    starts: List[int]
+    ends: List[int]
+    kinds: List[int]
+    segments: List[Segment]
+
+
+def _classes(source: Union[str, bytes]):
+    """The character class of every character of the source."""
+    if isinstance(source, str):
+        if not source.isascii():
+            codes = np.frombuffer(source.encode('utf-32-le'), dtype='<u4')
+            return codes, CLASS_TABLE[np.minimum(codes, 255)]
+        source = source.encode('ascii')
+    codes = np.frombuffer(source, dtype=np.uint8)
+    return codes, CLASS_TABLE[codes]
+
+
+def _first_and_last(mask):
+    """Masks of the first and of the last element of every run of true values."""
+    first = mask.copy()
+    first[1:] &= ~mask[:-1]
+    last = mask.copy()
+    last[:-1] &= ~mask[1:]
+    return first, last
+
+
+def _tricky_lines(tricky, line_starts, first_line_tricky: bool, min_lines: int):
+    """
+    Mask of the lines holding a tricky character. Handing the scalar loop a
+    few lines costs more than it saves, so runs of fewer than min_lines
+    simple lines count as tricky too.
+    """
+    tricky_lines = np.logical_or.reduceat(tricky, line_starts)
+    tricky_lines[0] |= first_line_tricky
+    run_starts, run_lasts = (np.flatnonzero(mask) for mask in _first_and_last(~tricky_lines))
+    short = run_lasts - run_starts < min_lines - 1
+    cover = np.zeros(len(tricky_lines) + 1, dtype=np.int32)
+    np.add.at(cover, run_starts[short], 1)
+    np.add.at(cover, run_lasts[short] + 1, -1)
+    tricky_lines |= np.cumsum(cover[:-1]) > 0
+    return tricky_lines
+
+
+def _lines(classes):
+    """Start offsets and lengths of the lines."""
+    size = len(classes)
+    line_starts = np.flatnonzero(classes == NEWLINE) + 1
+    line_starts = np.concatenate(([0], line_starts[line_starts < size]))
+    return line_starts, np.diff(line_starts, append=size)
+
+
+def _simple_share(classes, first_line_tricky: bool, min_lines: int) -> float:
+    """Share of the characters outside lines holding a TRICKY character."""
+    line_starts, line_lengths = _lines(classes)
+    tricky_lines = _tricky_lines(classes == TRICKY, line_starts, first_line_tricky, min_lines)
+    return line_lengths[~tricky_lines].sum() / len(classes)
+
+
+def prepass(source: Union[str, bytes], first_line_tricky: bool = False,
+            min_lines: int = MIN_SIMPLE_LINES,
+            min_share: float = MIN_SIMPLE_SHARE) -> Optional[Prepass]:
+    """
+    Classify the source and find its simple tokens and tricky lines. A line
+    is tricky if it holds a character of the TRICKY class, a number the
+    master pattern would read differently from a run of digits (digits
+    next to a letter or a '.', or with a leading zero), or an operator run
+    that is not one or two complete operators.
+
+    Returns None when less than min_share of the source is in runs of at
+    least min_lines simple lines, where the scalar loop alone is faster.
+    """
+    # Give up before classifying the whole source if strings and comments
+    # alone leave too little to the prepass in a sample from its start
+    if len(source) > 2 * SAMPLE_SIZE:
+        sample = source[:SAMPLE_SIZE]
+        sample = sample[:sample.rfind('\n' if isinstance(sample, str) else b'\n') + 1]
+        if sample and _simple_share(_classes(sample)[1], first_line_tricky, min_lines) < min_share:
+            return None
+    codes, classes = _classes(source)
+    size = len(codes)
+    if not size:
+        return Prepass([], [], [], [])
+    tricky = classes == TRICKY
+    line_starts, line_lengths = _lines(classes)
+
+    # Identifiers and numbers are runs of word characters; every other
+    # simple token starts and ends on a single character, except for the
+    # two-character operators
+    starts, lasts = _first_and_last(classes <= DIGIT)
+    symbols = (classes >= NEWLINE) & ~tricky
+    starts |= symbols
+    lasts |= symbols
+
+    digits = classes == DIGIT
+    number_starts = np.flatnonzero(starts & digits)
+    if len(number_starts):
+        digit_lasts = np.flatnonzero(_first_and_last(digits)[1])
+        after = digit_lasts[np.searchsorted(digit_lasts, number_starts)] + 1
+        next_code = codes[np.minimum(after, size - 1)]
+        joins_next = (CLASS_TABLE[np.minimum(next_code, 255)] == WORD) | (next_code == ord('.'))
+        # Leading zeros split a run of digits, and a '.' before it makes a float
+        leading_zero = (codes[number_starts] == ord('0')) & (after - number_starts > 1)
+        after_point = codes[np.maximum(number_starts - 1, 0)] == ord('.')
+        tricky[number_starts[((after < size) & joins_next) | leading_zero | after_point]] = True
+
+    operator_starts, operator_lasts = (np.flatnonzero(mask)
+                                       for mask in _first_and_last(classes == OPERATOR))
+    if len(operator_starts):
+        lengths = operator_lasts - operator_starts + 1
+        first = codes[operator_starts].astype(np.int64)
+        second = codes[np.minimum(operator_starts + 1, size - 1)].astype(np.int64)
+        incomplete = ord(INCOMPLETE_OPERATORS)
+        pairs = lengths == 2
+        joined = pairs & np.isin(first * 256 + second, OPERATOR_PAIRS)
+        valid = (((lengths == 1) & (first != incomplete)) | joined |
+                 (pairs & (first != incomplete) & (second != incomplete)))
+        tricky[operator_starts[~valid]] = True
+        lasts[operator_starts[joined]] = False
+        starts[operator_starts[joined] + 1] = False
+
+    tricky_lines = _tricky_lines(tricky, line_starts, first_line_tricky, min_lines)
+    if line_lengths[~tricky_lines].sum() < min_share * size:
+        return None
+
+    # Offsets where simple and tricky lines alternate
+    bounds = np.concatenate(([0], np.flatnonzero(tricky_lines[1:] != tricky_lines[:-1]) + 1,
+                             [len(tricky_lines)]))
+    offsets = np.append(line_starts, size)[bounds]
+    # Only the tokens of simple lines are kept
+    token_starts = np.flatnonzero(starts)
+    token_ends = np.flatnonzero(lasts) + 1
+    simple = ~np.repeat(tricky_lines, line_lengths)[token_starts]
+    token_starts, token_ends = token_starts[simple], token_ends[simple]
+    kinds = KIND_TABLE[classes[token_starts]]
+    token_bounds = np.searchsorted(token_starts, offsets)
+    segments = list(zip(offsets[:-1].tolist(), offsets[1:].tolist(),
+                        (~tricky_lines[bounds[:-1]]).tolist(),
+                        token_bounds[:-1].tolist(), token_bounds[1:].tolist()))
+    return Prepass(token_starts.tolist(), token_ends.tolist(), kinds.tolist(), segments)
+
+
+def scan(scanner: 'Scanner') -> Iterator['RawToken']:
+    """
+    Scanner._scan for a whole in-memory source, taking simple lines from the
+    prepass. The scanner's layout state (line, indentation, bracket depth)
+    is carried between the simple lines and the scalar loop. A string
+    literal may run past the tricky lines it starts on; the scalar loop then
+    scans to the end of the line it closes on, and the lines it took are
+    skipped here.
+    """
+    from src.scanner import CLOSING_BRACKETS, OPENING_BRACKETS, TAB_SIZE
+
+    source = scanner.source
+    plan = prepass(source, scanner.current > 0, MIN_SIMPLE_LINES, MIN_SIMPLE_SHARE)
+    if plan is None:
+        yield from scanner._scan()
+        return
+    starts, ends, kinds = plan.starts, plan.ends, plan.kinds
+    lexeme_types = LEXEME_TYPES if isinstance(source, str) else LEXEME_TYPES_BYTES
+    kind_types = KIND_TYPES
+    indents = scanner.indents
+    base = scanner.offset
+    for begin, stop, simple, first_token, last_token in plan.segments:
+        if scanner.current >= stop:
+            # Inside a multi-line string the scalar loop has already read
+            continue
+        if not simple:
+            if stop == len(source):
+                break
+            yield from scanner._scan(stop=stop)
+            continue
+        if scanner.current > begin:
+            begin = scanner.current
+            first_token = bisect_left(starts, begin, first_token, last_token)
+        line = scanner.line
+        line_start = begin
+        depth = scanner.paren_depth
+        at_line_start = scanner.at_line_start
+        for start, end, kind in zip(starts[first_token:last_token], ends[first_token:last_token],
+                                    kinds[first_token:last_token]):
+            if kind == NEWLINE_KIND:
+                if not at_line_start and not depth:
+                    yield (TokenType.NEWLINE, source[start:end], base + start, line,
+                           start - line_start + 1)
+                    at_line_start = True
+                line += 1
+                line_start = end
+                continue
+            lexeme = source[start:end]
+            column = start - line_start + 1
+            token_type = lexeme_types.get(lexeme) or kind_types[kind]
+            if at_line_start:
+                at_line_start = False
+                indentation = source[line_start:start]
+                width = len(indentation.expandtabs(TAB_SIZE))
+                if width != indents[-1]:
+                    yield from scanner._indent(width, indentation, base + line_start, line, column)
+            if token_type in OPENING_BRACKETS:
+                depth += 1
+            elif token_type in CLOSING_BRACKETS and depth:
+                depth -= 1
+            yield (token_type, lexeme, base + start, line, column)
+        scanner.start = scanner.current = stop
+        scanner.line = line
+        scanner.column = stop - line_start + 1
+        scanner.paren_depth = depth
+        scanner.at_line_start = at_line_start
+    yield from scanner._scan()
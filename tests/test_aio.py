@@ -0,0 +1,108 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.aio import alex
+from src.pattern_matcher import LexicalError
+from src.scanner import Scanner
+from src.token_definitions import TokenType
+
+SOURCE = 'def f(x):\n    s = "héllo"  # note\n    if x:\n        return (x,\n                1)\n\n' * 300
+
+class ChunkReader:
+    """Async reader returning fixed size pieces, counting the reads."""
+    def __init__(self, data, size):
+        self.data, self.size, self.reads = data, size, 0
+
+    async def read(self, n):
+        self.reads += 1
+        piece, self.data = self.data[:min(n, self.size)], self.data[min(n, self.size):]
+        return piece
+
+def stream_reader(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+async def collect(reader, **options):
+    return [(token.type, token.value, token.line, token.column)
+            async for token in alex(reader, **options)]
+
+def expected(source):
+    return [(token.type, token.value, token.line, token.column)
+            for token in Scanner(source).scan_tokens()]
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_matches_scan_tokens(size):
+    data = SOURCE.encode()
+    assert asyncio.run(collect(ChunkReader(data, size), yield_every_tokens=50)) == expected(SOURCE)
+
+async def collect_stream(data, **options):
+    return await collect(stream_reader(data), **options)
+
+def test_stream_reader_without_final_newline():
+    source = "x = 1\nif x:\n\n    y = 'é'"
+    assert asyncio.run(collect_stream(source.encode(), chunk_size=3)) == expected(source)
+
+def test_executor():
+    async def run():
+        with ThreadPoolExecutor(1) as executor:
+            return await collect_stream(SOURCE.encode(), executor=executor)
+    assert asyncio.run(run()) == expected(SOURCE)
+
+def test_errors():
+    assert asyncio.run(collect_stream(b"a = $\n", tolerant=True))[2][0] is TokenType.ERROR
+    with pytest.raises(LexicalError):
+        asyncio.run(collect_stream(b"a = $\n"))
+
+def test_literal_spanning_many_reads_is_joined_once():
+    def elapsed(lines):
+        source = 'x = 1\ns = """' + "docstring line\n" * lines + '"""\ny = 2\n'
+        reader = ChunkReader(source.encode(), 65536)
+        began = time.perf_counter()
+        tokens = asyncio.run(collect(reader, chunk_size=65536))
+        seconds = time.perf_counter() - began
+        assert tokens == expected(source)
+        return seconds
+    small, large = elapsed(100_000), elapsed(400_000)
+    assert large < small * 4 * 2 + 0.05
+
+def test_backpressure():
+    reader = ChunkReader(SOURCE.encode() * 10, 10_000)
+    async def first_tokens():
+        tokens = alex(reader, chunk_size=1024)
+        for _ in range(5):
+            await tokens.__anext__()
+        await tokens.aclose()
+    asyncio.run(first_tokens())
+    # Only the input needed for the first batch was read
+    assert reader.reads == 1 and len(reader.data) > 100_000
+
+@pytest.mark.parametrize("offload", [False, True])
+def test_event_loop_stays_responsive(offload):
+    data = SOURCE.encode() * 4
+    async def run():
+        gaps = []
+        done = asyncio.Event()
+        async def ticker():
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+        task = asyncio.create_task(ticker())
+        with ThreadPoolExecutor(1) as executor:
+            began = time.perf_counter()
+            count = 0
+            async for _ in alex(stream_reader(data), yield_every_tokens=200,
+                                executor=executor if offload else None):
+                count += 1
+            elapsed = time.perf_counter() - began
+        done.set()
+        await task
+        return count, elapsed, max(gaps)
+    count, elapsed, worst = asyncio.run(run())
+    assert count > 30_000
+    assert worst < elapsed / 10
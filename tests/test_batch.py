@@ -0,0 +1,52 @@
+import pytest
+from src.batch import BatchSummary, iter_source_files, lex_many, plan_batches
+from src.__main__ import main
+
+@pytest.fixture
+def source_tree(tmp_path):
+    package = tmp_path / "package"
+    (package / "sub").mkdir(parents=True)
+    (package / "__pycache__").mkdir()
+    (package / "a.py").write_text("x = 1\n")
+    (package / "sub" / "b.py").write_text("def f():\n    return 2\n" * 20)
+    (package / "sub" / "broken.py").write_text("x = $\n")
+    (package / "notes.txt").write_text("not python")
+    (package / "__pycache__" / "a.py").write_text("x = 1\n")
+    return package
+
+def test_iter_source_files(source_tree):
+    names = [path.replace(str(source_tree), "") for path in iter_source_files([str(source_tree)])]
+    assert sorted(names) == ["/a.py", "/sub/b.py", "/sub/broken.py"]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_lex_many(source_tree, workers):
+    results = {result.path.rsplit("/", 1)[-1]: result
+               for result in lex_many([str(source_tree)], workers=workers)}
+    assert set(results) == {"a.py", "b.py", "broken.py"}
+    assert results["a.py"].ok and results["a.py"].token_count == 5
+    assert results["b.py"].token_count == 20 * 11 + 1
+    assert not results["broken.py"].ok
+    assert "LexicalError" in results["broken.py"].error
+
+def test_lex_many_keeps_tokens(source_tree):
+    results = list(lex_many([str(source_tree / "a.py")], workers=2, keep_tokens=True))
+    assert [token.value for token in results[0].tokens] == ["x", "=", "1", "\n", ""]
+
+def test_plan_batches_balances_by_size():
+    sized = [(1000, "big.py")] + [(10, f"small{i}.py") for i in range(100)]
+    batches = plan_batches(sized, workers=2)
+    assert batches[0] == ["big.py"]
+    assert sorted(path for batch in batches for path in batch) == sorted(path for _, path in sized)
+    assert len(batches) > 2
+
+def test_summary_and_cli(source_tree, capsys):
+    summary = BatchSummary()
+    for result in lex_many([str(source_tree)], workers=1):
+        summary.add(result)
+    assert (summary.files, summary.failed) == (3, 1)
+    assert summary.tokens == 5 + 20 * 11 + 1
+
+    assert main([str(source_tree), "-j", "1", "-q"]) == 1
+    captured = capsys.readouterr()
+    assert "broken.py: error" in captured.err
+    assert "3 files (1 failed), 226 tokens" in captured.out
@@ -0,0 +1,56 @@
+import json
+import pytest
+from benchmarks.__main__ import main
+from benchmarks.compare import compare, regressions
+from benchmarks.corpus import CORPORA, write_files
+from benchmarks.suite import BENCHMARKS, run_suite, select
+from src.scanner import Scanner
+
+@pytest.mark.parametrize("name", sorted(CORPORA))
+def test_corpora_are_deterministic_and_valid(name):
+    source = CORPORA[name](8)
+    assert source == CORPORA[name](8)
+    assert len(source) >= 8 * 1024
+    assert len(Scanner(source).scan_tokens()) > 100
+
+def test_write_files(tmp_path):
+    paths = write_files(str(tmp_path), 16, 4)
+    assert len(paths) == 4
+    assert all(Scanner(open(path).read()).scan_tokens() for path in paths)
+
+def test_select():
+    assert select() == list(BENCHMARKS)
+    assert select(["scanner/*"]) == [name for name in BENCHMARKS if name.startswith("scanner/")]
+    assert "files/many-small-files" in BENCHMARKS
+
+def test_run_suite_in_process():
+    document = run_suite(["scanner/mixed", "files/one-huge-file"], size_kb=4, repeat=1, isolate=False)
+    first, second = document["results"]
+    assert first["name"] == "scanner/mixed" and first["tokens"] > 0
+    assert first["tokens_per_sec"] > 0 and first["mb_per_sec"] > 0
+    assert second["bytes"] >= 4 * 1024
+    json.dumps(document)
+
+def results(**rates):
+    return {"version": 1, "results": [{"name": name, "tokens_per_sec": rate}
+                                      for name, rate in rates.items()]}
+
+def test_compare_flags_regressions_past_threshold():
+    comparisons = compare(results(a=100.0, b=100.0, c=100.0), results(a=95.0, b=80.0, d=50.0))
+    assert [comparison.name for comparison in regressions(comparisons, 0.10)] == ["b"]
+    assert [comparison.name for comparison in regressions(comparisons, 0.25)] == []
+    assert {comparison.name for comparison in comparisons} == {"a", "b", "c", "d"}
+
+def test_compare_command(tmp_path, capsys):
+    baseline, current = tmp_path / "baseline.json", tmp_path / "current.json"
+    baseline.write_text(json.dumps(results(a=100.0)))
+    current.write_text(json.dumps(results(a=70.0)))
+    assert main(["compare", str(baseline), str(current)]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
+    assert main(["compare", str(baseline), str(current), "--threshold", "0.5"]) == 0
+
+def test_run_command(tmp_path):
+    output = tmp_path / "results.json"
+    assert main(["run", "--only", "analyzer/strings", "--size-kb", "2", "--repeat", "1",
+                 "--no-isolate", "-o", str(output)]) == 0
+    assert [result["name"] for result in json.loads(output.read_text())["results"]] == ["analyzer/strings"]
@@ -0,0 +1,88 @@
+import os
+import time
+from src.cache import TokenCache, lexer_fingerprint
+from src.main import LexicalAnalyzer
+from src.batch import lex_many
+from src.scanner import Scanner
+from src.token_definitions import TokenType
+
+SOURCE = "def f(x):\n    return x + 1  # one\n\nprint(f('a'))\n"
+
+def test_miss_then_hit(tmp_path):
+    cache = TokenCache(str(tmp_path))
+    first = LexicalAnalyzer(SOURCE, cache).analyze()
+    second = LexicalAnalyzer(SOURCE, cache).analyze()
+    assert first == second == Scanner(SOURCE).scan_tokens()
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+def test_hits_carry_symbol_ids(tmp_path):
+    cache = TokenCache(str(tmp_path))
+    for source in (SOURCE, SOURCE.encode()):
+        for _ in range(2):
+            analyzer = LexicalAnalyzer(source, cache)
+            tokens = analyzer.analyze()
+            x = analyzer.scanner.symbols.find("x")
+            assert tokens[3].matches(TokenType.IDENTIFIER, x)
+            assert [token.symbol for token in tokens] == [
+                token.symbol for token in Scanner(source).scan_tokens()]
+    assert (cache.stats.hits, cache.stats.misses) == (2, 2)
+
+def test_bytes_and_str_sources_are_kept_apart(tmp_path):
+    cache = TokenCache(str(tmp_path))
+    text = "s = 'é'\n"
+    LexicalAnalyzer(text, cache).token_stream()
+    stream = LexicalAnalyzer(text.encode('utf-8'), cache).token_stream()
+    assert cache.stats.misses == 2
+    assert [token.value for token in stream] == ["s", "=", "'é'", "\n", ""]
+
+def test_changed_source_misses(tmp_path):
+    cache = TokenCache(str(tmp_path))
+    LexicalAnalyzer(SOURCE, cache).token_stream()
+    LexicalAnalyzer(SOURCE + "y = 2\n", cache).token_stream()
+    assert cache.stats.misses == 2 and cache.stats.hits == 0
+
+def test_fingerprint_is_part_of_the_key(tmp_path):
+    cache = TokenCache(str(tmp_path))
+    other = TokenCache(str(tmp_path))
+    other.fingerprint = lexer_fingerprint()[::-1]
+    cache.put(SOURCE, Scanner(SOURCE).scan_token_stream())
+    assert other.get(SOURCE) is None
+    assert cache.get(SOURCE) is not None
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = TokenCache(str(tmp_path))
+    cache.put(SOURCE, Scanner(SOURCE).scan_token_stream())
+    path = tmp_path / (cache.key(SOURCE) + ".tokens")
+    path.write_bytes(path.read_bytes()[:-3])
+    assert cache.get(SOURCE) is None
+    assert not path.exists()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+def test_lru_eviction(tmp_path):
+    sources = [f"x{i} = {i}\n" * 50 for i in range(6)]
+    entry_size = len(TokenCache._encode(Scanner(sources[0]).scan_token_stream()))
+    cache = TokenCache(str(tmp_path), max_bytes=entry_size * 9 // 2)
+    now = time.time()
+    for age, source in enumerate(sources[:4]):
+        cache.put(source, Scanner(source).scan_token_stream())
+        os.utime(tmp_path / (cache.key(source) + ".tokens"), (now - 100 + age, now - 100 + age))
+    # Using the oldest entry makes it the most recently used one
+    assert cache.get(sources[0]) is not None
+    cache.put(sources[4], Scanner(sources[4]).scan_token_stream())
+    assert cache.stats.evictions == 1
+    assert cache.get(sources[1]) is None
+    assert cache.get(sources[0]) is not None
+    assert cache.size() <= cache.max_bytes
+
+def test_lex_many_with_cache(tmp_path):
+    package = tmp_path / "package"
+    package.mkdir()
+    (package / "a.py").write_text(SOURCE)
+    (package / "b.py").write_text("y = [1,\n 2]\n")
+    cache_dir = str(tmp_path / "cache")
+    first = {result.path: result for result in lex_many([str(package)], workers=1, cache_dir=cache_dir)}
+    second = {result.path: result for result in lex_many([str(package)], workers=2, cache_dir=cache_dir)}
+    assert not any(result.cached for result in first.values())
+    assert all(result.cached for result in second.values())
+    assert {path: result.token_count for path, result in first.items()} == \
+        {path: result.token_count for path, result in second.items()}
@@ -0,0 +1,98 @@
+import os
+import random
+from src.checkpoints import CheckpointIndex, index_path, tokens_in_range
+from src.scanner import Scanner
+
+BLOCK = '''class Shape:
+    """Docstring spanning
+    several lines."""
+    def area(self, width, height):
+        # rectangle
+        total = (width *
+                 height)
+        return total
+
+def main():
+    values = [1, 2,
+              3]
+    for value in values:
+        if value >= 2:
+            print(value, 'é')
+    return 0
+'''
+SOURCE = BLOCK * 40
+
+def lines(tokens, start, end):
+    return [token for token in tokens if start <= token.line <= end]
+
+def test_checkpoints_every_interval():
+    index = CheckpointIndex.build(SOURCE, interval=200)
+    assert len(index) > 10
+    assert index.checkpoints[0] == (0, 1, 1, 0, True, (0,))
+    for previous, checkpoint in zip(index, list(index)[1:]):
+        assert checkpoint.offset >= previous.offset + 200
+        assert SOURCE[checkpoint.offset - 1] == '\n'
+        assert checkpoint.column == 1
+    # Some checkpoints fall inside brackets or blocks
+    assert any(checkpoint.paren_depth for checkpoint in index)
+    assert any(len(checkpoint.indents) > 2 for checkpoint in index)
+
+def test_literal_closing_on_an_unterminated_last_line():
+    for source in ['x = 1\ns = """' + 'text\n' * 20 + '"""; y = 2',
+                   ('x = 1\ns = """' + 'téxt\n' * 20 + 'é"""; y = 2').encode('utf-8')]:
+        index = CheckpointIndex.build(source, interval=16)
+        assert all(checkpoint.column == 1 for checkpoint in index)
+        assert list(index.tokens_in_range(22, 22)) == lines(Scanner(source).scan_tokens(), 22, 22)
+
+def test_checkpoints_skip_multiline_strings():
+    source = 'x = """' + 'text\n' * 100 + '"""\ny = 1\n'
+    index = CheckpointIndex.build(source, interval=16)
+    assert [checkpoint.line for checkpoint in index] == [1, 102]
+
+def test_ranges_match_a_full_scan():
+    random.seed(11)
+    for source in (SOURCE, SOURCE.encode('utf-8')):
+        tokens = Scanner(source).scan_tokens()
+        index = CheckpointIndex.build(source, interval=300)
+        last = tokens[-1].line
+        for _ in range(60):
+            start = random.randint(1, last + 1)
+            end = random.randint(start - 1, last + 1)
+            assert list(index.tokens_in_range(start, end)) == lines(tokens, start, end)
+
+def test_range_scans_only_from_the_nearest_checkpoint():
+    index = CheckpointIndex.build(SOURCE, interval=200)
+    checkpoint = index.nearest(500)
+    assert checkpoint.line <= 500 < index.nearest(index.lines[-1]).line
+    # A source that cannot be scanned before the checkpoint
+    index.source = '$' * checkpoint.offset + SOURCE[checkpoint.offset:]
+    stream = index.tokens_in_range(500, 510)
+    assert list(stream) == lines(Scanner(SOURCE).scan_tokens(), 500, 510)
+
+def test_index_is_persisted_next_to_the_file(tmp_path):
+    path = str(tmp_path / "module.py")
+    with open(path, "w", encoding="utf-8") as source_file:
+        source_file.write(SOURCE)
+    assert CheckpointIndex.load(path) is None
+    index = CheckpointIndex.for_path(path, interval=256)
+    assert os.path.exists(index_path(path))
+    loaded = CheckpointIndex.load(path)
+    assert loaded.checkpoints == index.checkpoints
+    assert loaded.interval == 256 and not loaded.tolerant
+    assert list(tokens_in_range(path, 100, 120, interval=256)) == lines(
+        Scanner(SOURCE.encode('utf-8')).scan_tokens(), 100, 120)
+
+def test_stale_or_corrupt_index_is_ignored(tmp_path):
+    path = str(tmp_path / "module.py")
+    with open(path, "w", encoding="utf-8") as source_file:
+        source_file.write(SOURCE)
+    CheckpointIndex.for_path(path, interval=256)
+    with open(path, "a", encoding="utf-8") as source_file:
+        source_file.write("z = 1\n")
+    assert CheckpointIndex.load(path) is None
+    index = CheckpointIndex.for_path(path, interval=256)
+    assert CheckpointIndex.load(path).checkpoints == index.checkpoints
+    with open(index_path(path), "r+b") as index_file:
+        index_file.truncate(os.path.getsize(index_path(path)) - 3)
+    assert CheckpointIndex.load(path) is None
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,44 @@
+from benchmarks.__main__ import main
+from benchmarks.conformance import (
+    compare_file, python_files, run, stdlib_directory
+)
+from src.token_definitions import TokenType
+
+CONFORMING = "import os  # note\ndef f(a,\n      b):\n    if a:\n        return 'x'\n\n    # c\n    return b\nx = 1"
+
+def write(tmp_path, name, source):
+    path = tmp_path / name
+    path.write_text(source)
+    return str(path)
+
+def test_conforming_file(tmp_path):
+    report = compare_file(write(tmp_path, "ok.py", CONFORMING), memory=True)
+    assert report.conforms and report.tokens > 20
+    assert report.peak > 0 and report.reference_peak > 0
+
+def test_first_mismatch(tmp_path):
+    report = compare_file(write(tmp_path, "arrow.py", "def f() -> int:\n    pass\n"))
+    assert report.mismatch.index == 4
+    assert report.mismatch.expected == ("RARROW '->'", "->", (1, 9))
+    assert report.mismatch.actual[0] is TokenType.MINUS
+    assert str(report.mismatch) == "token 4: expected RARROW '->' '->' at 1:9, got MINUS '-' at 1:9"
+
+def test_rejected_by_tokenize(tmp_path):
+    report = compare_file(write(tmp_path, "bad.py", "x = (\n"))
+    assert report.error.startswith("TokenError") and not report.conforms
+
+def test_summary(tmp_path, capsys):
+    write(tmp_path, "ok.py", CONFORMING)
+    write(tmp_path, "arrow.py", "def f() -> int:\n    pass\n")
+    summary = run(sorted(python_files(str(tmp_path))), memory_every=0)
+    assert (summary.files, summary.conforming) == (2, 1)
+    assert summary.first_mismatches == {"RARROW '->'": 1} and summary.peak == 0
+    assert main(["conformance", str(tmp_path), "--strict"]) == 1
+    output = capsys.readouterr().out
+    assert "arrow.py: token 4" in output and "1 identical" in output and "tokenize" in output
+
+def test_stdlib_sample():
+    paths = list(python_files(stdlib_directory()))[:3]
+    assert len(paths) == 3
+    summary = run(paths, memory_every=1)
+    assert summary.files == 3 and summary.tokens > 0 and summary.reference_seconds > 0
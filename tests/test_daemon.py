@@ -0,0 +1,129 @@
+import json
+import os
+import socket
+import threading
+import time
+import urllib.request
+import pytest
+import src.daemon
+from src.client import REQUEST_HEADER, RESPONSE_HEADER, Client, DaemonError, main
+from src.daemon import HTTPServer, LexDaemon, UnixServer, lex_request
+from src.main import LexicalAnalyzer
+
+SOURCE = 'def f(x):\n    return x + "é"\n'
+
+def expected(source):
+    return [(token.type, token.value, token.line, token.column)
+            for token in LexicalAnalyzer(source).analyze()]
+
+def values(tokens):
+    return [(token.type, token.value, token.line, token.column) for token in tokens]
+
+@pytest.fixture
+def lexer():
+    with LexDaemon(workers=0) as daemon:
+        yield daemon
+
+def serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+@pytest.fixture
+def socket_path(lexer, tmp_path):
+    server = serve(UnixServer(str(tmp_path / "lex.sock"), lexer))
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+    assert not os.path.exists(server.server_address)
+
+def test_unix_socket(socket_path):
+    with Client(socket_path) as client:
+        assert values(client.lex(SOURCE.encode())) == expected(SOURCE)
+        document = json.loads(client.request(SOURCE.encode(), 'json'))
+        assert document['tokens'][0] == ['DEF', 'def', 1, 1]
+        with pytest.raises(DaemonError, match="Unexpected character"):
+            client.request(b"a = $\n")
+        document = json.loads(client.request(b"a = $\n", 'json', tolerant=True))
+        assert document['tokens'][2][0] == 'ERROR' and len(document['diagnostics']) == 1
+        # The connection survives errors and is reused
+        began = time.perf_counter()
+        for _ in range(100):
+            client.request(SOURCE.encode())
+        assert (time.perf_counter() - began) / 100 < 0.005
+
+def test_http(lexer):
+    server = serve(HTTPServer('127.0.0.1', 0, lexer))
+    address = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with Client(address) as client:
+            assert values(client.lex(SOURCE.encode())) == expected(SOURCE)
+            with pytest.raises(DaemonError):
+                client.request(b"a = $\n")
+        with urllib.request.urlopen(address + "/health") as response:
+            assert response.read() == b"ok\n"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_requests_are_batched_while_workers_are_busy(lexer, monkeypatch):
+    sizes = []
+    def lex_requests(requests):
+        sizes.append(len(requests))
+        return [src.daemon.lex_request(*request) for request in requests]
+    monkeypatch.setattr(src.daemon, "lex_requests", lex_requests)
+    lexer._slots.acquire()
+    futures = [lexer.submit(f"x = {index}\n".encode()) for index in range(10)]
+    while lexer._queue.qsize() > 9:
+        time.sleep(0.001)
+    lexer._slots.release()
+    assert all(future.result()[0] for future in futures)
+    assert sizes == [10]
+
+def test_bad_request_fails_alone_in_its_batch(lexer):
+    bad = b'x = "\xff"\n'
+    lexer._slots.acquire()
+    futures = [lexer.submit(SOURCE.encode(), 'json'), lexer.submit(bad, 'json'),
+               lexer.submit(bad), lexer.submit(SOURCE.encode())]
+    while lexer._queue.qsize() > 3:
+        time.sleep(0.001)
+    lexer._slots.release()
+    (good_json, body), bad_json, bad_binary, (good_binary, _) = [future.result() for future in futures]
+    assert good_json and good_binary and json.loads(body)['tokens'][0] == ['DEF', 'def', 1, 1]
+    assert bad_json[0] is bad_binary[0] is False
+    assert bad_json[1].startswith(b"cannot decode source")
+
+def test_source_encoding_is_honored():
+    ok, body = lex_request(b'# -*- coding: latin-1 -*-\nx = "\xe9"\n', 'json')
+    assert ok and ['STRING', '"é"', 2, 5] in json.loads(body)['tokens']
+    ok, body = lex_request(b'\xef\xbb\xbfx = 1\n', 'json')
+    assert ok and json.loads(body)['tokens'][0] == ['IDENTIFIER', 'x', 1, 1]
+    ok, body = lex_request(b'# coding: no-such-codec\nx = 1\n')
+    assert not ok
+
+def test_options_must_be_an_object(socket_path):
+    with socket.socket(socket.AF_UNIX) as connection:
+        connection.connect(socket_path)
+        options = b'["json"]'
+        connection.sendall(REQUEST_HEADER.pack(len(options), 6) + options + b"x = 1\n")
+        status, length = RESPONSE_HEADER.unpack(connection.recv(RESPONSE_HEADER.size))
+        assert connection.recv(length) == b"request options must be a JSON object"
+    with Client(socket_path) as client:
+        assert values(client.lex(SOURCE.encode())) == expected(SOURCE)
+
+def test_diagnostics_limit():
+    with LexDaemon(workers=0, max_diagnostics=2) as lexer:
+        ok, body = lexer.lex(b"$ " * 10, 'json', tolerant=True)
+        assert ok and len(json.loads(body)['diagnostics']) == 2
+
+def test_worker_processes():
+    with LexDaemon(workers=1) as lexer:
+        ok, body = lexer.lex(SOURCE.encode(), 'json')
+        assert ok and json.loads(body)['tokens'][-1][0] == 'EOF'
+
+def test_client_command(socket_path, tmp_path, capsys):
+    path = tmp_path / "example.py"
+    path.write_text(SOURCE)
+    assert main([str(path), "--address", socket_path]) == 0
+    output = capsys.readouterr().out
+    assert output == "".join(f"{token}\n" for token in LexicalAnalyzer(SOURCE).analyze())
+    assert main([str(tmp_path / "missing.py"), "--address", socket_path]) == 1
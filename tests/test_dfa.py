@@ -0,0 +1,84 @@
+import os
+import pytest
+from src.dfa import (
+    DFAPattern, DFAScanner, DFATables, Rule, build_tables, default_spec, load_tables, spec_hash
+)
+from src.pattern_matcher import LexicalError
+from src.scanner import Scanner
+from src.token_definitions import TokenType
+
+SOURCES = [
+    "x **= 2\n",
+    "a ** b + c += d == e != f >= g <= h\n",
+    "def f(x):\n    if x:\n        return 'a\\'b' + \"c\"  # note\n    return [1,\n  2.5]\n",
+    "iffy = elsewhere.import_ + 1.\n",
+    "naïve = 'é'\nπ = 3.14\n",
+    "x = (1 +\\\n 2)\r\ny = 3",
+    "\tx\n",
+]
+
+@pytest.fixture
+def pattern(tmp_path):
+    return DFAPattern(load_tables(cache_dir=str(tmp_path)))
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_same_tokens_as_regex_scanner(pattern, source):
+    expected = Scanner(source).scan_tokens()
+    assert DFAScanner(source, pattern).scan_tokens() == expected
+    assert list(DFAScanner(source.encode('utf-8'), pattern).scan_token_stream()) == expected
+
+@pytest.mark.parametrize("source", ["x = $\n", "s = 'open\n", "if x:\n        a\n    b\n", "x€ = 1\n"])
+def test_same_errors_as_regex_scanner(pattern, source):
+    with pytest.raises(LexicalError) as expected:
+        Scanner(source).scan_tokens()
+    with pytest.raises(LexicalError) as actual:
+        DFAScanner(source, pattern).scan_tokens()
+    assert str(actual.value) == str(expected.value)
+
+def test_maximal_munch(pattern):
+    for lexeme in ("**", "+=", "==", "!=", ">=", "<=", "-="):
+        match = pattern.match(lexeme + "x")
+        assert match.lastgroup == "OPERATOR" and match.group() == lexeme
+
+def test_keywords_are_compiled_in(tmp_path):
+    tables = load_tables(cache_dir=str(tmp_path))
+    spec = tables.spec
+    def accepted(word):
+        state = 0
+        for char in word:
+            state = tables.transitions[state * tables.class_count + tables.classes[ord(char)]]
+        return spec[tables.accepts[state]].token_type
+    assert accepted("while") is TokenType.WHILE
+    assert accepted("whiles") is TokenType.IDENTIFIER
+    assert accepted("whil") is TokenType.IDENTIFIER
+
+def test_tables_are_cached_on_disk(tmp_path):
+    spec = default_spec()
+    tables = load_tables(spec, str(tmp_path))
+    path = tmp_path / f"dfa-{spec_hash(spec)}.bin"
+    assert path.exists()
+    loaded = DFATables.from_bytes(spec, path.read_bytes())
+    assert loaded.transitions == tables.transitions and loaded.accepts == tables.accepts
+    # A damaged file is rebuilt
+    path.write_bytes(b"PLXD")
+    assert load_tables(spec, str(tmp_path)).transitions == tables.transitions
+    assert DFATables.from_bytes(spec, path.read_bytes()) is not None
+
+def test_spec_hash_changes_with_spec():
+    spec = default_spec()
+    assert spec_hash(spec) != spec_hash(spec + (Rule('OPERATOR', TokenType.POWER, r'\^'),))
+
+def test_pattern_dialect():
+    tables = build_tables((Rule('A', None, r'(?:ab|a)c?'), Rule('B', None, r'[^a-c\n]+')))
+    pattern = DFAPattern(tables)
+    assert pattern.match("abcx").group() == "abc"
+    assert pattern.match("ax").group() == "a"
+    assert pattern.match("xyzé\n").group() == "xyzé"
+    assert pattern.match("\n") is None
+
+def test_unwritable_cache_dir_still_builds(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    tables = load_tables(cache_dir=str(blocker / "sub"))
+    assert tables.state_count > 1
+    assert not os.path.isdir(blocker)
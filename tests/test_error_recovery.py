@@ -0,0 +1,87 @@
+import time
+import pytest
+from src.main import LexicalAnalyzer
+from src.pattern_matcher import LexicalError, PatternMatcher
+from src.scanner import Scanner
+from src.token_definitions import TokenType
+
+def scan(source, **options):
+    scanner = Scanner(source, tolerant=True, **options)
+    return [(token.type, token.value) for token in scanner.scan_tokens()], scanner.diagnostics
+
+def test_stray_character():
+    tokens, diagnostics = scan("x = $y + 1\n")
+    assert tokens[2:4] == [(TokenType.ERROR, "$"), (TokenType.IDENTIFIER, "y")]
+    assert [str(error) for error in diagnostics] == ["Unexpected character '$' at line 1, column 5"]
+
+def test_run_of_stray_characters_is_one_token():
+    tokens, diagnostics = scan("a = $€? (b)\n")
+    assert (TokenType.ERROR, "$€?") in tokens
+    assert (TokenType.LPAREN, "(") in tokens and len(diagnostics) == 1
+
+def test_unterminated_string_takes_rest_of_line():
+    tokens, diagnostics = scan("s = 'abc + (d\nt = 1\n")
+    assert tokens[2] == (TokenType.ERROR, "'abc + (d")
+    assert tokens[3:6] == [(TokenType.NEWLINE, "\n"), (TokenType.IDENTIFIER, "t"), (TokenType.ASSIGN, "=")]
+    assert diagnostics.errors[0].message == "Unterminated string literal"
+
+def test_strict_mode_still_raises():
+    with pytest.raises(LexicalError, match="Unterminated string literal at line 1, column 5"):
+        Scanner("s = 'abc\n").scan_tokens()
+
+def test_bad_unindent_recovers_with_balanced_blocks():
+    tokens, diagnostics = scan("if x:\n        a\n    b\n    c\n")
+    types = [token_type for token_type, _ in tokens]
+    assert types.count(TokenType.INDENT) == types.count(TokenType.DEDENT) == 2
+    assert len(diagnostics) == 1 and diagnostics.errors[0].line == 3
+
+def test_invalid_identifier_in_bytes():
+    tokens, diagnostics = scan("x€ = 1\n".encode('utf-8'))
+    assert tokens[0] == (TokenType.ERROR, "x€")
+    assert diagnostics.errors[0].message == "Invalid identifier 'x€'"
+
+def test_diagnostics_are_bounded():
+    tokens, diagnostics = scan("$ " * 1000, max_diagnostics=10)
+    assert len(diagnostics) == 10 and diagnostics.suppressed == 990 and diagnostics.total == 1000
+    assert sum(token_type is TokenType.ERROR for token_type, _ in tokens) == 1000
+
+def test_streaming_recovery():
+    scanner = Scanner("", tolerant=True)
+    chunks = ["x = '", "open\ny = 2", "\n"]
+    values = [token.value for token in scanner.iter_tokens(chunks)]
+    assert values == ["x", "=", "'open", "\n", "y", "=", "2", "\n", ""]
+
+def test_analyzer_tolerant_mode():
+    analyzer = LexicalAnalyzer("a ! b\n", tolerant=True)
+    assert [token.type for token in analyzer.analyze()][:3] == [
+        TokenType.IDENTIFIER, TokenType.ERROR, TokenType.IDENTIFIER]
+    assert analyzer.diagnostics.total == 1
+
+def test_analyzer_diagnostics_limit():
+    analyzer = LexicalAnalyzer("$ " * 50, tolerant=True, max_diagnostics=3)
+    analyzer.analyze()
+    assert len(analyzer.diagnostics) == 3 and analyzer.diagnostics.total == 50
+
+def test_strict_invalid_identifier_leaves_scanner_at_the_error():
+    scanner = Scanner("x = 1\ny = a…b\n".encode('utf-8'))
+    with pytest.raises(LexicalError, match="Invalid identifier"):
+        scanner.scan_tokens()
+    assert (scanner.source[scanner.current:scanner.current + 1], scanner.line,
+            scanner.column) == (b"a", 2, 5)
+
+def test_pattern_matcher_handle_errors():
+    matcher = PatternMatcher()
+    token = matcher.match_pattern("  @@ x", 3, 1)
+    assert (token.type, token.value, token.column) == (TokenType.ERROR, "@@", 3)
+    assert str(matcher.diagnostics.errors[0]) == "Unexpected character '@' at line 3, column 3"
+
+@pytest.mark.parametrize("lines", [4, 1])
+@pytest.mark.parametrize("unit", ["'\\\\", "$", "\t", "\"'", "!", "a$", "(\\", "'a'$"])
+def test_recovery_is_linear(unit, lines):
+    def elapsed(count):
+        source = (unit * (count * 4 // lines) + "\n") * lines
+        began = time.perf_counter()
+        scan(source, max_diagnostics=5)
+        return time.perf_counter() - began
+    small, large = elapsed(2000), elapsed(16000)
+    assert large < small * 8 * 4 + 0.05
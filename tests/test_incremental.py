@@ -0,0 +1,122 @@
+import random
+import pytest
+import src.numeric
+import src.token_stream
+from src.incremental import IncrementalLexer, relex
+from src.pattern_matcher import LexicalError
+from src.scanner import Scanner
+
+SOURCE = '''class Shape:
+    def area(self, width, height):
+        # rectangle
+        total = (width *
+                 height)
+        return total
+
+    def describe(self):
+        return "shape"
+
+def main():
+    values = [1, 2,
+              3]
+    for value in values:
+        if value >= 2:
+            print(value)
+    return 0
+'''
+
+FRAGMENTS = ["x", "value", " ", "\n", "    ", "(", ")", "[", "]", "+", "==", "# note",
+             "'text'", "2.5", ":", "\\\n", "if y:\n    z = 1\n", "\n\n", "'"]
+
+def test_single_edit():
+    previous = Scanner(SOURCE).scan_token_stream()
+    offset = SOURCE.index("width *")
+    stream = relex(previous, offset, len("width"), "breadth")
+    expected = SOURCE.replace("width *", "breadth *")
+    assert stream.source == expected
+    assert list(stream) == Scanner(expected).scan_tokens()
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_edit_sequences(seed):
+    rng = random.Random(seed)
+    lexer = IncrementalLexer(SOURCE)
+    for _ in range(40):
+        source = lexer.source
+        offset = rng.randint(0, len(source))
+        removed = rng.choice([0, 0, 1, 2, 5])
+        removed = min(removed, len(source) - offset)
+        inserted = rng.choice(FRAGMENTS + [""])
+        edited = source[:offset] + inserted + source[offset + removed:]
+        try:
+            expected = Scanner(edited).scan_tokens()
+        except LexicalError as error:
+            with pytest.raises(LexicalError) as relex_error:
+                relex(lexer.tokens, offset, removed, inserted)
+            assert str(relex_error.value) == str(error)
+            continue
+        assert list(lexer.edit(offset, removed, inserted)) == expected
+        assert lexer.source == edited
+        # Side tables of the reused tokens are spliced with the new ones
+        stream = lexer.tokens
+        assert list(stream.numbers) == list(Scanner(edited).scan_token_stream().numbers)
+        assert [stream.symbols[symbol] for symbol in stream.symbol_ids if symbol >= 0] == \
+            [token.value for token in expected if token.symbol is not None]
+
+@pytest.mark.parametrize("seed", range(10))
+def test_shifts_carry_over_unread_edits(seed):
+    rng = random.Random(seed)
+    lexer = IncrementalLexer(SOURCE * 4)
+    for _ in range(60):
+        source = lexer.source
+        offset = rng.randint(0, len(source))
+        inserted = rng.choice(["x", "7", "2.5", " ", "\n", "(", ")", "'s'"])
+        try:
+            Scanner(source[:offset] + inserted + source[offset:]).scan_token_stream()
+        except LexicalError:
+            continue
+        lexer.edit(offset, 0, inserted)
+        if rng.random() < 0.2:
+            # Single lookups work on the shifted stream without settling it
+            expected = Scanner(lexer.source).scan_token_stream()
+            stream = lexer.tokens
+            for index in rng.sample(range(len(expected)), 20) + [-1]:
+                assert stream[index] == expected[index]
+                assert stream.number_at(index) == expected.number_at(index)
+                assert stream.position(index).index == expected.starts[index]
+            line = rng.randint(1, expected.lines[-1])
+            assert stream.token_at(line, 5) == expected.token_at(line, 5)
+    assert list(lexer.tokens) == Scanner(lexer.source).scan_tokens()
+    assert list(lexer.tokens.numbers) == list(Scanner(lexer.source).scan_token_stream().numbers)
+
+def test_rescan_is_local():
+    source = SOURCE * 200
+    lexer = IncrementalLexer(source)
+    offset = source.index("total = (width", len(source) // 2)
+    lexer.edit(offset, 0, "new_")
+    assert lexer.last_rescanned < 20
+    assert list(lexer.tokens) == Scanner(lexer.source).scan_tokens()
+
+def test_edit_work_does_not_grow_with_the_file(monkeypatch):
+    # Entries whose offset, line, index or slot is rewritten in Python
+    rewritten = []
+    def counting(shift):
+        def shifted(column, *deltas):
+            if any(deltas):
+                rewritten.append(len(column))
+            return shift(column, *deltas)
+        return shifted
+    monkeypatch.setattr(src.numeric, "_shifted_slots", counting(src.numeric._shifted_slots))
+    monkeypatch.setattr(src.numeric, "shifted", counting(src.numeric.shifted))
+    monkeypatch.setattr(src.token_stream, "shifted", counting(src.numeric.shifted))
+    source = SOURCE * 500
+    lexer = IncrementalLexer(source)
+    offset = source.index("total = (width", len(source) // 2)
+    # Typing a name, then a few more edits further down the same block
+    for index, character in enumerate("breadth_"):
+        lexer.edit(offset + index, 0, character)
+    for _ in range(5):
+        lexer.edit(lexer.source.index("return total", offset), 0, "x")
+    assert lexer.last_rescanned < 20
+    assert sum(rewritten) < 200 and len(lexer.tokens) > 40000
+    assert list(lexer.tokens) == Scanner(lexer.source).scan_tokens()
+    assert list(lexer.tokens.numbers) == list(Scanner(lexer.source).scan_token_stream().numbers)
@@ -1,3 +1,4 @@
+import io
 import pytest
 from src.main import LexicalAnalyzer
 from src.token_definitions import TokenType
@@ -54,3 +55,46 @@ def test_complex_expression():
     assert len(tokens) == len(expected_types)
     for token, expected_type in zip(tokens, expected_types):
         assert token.type == expected_type
+
+def test_stream_matches_analyze():
+    source = 'def greet():\n    print("héllo")\n' * 50
+    expected = LexicalAnalyzer(source).analyze()
+
+    streamed = list(LexicalAnalyzer.stream(io.StringIO(source), chunk_size=5))
+    assert streamed == expected
+
+    # Multi-byte characters split between binary reads are reassembled
+    encoded = io.BytesIO(source.encode("utf-8"))
+    assert list(LexicalAnalyzer.stream(encoded, chunk_size=3)) == expected
+
+def test_from_path_scans_utf8_bytes(tmp_path):
+    source = 'def café(x):\n    return "naïve" + x  # ünïcode\n'
+    path = tmp_path / "utf8.py"
+    path.write_bytes(source.encode("utf-8"))
+
+    analyzer = LexicalAnalyzer.from_path(str(path))
+    tokens = analyzer.analyze()
+    assert tokens == LexicalAnalyzer(source).analyze()
+    assert tokens[1].value == "café"
+    # Columns count characters, not bytes
+    plus = [token for token in tokens if token.type == TokenType.PLUS][0]
+    assert plus.column == 20
+
+    stream = LexicalAnalyzer.from_path(str(path)).token_stream()
+    assert list(stream) == tokens
+    assert stream.value_at(1) == "café"
+
+def test_from_path_encodings(tmp_path):
+    source = "# -*- coding: latin-1 -*-\nname = 'café'\n"
+    latin = tmp_path / "latin.py"
+    latin.write_bytes(source.encode("latin-1"))
+    assert LexicalAnalyzer.from_path(str(latin)).analyze() == LexicalAnalyzer(source).analyze()
+
+    bom = tmp_path / "bom.py"
+    bom.write_bytes(b"\xef\xbb\xbfx = 1\n")
+    tokens = LexicalAnalyzer.from_path(str(bom)).analyze()
+    assert tokens[0].value == "x" and tokens[0].column == 1
+
+    empty = tmp_path / "empty.py"
+    empty.write_bytes(b"")
+    assert [token.type for token in LexicalAnalyzer.from_path(str(empty)).analyze()] == [TokenType.EOF]
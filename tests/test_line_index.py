@@ -0,0 +1,61 @@
+import pytest
+from src.line_index import LineIndex
+from src.scanner import Scanner
+from src.token_definitions import TokenType
+
+SOURCE = "def f(x):\n    return 'é' + x\n\nprint(f(1))"
+
+@pytest.mark.parametrize("source", [SOURCE, SOURCE.encode('utf-8')])
+def test_positions_match_scanner(source):
+    stream = Scanner(source).scan_token_stream()
+    index = LineIndex(source)
+    for i in range(len(stream)):
+        assert index.position(stream.starts[i]) == (stream.lines[i], stream.columns[i])
+        assert index.offset(stream.lines[i], stream.columns[i]) == stream.starts[i]
+
+def test_line_index_basics():
+    index = LineIndex("a\nbc\n\nd")
+    assert len(index) == 4
+    assert list(index.starts) == [0, 2, 5, 6]
+    assert index.line_of(3) == 2 and index.line_of(5) == 3
+    assert index.line_text(2) == "bc"
+    assert index.offset(2, 99) == 4 and index.offset(4, 99) == 7
+    assert LineIndex(b"ab\r\nc").offset(1, 99) == 2
+    with pytest.raises(IndexError):
+        index.offset(5, 1)
+
+def test_token_at():
+    stream = Scanner(SOURCE).scan_token_stream()
+    assert stream.token_at(2, 5).value == "return"
+    assert stream.token_at(2, 10).value == "return"
+    assert stream.token_at(2, 12).value == "'é'"
+    assert stream.token_at(2, 11) is None
+    assert stream.token_at(4, 1).value == "print"
+    assert stream.token_at(4, 12).type is TokenType.EOF
+
+@pytest.mark.parametrize("source", ["x = 1\nyy = 2\n", b"x = 1\r\nyy = 2\r\n"])
+def test_token_at_past_the_end_of_a_line(source):
+    stream = Scanner(source).scan_token_stream()
+    token = stream.token_at(1, 99)
+    assert token.type is TokenType.NEWLINE and token.line == 1
+
+def test_token_at_bytes_source():
+    stream = Scanner(SOURCE.encode('utf-8')).scan_token_stream()
+    assert stream.token_at(2, 16).value == "+"
+    assert stream.token_at(2, 18).value == "x"
+
+def test_lazy_position():
+    stream = Scanner(SOURCE).scan_token_stream()
+    position = stream.position(5, "example.py")
+    assert position.index == stream.starts[5]
+    assert (position.line, position.column) == (stream.lines[5], stream.columns[5])
+    assert str(position) == "line 1, column 9"
+    position.advance("\n")
+    assert (position.line, position.column) == (2, 0)
+
+def test_line_index_follows_source():
+    stream = Scanner("a\nb\n").scan_token_stream()
+    first = stream.line_index
+    assert stream.line_index is first
+    stream.source = "a\n\nb\n"
+    assert len(stream.line_index) == 4
@@ -0,0 +1,79 @@
+import pickle
+import pytest
+from src.numeric import BIG_INTEGER, FLOAT, IMAGINARY, INTEGER, NumberTable, decode_number
+from src.scanner import Scanner
+from src.token_definitions import TokenType
+from src.token_stream import TokenStream
+
+SOURCE = "x = [0, 42, 0xff, 0o17, 0b101, 1_000, 2.5, .5e1, 1e-3, 3j, 1.5J, 99999999999999999999]\n"
+VALUES = [0, 42, 255, 15, 5, 1000, 2.5, 5.0, 0.001, 3j, 1.5j, 99999999999999999999]
+
+@pytest.mark.parametrize("lexeme, expected", list(zip(
+    ["0", "42", "0xff", "0o17", "0b101", "1_000", "2.5", ".5e1", "1e-3", "3j", "1.5J", "00"],
+    [0, 42, 255, 15, 5, 1000, 2.5, 5.0, 0.001, 3j, 1.5j, 0])))
+def test_decode_number(lexeme, expected):
+    value = decode_number(lexeme)
+    assert value == expected and type(value) is type(expected)
+    assert decode_number(lexeme.encode()) == expected
+
+def test_values_are_decoded_while_scanning():
+    stream = Scanner(SOURCE).scan_token_stream()
+    numbers = stream.numbers
+    assert list(numbers) == VALUES
+    assert [stream.type_at(index) for index in numbers.tokens] == [TokenType.NUMBER] * len(VALUES)
+    assert list(numbers.kinds) == [INTEGER] * 6 + [FLOAT] * 3 + [IMAGINARY] * 2 + [BIG_INTEGER]
+    assert list(numbers.ints) == [0, 42, 255, 15, 5, 1000]
+    assert list(numbers.floats) == [2.5, 5.0, 0.001, 3.0, 1.5]
+    assert numbers.big_ints == [99999999999999999999]
+    assert stream.number_at(5) == 42
+    assert stream.number_at(4) is None
+
+def test_bytes_sources():
+    stream = Scanner(SOURCE.encode()).scan_token_stream()
+    assert list(stream.numbers) == VALUES
+
+def test_streams_built_without_scanning_decode_on_first_access():
+    scanned = Scanner(SOURCE).scan_token_stream()
+    stream = TokenStream(SOURCE)
+    for name in ('types', 'starts', 'lengths', 'lines', 'columns'):
+        setattr(stream, name, getattr(scanned, name))
+    assert stream._numbers is None
+    assert list(stream.numbers) == VALUES
+    assert stream.numbers is stream.numbers
+
+def test_slices_filters_and_pickles_keep_the_values():
+    stream = Scanner(SOURCE).scan_token_stream()
+    part = stream[5:12]
+    assert part._numbers is not None
+    assert list(part.numbers.tokens) == [0, 2, 4, 6] and list(part.numbers) == [42, 255, 15, 5]
+    assert list(stream[::2].numbers) == []
+    odd = stream[1::2]
+    assert list(odd.numbers.tokens) == list(range(1, len(VALUES) + 1))
+    assert list(odd.numbers) == VALUES
+    numbers = stream.filter({TokenType.NUMBER})
+    assert list(numbers.numbers.tokens) == list(range(len(VALUES)))
+    assert list(numbers.numbers) == VALUES
+    assert list(pickle.loads(pickle.dumps(stream)).numbers) == VALUES
+
+def test_table_lookups():
+    table = NumberTable()
+    table.add(3, "7")
+    table.add(8, b"0x10")
+    assert table.value_of(3) == 7 and table.value_of(8) == 16
+    assert table.value_of(5) is None and table.value_of(9) is None
+    assert len(table) == 2
+
+def test_slices_and_extensions_move_the_values_in_bulk():
+    stream = Scanner(SOURCE * 3).scan_token_stream()
+    numbers = stream.numbers
+    for start, stop in [(0, len(stream)), (13, 40), (20, 31), (35, len(stream))]:
+        part = numbers.slice(start, stop)
+        expected = [(index - start, numbers.value_of(index)) for index in numbers.tokens
+                    if start <= index < stop]
+        assert list(zip(part.tokens, part)) == expected
+        assert len(part.ints) + len(part.floats) + len(part.big_ints) == len(part)
+    joined = numbers.slice(0, 20)
+    joined.extend(numbers.slice(20, 35), 20)
+    joined.extend(numbers.slice(35, len(stream)), 35)
+    assert list(joined.tokens) == list(numbers.tokens) and list(joined) == list(numbers)
+    assert joined.ints == numbers.ints and joined.floats == numbers.floats
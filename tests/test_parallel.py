@@ -0,0 +1,66 @@
+import random
+import pytest
+from src.parallel import (SPECULATIVE_STATE, _scan_chunk, parallel_scan_tokens,
+                          parallel_token_stream, split_source)
+from src.pattern_matcher import LexicalError
+from src.scanner import Scanner
+
+# Statements of a function body; several span lines through brackets or "\\"
+BODY = [
+    ["    total = (a +", "             b)  # open bracket across lines"],
+    ["    items = [1,", "", "        2, 3]"],
+    ["    if total >= {n}:", "        return total \\", "            * 2"],
+    ["    # comment {n}"],
+    ["    name = 'value {n}'"],
+]
+
+def random_source(seed: int) -> str:
+    rng = random.Random(seed)
+    lines = []
+    for n in range(rng.randint(5, 30)):
+        function = ["def f{n}(a, b):"]
+        for statement in rng.sample(BODY, rng.randint(1, len(BODY))):
+            function.extend(statement)
+        function.extend(["    return a", "x{n} = f{n}(1, 2.5)"])
+        if rng.random() < 0.3:
+            function.append("")
+        lines.extend(line.replace("{n}", str(n)) for line in function)
+    return "\n".join(lines) + rng.choice(["", "\n"])
+
+def test_split_source():
+    source = "a\nbb\nccc\ndddd\n"
+    boundaries = split_source(source, 3)
+    assert boundaries[0] == 0 and boundaries[-1] == len(source)
+    assert all(source[cut - 1] == "\n" for cut in boundaries[1:-1])
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_serial_scan(seed):
+    source = random_source(seed)
+    serial = Scanner(source).scan_tokens()
+    for chunk_size in (1, 17, 64, 500):
+        assert parallel_scan_tokens(source, workers=1, chunk_size=chunk_size) == serial
+
+def test_matches_serial_stream_with_processes():
+    source = random_source(99)
+    serial = Scanner(source).scan_token_stream()
+    stream = parallel_token_stream(source, workers=2, chunk_size=200)
+    assert list(stream) == list(serial)
+    assert stream.starts == serial.starts
+    assert stream.numbers.floats == serial.numbers.floats
+    assert [stream.symbol_at(index) for index in range(len(stream))] == [
+        serial.symbol_at(index) for index in range(len(serial))]
+
+def test_chunks_are_returned_without_side_tables():
+    part, _ = _scan_chunk(random_source(3), 0, 1, SPECULATIVE_STATE)
+    assert part._numbers is None and part._symbols is None and part._symbol_ids is None
+
+@pytest.mark.parametrize("source", [
+    "x = 1\ny = (2 +\n$)\nz = 3\n",
+    "if x:\n    y = 1\n  z = 2\n",
+])
+def test_errors_match_serial_scan(source):
+    with pytest.raises(LexicalError) as serial:
+        Scanner(source).scan_tokens()
+    with pytest.raises(LexicalError) as parallel:
+        parallel_scan_tokens(source, workers=1, chunk_size=4)
+    assert str(parallel.value) == str(serial.value)
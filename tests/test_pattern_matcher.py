@@ -1,5 +1,6 @@
+import time
 import pytest
-from src.pattern_matcher import PatternMatcher
+from src.pattern_matcher import PatternMatcher, string_end
 from src.token_definitions import Token, TokenType
 
 def test_pattern_matcher_initialization():
@@ -32,7 +33,19 @@ def test_number_pattern():
         ("42", "42"),
         ("3.14", "3.14"),
         ("0", "0"),
-        ("123.456", "123.456")
+        ("123.456", "123.456"),
+        ("0x_1F", "0x_1F"),
+        ("0o17", "0o17"),
+        ("0b1010", "0b1010"),
+        ("1_000_000", "1_000_000"),
+        ("1.5e-3", "1.5e-3"),
+        ("1e10", "1e10"),
+        (".5", ".5"),
+        ("5.", "5."),
+        ("3j", "3j"),
+        ("1.5E+2J", "1.5E+2J"),
+        ("007", "00"),
+        ("1__0", "1"),
     ]
     
     for number, expected in test_cases:
@@ -47,7 +60,9 @@ def test_string_pattern():
     test_cases = [
         ('"Hello"', "Hello"),
         ('"Test String"', "Test String"),
-        ('""', "")  # Empty string
+        ('""', ""),  # Empty string
+        ("r'a\\'b'", "a\\'b"),
+        ('b"""one\ntwo"""', "one\ntwo"),
     ]
     
     for string, expected in test_cases:
@@ -67,3 +82,55 @@ def test_comment_handling():
     multi_line = '"""This is a\nmulti-line\ncomment"""'
     token = matcher.handle_comment(multi_line, 1, 1)
     assert token is None  # Comments should be ignored
+
+def test_unterminated_literals():
+    matcher = PatternMatcher()
+    token = matcher.match_pattern('"abc', 1, 3)
+    assert (token.type, token.value) == (TokenType.ERROR, '"abc')
+    token = matcher.handle_comment('"""never\nclosed', 2, 1)
+    assert (token.type, token.value) == (TokenType.ERROR, '"""never\nclosed')
+    assert [str(error) for error in matcher.diagnostics] == [
+        "Unterminated string literal at line 1, column 3",
+        "Unterminated triple-quoted string literal at line 2, column 1"]
+
+@pytest.mark.parametrize("source, quote, expected", [
+    ('abc" + x', '"', (4, True)),
+    ('a\\\\" + x', '"', (4, True)),
+    ('a\\"b"', '"', (5, True)),
+    ('a\\\nb"', '"', (5, True)),
+    ('abc\nd"', '"', (3, False)),
+    ('abc\r\nd"', '"', (3, False)),
+    ('a\\\nb\nc"', '"', (4, False)),
+    ('abc', "'", (3, False)),
+    ('a\n"" b"""', '"""', (9, True)),
+    ('a \\""" x"""', '"""', (11, True)),
+    ('a\n"" b', '"""', (6, False)),
+])
+def test_string_end(source, quote, expected):
+    assert string_end(source, 0, quote, len(source)) == expected
+    assert string_end(source.encode(), 0, quote.encode(), len(source)) == expected
+
+def test_string_end_does_not_depend_on_the_rest_of_the_line():
+    # Minified or generated code: many short literals on one long line
+    def elapsed(line_length):
+        source = "'a' " + "x" * line_length + "\n"
+        began = time.perf_counter()
+        for _ in range(1000):
+            string_end(source, 1, "'", len(source))
+        return time.perf_counter() - began
+    assert elapsed(4000000) < elapsed(1000) * 4 + 0.01
+
+def test_keyword_and_operator_pattern():
+    matcher = PatternMatcher()
+    test_cases = [
+        ("if", TokenType.IF),
+        ("**", TokenType.POWER),
+        ("+=", TokenType.PLUSASSIGN),
+        ("(", TokenType.LPAREN)
+    ]
+
+    for text, expected_type in test_cases:
+        token = matcher.match_pattern(text, 1, 1)
+        assert token is not None
+        assert token.type == expected_type
+        assert token.value == text
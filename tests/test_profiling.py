@@ -0,0 +1,64 @@
+from collections import Counter
+import pytest
+from src.main import LexicalAnalyzer
+from src.pattern_matcher import PatternMatcher
+from src.profiling import Profiler
+from src.scanner import Scanner
+
+SOURCE = 'def f(x):\n    return x + "a" # note\n'
+
+def test_disabled_scanner_is_not_wrapped():
+    scanner = Scanner(SOURCE)
+    assert scanner._raw_tokens().gi_code is Scanner._scan.__code__
+
+def test_counts_per_token_type():
+    profiler = Profiler()
+    scanner = Scanner(SOURCE)
+    scanner.profiler = profiler
+    tokens = scanner.scan_tokens()
+    counts = Counter(token.type for token in tokens)
+    assert {token_type: timing.count for token_type, timing in profiler.token_types.items()} == counts
+    assert all(timing.seconds >= 0 for timing in profiler.token_types.values())
+
+def test_hooks():
+    profiler = Profiler()
+    seen = []
+    profiler.add_hook('token', lambda token_type, seconds: seen.append(token_type))
+    profiler.add_hook('file', seen.append)
+    tokens = LexicalAnalyzer(SOURCE, profiler=profiler, name="f.py").analyze()
+    assert seen[:-1] == [token.type for token in tokens]
+    assert seen[-1].name == "f.py" and seen[-1].tokens == len(tokens)
+    with pytest.raises(ValueError):
+        profiler.add_hook('line', print)
+
+def test_scanner_handler_timings():
+    profiler = Profiler()
+    source = 'x = "a" + """b"""  # note\ny = $ + \'c\'\n# only a comment\n'
+    for code in (source, source.encode()):
+        LexicalAnalyzer(code, tolerant=True, profiler=profiler).analyze()
+    assert {name: timing.count for name, timing in profiler.handlers.items()} == {
+        'string_end': 6, 'comment_end': 4, 'error_span': 2}
+    assert "string_end" in profiler.report()
+
+def test_matcher_handler_timings():
+    profiler = Profiler()
+    matcher = PatternMatcher()
+    profiler.instrument_matcher(matcher)
+    assert matcher.match_pattern('"abc"', 1, 1).value == "abc"
+    matcher.match_pattern('# note', 1, 1)
+    matcher.match_pattern('$', 1, 1)
+    assert {name: timing.count for name, timing in profiler.handlers.items()} == {
+        'handle_string_literal': 1, 'handle_comment': 1, 'handle_errors': 1}
+    # Only the instrumented instance is affected
+    assert 'handle_comment' not in vars(PatternMatcher())
+
+def test_slowest_files_and_report():
+    profiler = Profiler(slowest_files=2)
+    for index, seconds in enumerate([0.3, 0.1, 0.5, 0.2]):
+        profiler.record_file(f"file{index}.py", 1_000_000, 10, seconds)
+    assert [profile.name for profile in profiler.slowest()] == ["file2.py", "file0.py"]
+    assert profiler.total_files == 4
+    assert profiler.mb_per_sec == pytest.approx(4 / 1.1)
+    LexicalAnalyzer(SOURCE, profiler=profiler).token_stream()
+    report = profiler.report()
+    assert "IDENTIFIER" in report and "5 files" in report and "file2.py" in report
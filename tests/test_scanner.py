@@ -1,5 +1,7 @@
+import mmap
 import pytest
-from src.scanner import Scanner
+from src.scanner import Scanner, detect_encoding, end_of_imports, open_source
+from src.pattern_matcher import LexicalError
 from src.token_definitions import Token, TokenType
 
 def test_scanner_initialization():
@@ -39,3 +41,163 @@ def test_whitespace_handling():
     assert len(tokens) == 1  # Only EOF token
     assert tokens[0].type == TokenType.EOF
     assert scanner.line == 2  # Due to newline character
+
+def test_keywords_identifiers_and_operators():
+    scanner = Scanner("if count ** 2 >= limit: total += 1")
+    tokens = scanner.scan_tokens()
+    assert [token.type for token in tokens] == [
+        TokenType.IF, TokenType.IDENTIFIER, TokenType.POWER, TokenType.NUMBER,
+        TokenType.GREATEREQUAL, TokenType.IDENTIFIER, TokenType.COLON,
+        TokenType.IDENTIFIER, TokenType.PLUSASSIGN, TokenType.NUMBER, TokenType.EOF
+    ]
+    assert tokens[2].value == "**"
+    assert tokens[2].column == 10
+
+def test_indentation_tokens():
+    source = "def f():\n    x = 1\n\n    # note\n    return x\ny = 2\n"
+    tokens = Scanner(source).scan_tokens()
+    types = [token.type for token in tokens]
+    assert types == [
+        TokenType.DEF, TokenType.IDENTIFIER, TokenType.LPAREN, TokenType.RPAREN,
+        TokenType.COLON, TokenType.NEWLINE,
+        TokenType.INDENT, TokenType.IDENTIFIER, TokenType.ASSIGN, TokenType.NUMBER,
+        TokenType.NEWLINE, TokenType.COMMENT,
+        TokenType.RETURN, TokenType.IDENTIFIER, TokenType.NEWLINE,
+        TokenType.DEDENT, TokenType.IDENTIFIER, TokenType.ASSIGN, TokenType.NUMBER,
+        TokenType.NEWLINE, TokenType.EOF
+    ]
+    assert tokens[6].value == "    "
+    assert (tokens[12].line, tokens[12].column) == (5, 5)
+
+def test_newlines_inside_brackets_are_ignored():
+    tokens = Scanner("total = (1 +\n         2)\n").scan_tokens()
+    types = [token.type for token in tokens]
+    assert types.count(TokenType.NEWLINE) == 1
+    assert TokenType.INDENT not in types
+    assert tokens[5].line == 2 and tokens[5].column == 10
+
+def test_unexpected_character():
+    scanner = Scanner("x = 1\ny = $")
+    with pytest.raises(LexicalError) as error:
+        scanner.scan_tokens()
+    assert (error.value.line, error.value.column) == (2, 5)
+
+def test_iter_tokens_across_chunk_boundaries():
+    source = "def f(a):\n    return a ** 2 >= 'x y'  # done\n\nvalue = f(3.25)\n"
+    expected = Scanner(source).scan_tokens()
+    for size in (1, 2, 3, 7, 64):
+        chunks = [source[i:i + size] for i in range(0, len(source), size)]
+        assert list(Scanner("").iter_tokens(chunks)) == expected
+
+def test_iter_tokens_keeps_only_unfinished_line():
+    scanner = Scanner("")
+    lines = ("x = %d\n" % i for i in range(1000))
+    count = sum(1 for _ in scanner.iter_tokens(lines))
+    assert count == 4 * 1000 + 1
+    assert scanner.line == 1001
+    assert len(scanner.source) < 16
+
+def test_detect_encoding():
+    assert detect_encoding(b"x = 1\n") == "utf-8"
+    assert detect_encoding(b"#!/usr/bin/env python\n# coding: latin-1\n") == "iso8859-1"
+    assert detect_encoding(b"x = 1\n# coding: latin-1\n") == "utf-8"
+    assert detect_encoding(b"\xef\xbb\xbfx = 1\n") == "utf-8"
+
+def test_bytes_source_rejects_invalid_identifier():
+    tokens = Scanner("x = ñ\n".encode("utf-8")).scan_tokens()
+    assert tokens[2].value == "ñ"
+    with pytest.raises(LexicalError):
+        Scanner("x = a…b\n".encode("utf-8")).scan_tokens()
+
+def test_bytes_source_columns_count_characters():
+    source = ("é = 'ü' + ab  # ñ\nx = [ñ,\n     'ö', $, y] + é\n" * 3 +
+              "plain = 1\nwide = 'abc' + 'ä' * 2 + ü\n")
+    expected = [(token.type, token.value, token.line, token.column)
+                for token in Scanner(source, tolerant=True).scan_tokens()]
+    scanner = Scanner(source.encode("utf-8"), tolerant=True)
+    assert [(token.type, token.value, token.line, token.column)
+            for token in scanner.scan_tokens()] == expected
+
+def test_bytes_columns_after_literal_closing_past_stop():
+    source = 'x = 1\ns = """\nπ"""; y = 2\nz = 3\n'
+    scanner = Scanner(source.encode("utf-8"))
+    tokens = [(token_type, lexeme.decode("utf-8"), line, column)
+              for token_type, lexeme, _, line, column in scanner._scan(stop=len("x = 1\ns = \"\"\"\n"))]
+    expected = [(token.type, token.value, token.line, token.column)
+                for token in Scanner(source).scan_tokens()]
+    assert tokens == expected[:len(tokens)] and tokens[-1][1:] == ("\n", 3, 12)
+
+def test_open_source_memory_maps_large_files(tmp_path):
+    source = 'name = "välue"\n' * 100
+    path = tmp_path / "mapped.py"
+    path.write_bytes(source.encode("utf-8"))
+    mapped = open_source(str(path), mmap_threshold=0)
+    assert isinstance(mapped, mmap.mmap)
+    assert Scanner(mapped).scan_tokens() == Scanner(source).scan_tokens()
+    assert isinstance(open_source(str(path)), bytes)
+
+MODULE = '"""Doc."""\n# comment\nimport os\nfrom a.b import (c,\n    d as e)\n\nx = 1  # note\n'
+
+def test_include_and_exclude():
+    tokens = Scanner(MODULE).scan_tokens()
+    kept = Scanner(MODULE).scan_tokens(exclude={TokenType.COMMENT, TokenType.NEWLINE})
+    assert kept == [token for token in tokens if token.type not in (TokenType.COMMENT, TokenType.NEWLINE)]
+    names = Scanner(MODULE.encode()).scan_tokens(include={TokenType.IDENTIFIER})
+    assert [token.value for token in names] == ["os", "a", "b", "c", "d", "e", "x"]
+    assert Scanner(MODULE).scan_tokens(include={TokenType.NUMBER}, exclude={TokenType.NUMBER}) == []
+
+def test_stop_when_ends_the_scan_early():
+    # The error past the import block is never reached
+    source = MODULE + "y = $\n"
+    imports = Scanner(source).scan_tokens(
+        include={TokenType.IMPORT, TokenType.FROM, TokenType.IDENTIFIER, TokenType.DOT},
+        stop_when=end_of_imports())
+    assert [token.value for token in imports] == ["import", "os", "from", "a", ".", "b", "import", "c", "d", "e"]
+    first_number = Scanner(source).scan_tokens(stop_when=lambda token: token.type is TokenType.NUMBER)
+    assert first_number[-1].type is TokenType.ASSIGN
+    with pytest.raises(LexicalError):
+        Scanner(source).scan_tokens(include={TokenType.IMPORT})
+
+def test_end_of_imports_without_other_statements():
+    tokens = Scanner("import os\n").scan_tokens(stop_when=end_of_imports())
+    assert tokens[-1].type is TokenType.EOF
+
+def test_string_literals():
+    source = 'a = rb"x\\"y" + f\'z\' + u"" + \'\'\'\'\'\' + "\\\\"\n'
+    tokens = Scanner(source).scan_tokens()
+    assert [token.value for token in tokens if token.type == TokenType.STRING] == [
+        'rb"x\\"y"', "f'z'", 'u""', "''''''", '"\\\\"']
+
+def test_multi_line_strings_keep_line_numbers():
+    source = 'def f():\n    """Doc\n    string with \'\'\' and "" inside\n    """\n    return """a\\\n"""  # end\nx = 1\n'
+    tokens = Scanner(source).scan_tokens()
+    strings = [token for token in tokens if token.type == TokenType.STRING]
+    assert [(token.line, token.column) for token in strings] == [(2, 5), (5, 12)]
+    assert strings[0].value.count('\n') == 2
+    assert tokens[-5].value == "x" and tokens[-5].line == 7
+    assert (tokens[-8].line, tokens[-8].column) == (6, 6)
+
+def test_string_line_continuation():
+    tokens = Scanner("s = 'a\\\nb'\nt = 1\n").scan_tokens()
+    assert tokens[2].value == "'a\\\nb'"
+    assert tokens[4].line == 3
+
+@pytest.mark.parametrize("source, message", [
+    ("s = 'abc\nt = 1\n", "Unterminated string literal"),
+    ('s = """abc\nt = 1\n', "Unterminated triple-quoted string literal"),
+])
+def test_unterminated_strings(source, message):
+    with pytest.raises(LexicalError, match=message) as error:
+        Scanner(source).scan_tokens()
+    assert (error.value.line, error.value.column) == (1, 5)
+    scanner = Scanner(source, tolerant=True)
+    tokens = scanner.scan_tokens()
+    assert tokens[2].type == TokenType.ERROR
+    assert [str(error) for error in scanner.diagnostics] == [f"{message} at line 1, column 5"]
+
+def test_iter_tokens_splits_triple_quoted_strings():
+    source = 'x = 1\ns = """first\nsecond \\""" third\n"""\n# ' + 'c' * 50 + '\ny = "\\\\"\n'
+    expected = Scanner(source).scan_tokens()
+    for size in (1, 2, 3, 5, 16):
+        chunks = [source[i:i + size] for i in range(0, len(source), size)]
+        assert list(Scanner("").iter_tokens(chunks)) == expected
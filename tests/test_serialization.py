@@ -0,0 +1,91 @@
+import io
+import pytest
+from src.scanner import Scanner
+from src.serialization import (
+    TokenFormatError, TokenReader, TokenWriter, dump, dumps, iter_load, load, loads
+)
+from src.token_definitions import Token, TokenType
+
+SOURCE = """def f(x):
+    if x:
+        return 'é' + "y"  # note
+    return [1,
+            2.5]
+"""
+
+def test_round_trip_token_list():
+    tokens = Scanner(SOURCE).scan_tokens()
+    assert loads(dumps(tokens)) == tokens
+
+def test_round_trip_token_stream_from_bytes():
+    stream = Scanner(SOURCE.encode('utf-8')).scan_token_stream()
+    loaded = loads(dumps(stream))
+    assert loaded == Scanner(SOURCE).scan_tokens()
+    assert [token.value for token in loaded] == [token.value for token in stream]
+
+def test_values_are_stored_once():
+    source = "value = value + value\n" * 1000
+    tokens = Scanner(source).scan_token_stream()
+    data = dumps(tokens)
+    assert data.count(b"value") == 1
+    assert len(data) < len("\n".join(map(str, tokens))) // 5
+
+def test_string_tables_are_bounded():
+    source = "".join(f"name{i} = 'text{i}' + 'common'\n" for i in range(2000))
+    tokens = Scanner(source).scan_tokens()
+    buffer = io.BytesIO()
+    with TokenWriter(buffer, block_tokens=64, max_shared_strings=100) as writer:
+        for token in tokens:
+            writer.write(token)
+            # Only names, keywords, operators and delimiters are shared
+            assert len(writer.strings) <= 100 + 64
+        assert not [value for value in writer.strings if "text" in value]
+    buffer.seek(0)
+    reader = TokenReader(buffer)
+    loaded = []
+    for block in iter(reader.read_block, None):
+        assert len(reader.strings) <= 100 + 64
+        loaded.extend(block)
+    assert loaded == tokens
+
+def test_large_and_unordered_positions():
+    tokens = [Token(TokenType.IDENTIFIER, "a", 100000, 300),
+              Token(TokenType.IDENTIFIER, "b", 3, 1),
+              Token(TokenType.NUMBER, "1", 3, 70000)]
+    assert loads(dumps(tokens)) == tokens
+
+def test_streaming_writer_and_reader():
+    buffer = io.BytesIO()
+    tokens = Scanner(SOURCE * 50).scan_tokens()
+    with TokenWriter(buffer, block_tokens=16) as writer:
+        for token in tokens:
+            writer.write(token)
+    buffer.seek(0)
+    reader = TokenReader(buffer)
+    first_block = reader.read_block()
+    assert len(first_block) == 16
+    assert first_block + list(reader) == tokens
+
+def test_dump_and_load_file(tmp_path):
+    tokens = Scanner(SOURCE).scan_token_stream()
+    path = tmp_path / "tokens.bin"
+    with open(path, "wb") as output:
+        dump(tokens, output)
+    with open(path, "rb") as source:
+        assert load(source) == list(tokens)
+    with open(path, "rb") as source:
+        assert next(iter_load(source)).value == "def"
+
+def test_empty_stream():
+    assert loads(dumps([])) == []
+
+@pytest.mark.parametrize("data", [b"", b"nope", dumps([])[:-1]])
+def test_invalid_data(data):
+    with pytest.raises(TokenFormatError):
+        loads(data)
+
+def test_corrupt_block():
+    data = bytearray(dumps(Scanner(SOURCE).scan_tokens()))
+    del data[-20:-1]
+    with pytest.raises(TokenFormatError):
+        loads(bytes(data))
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Cumulative import time allowed for the lexer, in microseconds. Typical
+# is about a third of this; the margin absorbs slow CI machines.
+IMPORT_BUDGET_US = 100_000
+# Modules that only specific features need, never a plain lexing run
+DEFERRED_MODULES = {'concurrent.futures.process', 'multiprocessing', 'src.cache', 'src.profiling',
+                    'src.batch', 'tempfile', 'hashlib', 'dataclasses', 'socket'}
+
+def import_times(code, *args):
+    """Run code under -X importtime; return {module: cumulative microseconds}."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code, *args], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times, result.stdout
+
+def test_import_budget():
+    times, _ = import_times("import src.main")
+    assert times["src.main"] < IMPORT_BUDGET_US
+    assert not DEFERRED_MODULES & set(times)
+
+def test_patterns_are_compiled_on_first_use_only():
+    code = ("import src.main, src.pattern_matcher as pm; print(pm.shared_master_pattern.cache_info().currsize);"
+            "src.main.LexicalAnalyzer('x = 1').analyze(); src.main.LexicalAnalyzer('y').analyze();"
+            "print(pm.shared_master_pattern.cache_info().currsize)")
+    _, output = import_times(code)
+    assert output.split() == ["0", "1"]
+
+def test_cli_does_not_start_a_pool_for_one_file(tmp_path):
+    path = tmp_path / "example.py"
+    path.write_text("x = 1\n")
+    code = "import sys; from src.__main__ import main; main(sys.argv[1:])"
+    times, output = import_times(code, str(path))
+    assert "1 files (0 failed)" in output
+    assert "concurrent.futures.process" not in times and "src.cache" not in times
@@ -0,0 +1,90 @@
+import pytest
+from benchmarks.__main__ import main
+from benchmarks.symbols import count_file, run
+from src.scanner import Scanner
+from src.symbols import NO_SYMBOL, PRESEEDED, SymbolTable
+from src.token_definitions import Token, TokenType
+from src.token_stream import TokenStream
+
+SOURCE = "total = total + 1\nif total >= limit:\n    total = 'total'\n"
+
+def test_table_numbers_values_once():
+    table = SymbolTable()
+    assert len(table) == len(PRESEEDED) and table.find("if") == PRESEEDED.index("if")
+    first = table.intern("name")
+    assert table.intern("name") == first == len(PRESEEDED)
+    assert table.intern(b"name") == first
+    assert table.intern("naïve".encode()) == table.intern("naïve") == first + 1
+    assert table[first] == "name" and "name" in table and table.find("other") is None
+
+def test_tokens_share_interned_values():
+    tokens = Scanner(SOURCE).scan_tokens()
+    totals = [token for token in tokens if token.type is TokenType.IDENTIFIER
+              and token.value == "total"]
+    assert len(totals) == 4
+    assert all(token.value is totals[0].value for token in totals)
+    assert len({token.symbol for token in totals}) == 1
+    string = next(token for token in tokens if token.type is TokenType.STRING)
+    assert string.symbol is None
+
+def test_matches_by_symbol():
+    scanner = Scanner(SOURCE)
+    tokens = scanner.scan_tokens()
+    total = scanner.symbols.find("total")
+    assert tokens[0].matches(TokenType.IDENTIFIER, total)
+    assert not tokens[0].matches(TokenType.IDENTIFIER, scanner.symbols.find("limit"))
+    assert tokens[0].matches(TokenType.IDENTIFIER, "total")
+    assert not Token(TokenType.IDENTIFIER, "total", 1, 1).matches(TokenType.IDENTIFIER, total)
+
+def test_streamed_tokens_are_not_interned():
+    scanner = Scanner("")
+    lines = ("name_%d = %d\n" % (index, index) for index in range(1000))
+    tokens = list(scanner.iter_tokens(lines))
+    assert len(scanner.symbols) == len(PRESEEDED)
+    assert all(token.symbol is None for token in tokens)
+    names = list(Scanner("").iter_tokens(["x = 1\n"], include={TokenType.IDENTIFIER}))
+    assert names == [Token(TokenType.IDENTIFIER, "x", 1, 1)] and names[0].symbol is None
+
+@pytest.mark.parametrize("source", [SOURCE, SOURCE.encode()])
+def test_stream_symbol_ids(source):
+    scanner = Scanner(source)
+    stream = scanner.scan_token_stream()
+    assert stream.symbols is scanner.symbols
+    assert len(stream.symbol_ids) == len(stream)
+    for index, token in enumerate(stream):
+        symbol = stream.symbol_at(index)
+        assert token.symbol == symbol
+        if symbol is None:
+            assert stream.symbol_ids[index] == NO_SYMBOL
+        else:
+            assert stream.symbols[symbol] == token.value
+    assert list(Scanner(source).scan_tokens()) == list(stream)
+
+def test_slices_and_filters_keep_symbol_ids():
+    stream = Scanner(SOURCE).scan_token_stream()
+    identifiers = stream.filter({TokenType.IDENTIFIER})
+    assert [identifiers.symbols[symbol] for symbol in identifiers.symbol_ids] == \
+        ["total", "total", "total", "limit", "total"]
+    part = stream[2:5]
+    assert [token.value for token in part] == ["total", "+", "1"]
+    assert part.symbol_at(0) == stream.symbol_at(2)
+
+def test_streams_built_without_scanning_intern_on_first_access():
+    scanned = Scanner(SOURCE).scan_token_stream()
+    stream = TokenStream(SOURCE)
+    for name in ('types', 'starts', 'lengths', 'lines', 'columns'):
+        setattr(stream, name, getattr(scanned, name))
+    assert [stream.symbols[symbol] if symbol >= 0 else None for symbol in stream.symbol_ids] == \
+        [scanned.symbols[symbol] if symbol >= 0 else None for symbol in scanned.symbol_ids]
+
+def test_dedup_report(tmp_path, capsys):
+    path = tmp_path / "module.py"
+    path.write_text(SOURCE)
+    result = count_file(str(path))
+    assert (result.identifiers, result.identifier_symbols) == (5, 2)
+    assert result.uses == {"total": 4, "limit": 1}
+    summary = run([str(path)])
+    assert summary.tokens == result.tokens and summary.symbols == result.symbols
+    assert main(["symbols", str(tmp_path)]) == 0
+    output = capsys.readouterr().out
+    assert "2.5x" in output and "total" in output
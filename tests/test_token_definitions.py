@@ -72,12 +72,19 @@ def test_token_validation():
     invalid_number = Token(TokenType.NUMBER, "4x2", 1, 1, pos)
     assert valid_number.validate()
     assert not invalid_number.validate()
+    assert Token(TokenType.NUMBER, "0x_ff", 1, 1, pos).validate()
+    assert Token(TokenType.NUMBER, "1_000.5e-3j", 1, 1, pos).validate()
+    assert not Token(TokenType.NUMBER, "1__0", 1, 1, pos).validate()
     
     # Test string validation
     valid_string = Token(TokenType.STRING, '"hello"', 1, 1, pos)
     invalid_string = Token(TokenType.STRING, 'hello', 1, 1, pos)
     assert valid_string.validate()
     assert not invalid_string.validate()
+    assert Token(TokenType.STRING, "rb'''multi\nline'''", 1, 1, pos).validate()
+    assert Token(TokenType.STRING, '""', 1, 1, pos).validate()
+    assert not Token(TokenType.STRING, '"""open"', 1, 1, pos).validate()
+    assert not Token(TokenType.STRING, 'xyz"s"', 1, 1, pos).validate()
     
     # Test identifier validation
     valid_identifier = Token(TokenType.IDENTIFIER, "valid_name", 1, 1, pos)
@@ -140,3 +147,23 @@ def test_token_comparison():
     assert token1.matches(TokenType.NUMBER, "42")
     assert not token1.matches(TokenType.STRING)
     assert not token1.matches(TokenType.NUMBER, "43")
+
+def test_category_flags():
+    keywords = [t for t in TokenType if Token(t, "", 1, 1).is_keyword]
+    operators = [t for t in TokenType if Token(t, "", 1, 1).is_operator]
+    delimiters = [t for t in TokenType if Token(t, "", 1, 1).is_delimiter]
+    assert len(keywords) == 14 and TokenType.RAISE in keywords
+    assert len(operators) == 15 and TokenType.LESSEQUAL in operators
+    assert len(delimiters) == 10 and TokenType.SEMICOLON in delimiters
+    assert not set(keywords) & set(operators)
+    assert TokenType.IDENTIFIER.flags == 0
+
+def test_token_slots():
+    token = Token(TokenType.IDENTIFIER, "x", 1, 1)
+    assert not hasattr(token, "__dict__")
+    assert token != Token(TokenType.IDENTIFIER, "x", 1, 2)
+
+def test_create_keyword_token_only_matches_keywords():
+    pos = Position(1, 1)
+    assert create_keyword_token("plus", pos).type == TokenType.IDENTIFIER
+    assert create_keyword_token("If", pos).type == TokenType.IDENTIFIER
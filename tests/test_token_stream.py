@@ -0,0 +1,55 @@
+from src.scanner import Scanner
+from src.token_stream import TokenStream
+from src.token_definitions import Token, TokenType
+
+SOURCE = """
+def area(width, height):
+    # rectangle
+    return width * height
+
+print(area(3, 4.5), "done")
+"""
+
+def test_stream_matches_token_list():
+    stream = Scanner(SOURCE).scan_token_stream()
+    tokens = Scanner(SOURCE).scan_tokens()
+    assert len(stream) == len(tokens)
+    assert list(stream) == tokens
+    assert stream[0] == tokens[0]
+    assert stream[-1].type == TokenType.EOF
+
+def test_values_are_sliced_from_source():
+    stream = Scanner(SOURCE).scan_token_stream()
+    for index in range(len(stream)):
+        token = stream[index]
+        assert token.value == SOURCE[stream.starts[index]:stream.starts[index] + stream.lengths[index]]
+        assert stream.value_at(index) == token.value
+        assert stream.type_at(index) == token.type
+
+def test_slicing():
+    stream = Scanner(SOURCE).scan_token_stream()
+    tokens = list(stream)
+    part = stream[2:9]
+    assert isinstance(part, TokenStream)
+    assert part.source is stream.source
+    assert list(part) == tokens[2:9]
+    assert list(stream[::3]) == tokens[::3]
+
+def test_filter_and_count():
+    stream = Scanner(SOURCE).scan_token_stream()
+    identifiers = stream.filter([TokenType.IDENTIFIER, TokenType.NUMBER])
+    assert [token.value for token in identifiers] == [
+        "area", "width", "height", "width", "height", "print", "area", "3", "4.5"
+    ]
+    assert stream.count(TokenType.IDENTIFIER) == 7
+    assert stream.count(TokenType.COMMENT) == 1
+
+def test_append_and_size():
+    stream = TokenStream("x = 1")
+    stream.append(TokenType.IDENTIFIER, 0, 1, 1, 1)
+    stream.append(TokenType.ASSIGN, 2, 1, 1, 3)
+    assert list(stream) == [
+        Token(TokenType.IDENTIFIER, "x", 1, 1),
+        Token(TokenType.ASSIGN, "=", 1, 3)
+    ]
+    assert stream.nbytes < 2 * 64
@@ -0,0 +1,110 @@
+import glob
+import os
+import pytest
+from src import vectorized
+from src.pattern_matcher import LexicalError
+from src.scanner import Scanner
+from src.token_definitions import TokenType
+
+pytest.importorskip("numpy")
+
+SOURCES = [
+    "",
+    "x",
+    "x = 1\n",
+    "def f(a, b):\n    return a ** b + 1\n\n\nclass C:\n    pass\n",
+    "if a:\n\tif b:\n\t\tc = [1,\n  2]\n    \n\fd = {e: f}\n",
+    "x = y\n" * 5 + "s = 'str'  # comment\n" + "a += b <= c\n" * 5,
+    "n = 1.5 + 2. + 3abc + 1_000 + x.y\n" * 3 + "z = a//b -= c**d =- e\n",
+    "a = 007 + 00 + .5 + x.5 + 0x1f + 1e5 + 2j\n" + "b = 10 + 0\n" * 4,
+    "m = a ! b\np = a !== b\nq = a != b\nr = a **= b\n" + "t = u\n" * 4,
+    "x = (1 +\\\n 2)\r\ny = 3\n" + "w = v\n" * 4,
+    "naïve = 1\nπ = 3\n" + "k = j\n" * 4 + "ok = 'é'",
+    "x = $\n" + "a = b\n" * 4 + "s = 'open\n" + "c = d\n" * 4,
+    "if x:\n    a = 1\n    b = 2\n  c = 3\n" + "d = e\n" * 4,
+    "x = 1   \n" * 4 + "    ",
+    'def f():\n    """Doc\n    a = b\n\n    c = d\n    """\n' + "    e = f\n" * 4 + "g = '''h\ni'''\n",
+    "s = '''never\nclosed\n" + "x = y\n" * 4,
+    'def f(x):\n    """Return x.\n\n    a = b\n    c = d\n    Author: José"""\n    return x\n' * 3,
+    '"""\n\nπ"""%\n' + "a = b\n" * 4,
+]
+
+@pytest.fixture
+def always(monkeypatch):
+    """Send even tiny sources and single simple lines through the prepass."""
+    monkeypatch.setattr(vectorized, "MIN_SIMPLE_LINES", 1)
+    monkeypatch.setattr(vectorized, "MIN_SIMPLE_SHARE", 0.0)
+
+def scan(source, vectorize, tolerant=True):
+    scanner = Scanner(source, tolerant=tolerant)
+    scanner.vectorize = vectorize
+    try:
+        tokens = list(scanner._raw_tokens())
+    except LexicalError as error:
+        return str(error)
+    return tokens, [str(error) for error in scanner.diagnostics]
+
+@pytest.mark.parametrize("tolerant", [True, False])
+@pytest.mark.parametrize("source", SOURCES)
+def test_same_tokens_as_scalar_scan(always, source, tolerant):
+    assert scan(source, True, tolerant) == scan(source, False, tolerant)
+    data = source.encode('utf-8')
+    assert scan(data, True, tolerant) == scan(data, False, tolerant)
+
+def test_utf8_bom(always):
+    data = b'\xef\xbb\xbfx = 1\ny = 2\n'
+    assert scan(data, True) == scan(data, False)
+
+def test_stdlib_sample(always):
+    paths = sorted(glob.glob(os.path.join(os.path.dirname(os.__file__), '*.py')))[:40]
+    for path in paths:
+        with open(path, 'rb') as source:
+            data = source.read()
+        assert scan(data, True) == scan(data, False), path
+
+def test_simple_lines_skip_the_master_pattern(always, monkeypatch):
+    calls = []
+    original = Scanner._scan
+    monkeypatch.setattr(Scanner, "_scan", lambda self, *args, **kwargs: (
+        calls.append(kwargs.get("stop")) or original(self, *args, **kwargs)))
+    tokens = scan("a = b\nc = 'd'\ne = f\n", True)[0]
+    assert [token[0] for token in tokens].count(TokenType.NEWLINE) == 3
+    # The string line, then only the closing DEDENT and EOF tokens
+    assert calls == [14, None]
+
+def test_prepass_segments():
+    source = "a = 1\nb = 2\ns = 'x'\nc = 3\nd = 4\n"
+    plan = vectorized.prepass(source, min_lines=1, min_share=0.0)
+    assert [segment[:3] for segment in plan.segments] == [(0, 12, True), (12, 20, False),
+                                                          (20, 32, True)]
+    begin, end, _, first, last = plan.segments[0]
+    assert [source[start:stop] for start, stop in zip(plan.starts[first:last],
+                                                      plan.ends[first:last])] == \
+        ["a", "=", "1", "\n", "b", "=", "2", "\n"]
+
+def test_prepass_gives_up_on_tricky_sources():
+    assert vectorized.prepass("s = 'x'\n" * 10) is None
+    # Runs of simple lines shorter than min_lines are left to the scalar loop
+    plan = vectorized.prepass("a = 1\ns = 'x'\n" * 4 + "b = 2\n" * 4, min_lines=2, min_share=0.0)
+    assert [segment[2] for segment in plan.segments] == [False, True]
+
+def test_threshold(monkeypatch):
+    calls = []
+    monkeypatch.setattr(vectorized, "scan", lambda scanner: calls.append(scanner) or iter(()))
+    Scanner("x = 1\n")._raw_tokens()
+    assert calls == []
+    large = Scanner("x = 1\n" * 20000)
+    large._raw_tokens()
+    assert calls == [large]
+    large.vectorize = False
+    large._raw_tokens()
+    assert calls == [large]
+
+def test_only_with_the_shared_patterns(monkeypatch):
+    calls = []
+    monkeypatch.setattr(vectorized, "scan", lambda scanner: calls.append(scanner) or iter(()))
+    scanner = Scanner("x = 1\n")
+    scanner.vectorize = True
+    scanner.master_pattern = object()
+    scanner._raw_tokens()
+    assert calls == []